@@ -0,0 +1,25 @@
+#!/usr/bin/env python3
+"""Summarise long-ended streams and move their sessions to the archive"""
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from streams.services import archive
+
+
+class Command(BaseCommand):
+    help = "Archive viewer sessions of streams ended more than --days ago."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.STREAM_ARCHIVE_AFTER_DAYS)
+        parser.add_argument('--chunk-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        archived = 0
+        for stream_id in archive.archivable_streams(options['days']).values_list(
+            'pk', flat=True
+        ).iterator():
+            moved = archive.archive_stream(stream_id, options['chunk_size'])
+            archived += 1
+            self.stdout.write(f"{stream_id}: {moved} session(s) archived")
+
+        self.stdout.write(f"Archived {archived} stream(s).")
@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""Rebuild per-minute and retention rollups from StreamViewer sessions"""
+
+import numpy as np
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from streams.models import LiveStream, StreamMinuteRollup, StreamRetentionRollup
+from streams.services import archive, rollups
+
+
+class Command(BaseCommand):
+    help = "Recompute stream rollups from closed viewer sessions (ended streams by default)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--stream', help="Only rebuild this stream id.")
+        parser.add_argument('--chunk-size', type=int, default=10000)
+
+    def handle(self, *args, **options):
+        streams = LiveStream.objects.filter(status='ended')
+        if options['stream']:
+            streams = LiveStream.objects.filter(pk=options['stream'])
+
+        rebuilt = 0
+        for stream_id in streams.values_list('pk', flat=True).iterator():
+            with transaction.atomic():
+                StreamMinuteRollup.objects.filter(stream_id=stream_id).delete()
+                StreamRetentionRollup.objects.filter(stream_id=stream_id).delete()
+
+                sessions = np.array([
+                    (joined_at.timestamp(), left_at.timestamp())
+                    for joined_at, left_at in archive.closed_sessions(
+                        stream_id, options['chunk_size']
+                    )
+                ], dtype=np.float64).reshape(-1, 2)
+                rollups.add_buckets(stream_id, sessions[:, 0], sessions[:, 1])
+
+            rebuilt += 1
+            self.stdout.write(f"{stream_id}: {len(sessions)} session(s)")
+
+        self.stdout.write(f"Rebuilt rollups of {rebuilt} stream(s).")
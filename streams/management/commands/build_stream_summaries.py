@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""Compute StreamSummary rows of ended streams"""
+
+import time
+from django.core.management.base import BaseCommand
+from streams.models import LiveStream
+from streams.services import summaries
+
+
+class Command(BaseCommand):
+    help = "Compute queued stream summaries, or recompute all of them with --backfill."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true',
+                            help="Keep building queued summaries every --interval seconds.")
+        parser.add_argument('--interval', type=int, default=5)
+        parser.add_argument('--backfill', action='store_true',
+                            help="Recompute the summaries of every ended stream.")
+        parser.add_argument('--chunk-size', type=int, default=200)
+
+    def handle(self, *args, **options):
+        if options['backfill']:
+            self.backfill(options['chunk_size'])
+            return
+
+        while True:
+            built = summaries.build_pending(options['chunk_size'])
+            self.stdout.write(f"Built {built} summary(ies).")
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
+
+    def backfill(self, chunk_size):
+        stream_ids = LiveStream.objects.filter(status='ended').order_by('pk').values_list(
+            'pk', flat=True
+        )
+        built = 0
+        last = None
+        while True:
+            chunk = stream_ids.filter(pk__gt=last) if last else stream_ids
+            chunk = list(chunk[:chunk_size])
+            if not chunk:
+                break
+            built += summaries.compute_many(chunk)
+            last = chunk[-1]
+            self.stdout.write(f"Recomputed {built} summary(ies)...")
+
+        self.stdout.write(f"Recomputed {built} summary(ies).")
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""Export the viewer sessions of a stream as NDJSON or CSV"""
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_datetime
+from streams.services import exports
+
+
+class Command(BaseCommand):
+    help = "Stream the viewer sessions of a stream to stdout or a file."
+
+    def add_arguments(self, parser):
+        parser.add_argument('stream_id')
+        parser.add_argument('--output', choices=list(exports.RENDERERS), default='ndjson')
+        parser.add_argument('--since', help="ISO datetime, inclusive.")
+        parser.add_argument('--until', help="ISO datetime, exclusive.")
+        parser.add_argument('--cursor', help="Resume after the row with this cursor.")
+        parser.add_argument('--file', help="Write to this path instead of stdout.")
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        bounds = {}
+        for name in ('since', 'until'):
+            if options[name]:
+                bounds[name] = parse_datetime(options[name])
+                if bounds[name] is None:
+                    raise CommandError(f"Invalid --{name} datetime.")
+
+        try:
+            rows = exports.iter_sessions(
+                options['stream_id'],
+                cursor=options['cursor'],
+                chunk_size=options['chunk_size'],
+                **bounds,
+            )
+            render, _ = exports.RENDERERS[options['output']]
+            if options['file']:
+                with open(options['file'], 'w', newline='') as out:
+                    out.writelines(render(rows))
+            else:
+                for line in render(rows):
+                    self.stdout.write(line, ending='')
+        except ValueError as exc:
+            raise CommandError(str(exc))
@@ -0,0 +1,25 @@
+#!/usr/bin/env python3
+"""Flush live viewer counters from Redis to LiveStream rows"""
+
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from streams.services import counters
+
+
+class Command(BaseCommand):
+    help = "Write Redis viewer counters of changed streams to the database."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true',
+                            help="Keep flushing every --interval seconds.")
+        parser.add_argument('--interval', type=int,
+                            default=settings.STREAM_COUNTER_FLUSH_INTERVAL)
+
+    def handle(self, *args, **options):
+        while True:
+            flushed = counters.flush_all()
+            self.stdout.write(f"Flushed counters of {flushed} stream(s).")
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
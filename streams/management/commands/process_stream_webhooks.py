@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""Apply queued Mux webhook events to LiveStream rows"""
+
+import signal
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from streams.services import webhooks
+
+
+class Command(BaseCommand):
+    help = "Apply queued streaming provider webhooks in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true',
+                            help="Keep applying every --interval seconds.")
+        parser.add_argument('--interval', type=float, default=0.5)
+        parser.add_argument('--batch-size', type=int,
+                            default=settings.STREAM_WEBHOOK_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        self.stopping = False
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+        while not self.stopping:
+            handled = webhooks.apply_batch(options['batch_size'])
+            if not options['loop']:
+                break
+            if not handled:
+                time.sleep(options['interval'])
+
+        handled = webhooks.drain(options['batch_size'])
+        self.stdout.write(f"Applied {handled} event(s). Stats: {webhooks.stats()}")
+
+    def stop(self, signum, frame):
+        self.stopping = True
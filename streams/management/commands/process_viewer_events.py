@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""Persist buffered StreamViewer join/leave events"""
+
+import signal
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from streams.services import ingestion
+
+
+class Command(BaseCommand):
+    help = "Flush buffered viewer join/leave events to the database in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true',
+                            help="Keep flushing every --interval seconds.")
+        parser.add_argument('--interval', type=int,
+                            default=settings.STREAM_VIEWER_FLUSH_INTERVAL)
+        parser.add_argument('--batch-size', type=int,
+                            default=settings.STREAM_VIEWER_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        self.stopping = False
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+        while not self.stopping:
+            handled = ingestion.flush(options['batch_size'])
+            if not options['loop']:
+                break
+            if not handled:
+                time.sleep(options['interval'])
+
+        # Never exit with events left in the buffer
+        handled = ingestion.drain(options['batch_size'])
+        self.stdout.write(f"Drained {handled} event(s). Stats: {ingestion.stats()}")
+
+    def stop(self, signum, frame):
+        self.stopping = True
@@ -0,0 +1,27 @@
+#!/usr/bin/env python3
+"""Close viewer sessions whose heartbeat expired"""
+
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from streams.services import heartbeats
+
+
+class Command(BaseCommand):
+    help = "Close StreamViewer sessions that stopped sending heartbeats."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true',
+                            help="Keep reaping every --interval seconds.")
+        parser.add_argument('--interval', type=int,
+                            default=settings.STREAM_REAPER_INTERVAL)
+        parser.add_argument('--timeout', type=int,
+                            default=settings.STREAM_HEARTBEAT_TIMEOUT)
+
+    def handle(self, *args, **options):
+        while True:
+            reaped = heartbeats.reap(options['timeout'])
+            self.stdout.write(f"Closed {reaped} stale session(s).")
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,91 @@
+# Generated by Django 5.2.1 on 2026-10-17 01:52
+
+import django.core.validators
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LiveStream',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('title', models.CharField(max_length=200)),
+                ('description', models.TextField(blank=True)),
+                ('stream_mode', models.CharField(choices=[('obs', 'OBS/RTMP'), ('webcam', 'WebRTC (Browser)')], default='obs', max_length=10)),
+                ('stream_key', models.CharField(db_index=True, editable=False, max_length=100, unique=True)),
+                ('channel_arn', models.CharField(blank=True, max_length=255)),
+                ('playback_url', models.URLField(blank=True)),
+                ('ingest_endpoint', models.CharField(blank=True, max_length=200, validators=[django.core.validators.URLValidator(schemes=['rtmp', 'rtmps', 'srt'])])),
+                ('webrtc_session_id', models.CharField(blank=True, max_length=100)),
+                ('webrtc_offer', models.TextField(blank=True, help_text='SDP offer for WebRTC')),
+                ('webrtc_answer', models.TextField(blank=True, help_text='SDP answer for WebRTC')),
+                ('status', models.CharField(choices=[('idle', 'Idle'), ('live', 'Live'), ('ended', 'Ended')], db_index=True, default='idle', max_length=10)),
+                ('viewer_count', models.PositiveIntegerField(default=0)),
+                ('peak_viewers', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('ended_at', models.DateTimeField(blank=True, null=True)),
+                ('is_paid', models.BooleanField(default=False)),
+                ('ticket_price', models.DecimalField(decimal_places=2, default=0.0, help_text='Price in dollars', max_digits=8)),
+                ('created_by', models.ForeignKey(help_text='Artist or Promoter who created this stream', limit_choices_to={'role__in': ['artist', 'promoter']}, on_delete=django.db.models.deletion.CASCADE, related_name='created_streams', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Live Stream',
+                'verbose_name_plural': 'Live Streams',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='StreamViewer',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('session_id', models.UUIDField(db_index=True, default=uuid.uuid4, editable=False)),
+                ('ip_address', models.GenericIPAddressField(blank=True, null=True)),
+                ('user_agent', models.CharField(blank=True, max_length=255)),
+                ('joined_at', models.DateTimeField(auto_now_add=True)),
+                ('left_at', models.DateTimeField(blank=True, null=True)),
+                ('duration_seconds', models.PositiveIntegerField(default=0)),
+                ('stream', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='views', to='streams.livestream')),
+                ('viewer', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='stream_views', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Stream View',
+                'verbose_name_plural': 'Stream Views',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='livestream',
+            index=models.Index(fields=['status', '-created_at'], name='streams_liv_status_d7a92c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='livestream',
+            index=models.Index(fields=['created_by', '-created_at'], name='streams_liv_created_6f472a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='livestream',
+            index=models.Index(fields=['stream_mode'], name='streams_liv_stream__76917f_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='streamviewer',
+            index=models.Index(fields=['stream', '-joined_at'], name='streams_str_stream__21026b_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='streamviewer',
+            index=models.Index(fields=['viewer', '-joined_at'], name='streams_str_viewer__d22e63_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='streamviewer',
+            index=models.Index(fields=['session_id'], name='streams_str_session_7c4c80_idx'),
+        ),
+    ]
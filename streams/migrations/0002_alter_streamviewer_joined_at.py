@@ -0,0 +1,19 @@
+# Generated by Django 5.2.1 on 2026-10-17 01:54
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('streams', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='streamviewer',
+            name='joined_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.1 on 2026-10-17 02:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('streams', '0002_alter_streamviewer_joined_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StreamMinuteRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('minute', models.DateTimeField()),
+                ('concurrent_viewers', models.PositiveIntegerField(default=0)),
+                ('joins', models.PositiveIntegerField(default=0)),
+                ('leaves', models.PositiveIntegerField(default=0)),
+                ('watch_seconds', models.PositiveBigIntegerField(default=0)),
+                ('stream', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='minute_rollups', to='streams.livestream')),
+            ],
+            options={
+                'verbose_name': 'Stream Minute Rollup',
+                'verbose_name_plural': 'Stream Minute Rollups',
+                'ordering': ['minute'],
+                'constraints': [models.UniqueConstraint(fields=('stream', 'minute'), name='unique_stream_minute_rollup')],
+            },
+        ),
+        migrations.CreateModel(
+            name='StreamRetentionRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('watched_minutes', models.PositiveIntegerField()),
+                ('sessions', models.PositiveIntegerField(default=0)),
+                ('stream', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='retention_rollups', to='streams.livestream')),
+            ],
+            options={
+                'verbose_name': 'Stream Retention Rollup',
+                'verbose_name_plural': 'Stream Retention Rollups',
+                'ordering': ['watched_minutes'],
+                'constraints': [models.UniqueConstraint(fields=('stream', 'watched_minutes'), name='unique_stream_retention_rollup')],
+            },
+        ),
+    ]
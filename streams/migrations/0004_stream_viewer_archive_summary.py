@@ -0,0 +1,52 @@
+# Generated by Django 5.2.1 on 2026-10-17 02:12
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('streams', '0003_stream_rollups'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StreamSummary',
+            fields=[
+                ('stream', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='summary', serialize=False, to='streams.livestream')),
+                ('sessions', models.PositiveIntegerField(default=0)),
+                ('unique_viewers', models.PositiveIntegerField(default=0)),
+                ('anonymous_sessions', models.PositiveIntegerField(default=0)),
+                ('total_watch_seconds', models.PositiveBigIntegerField(default=0)),
+                ('avg_watch_seconds', models.FloatField(default=0)),
+                ('peak_viewers', models.PositiveIntegerField(default=0)),
+                ('computed_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Stream Summary',
+                'verbose_name_plural': 'Stream Summaries',
+            },
+        ),
+        migrations.CreateModel(
+            name='StreamViewerArchive',
+            fields=[
+                ('id', models.UUIDField(editable=False, primary_key=True, serialize=False)),
+                ('session_id', models.UUIDField()),
+                ('ip_address', models.GenericIPAddressField(blank=True, null=True)),
+                ('user_agent', models.CharField(blank=True, max_length=255)),
+                ('joined_at', models.DateTimeField()),
+                ('left_at', models.DateTimeField(blank=True, null=True)),
+                ('duration_seconds', models.PositiveIntegerField(default=0)),
+                ('stream', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_views', to='streams.livestream')),
+                ('viewer', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Archived Stream View',
+                'verbose_name_plural': 'Archived Stream Views',
+            },
+        ),
+    ]
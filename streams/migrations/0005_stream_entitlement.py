@@ -0,0 +1,31 @@
+# Generated by Django 5.2.1 on 2026-10-17 02:13
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('streams', '0004_stream_viewer_archive_summary'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StreamEntitlement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(default='purchase', max_length=20)),
+                ('granted_at', models.DateTimeField(auto_now_add=True)),
+                ('stream', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='entitlements', to='streams.livestream')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stream_entitlements', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Stream Entitlement',
+                'verbose_name_plural': 'Stream Entitlements',
+                'constraints': [models.UniqueConstraint(fields=('stream', 'user'), name='unique_stream_entitlement')],
+            },
+        ),
+    ]
@@ -1,12 +1,16 @@
 #!/usr/bin/env python3
 """Streaming model to manage live creation"""
 
-from django.db import models
+from django.db import models, transaction
 from django.conf import settings
 from django.core.exceptions import ValidationError
+from django.core.validators import URLValidator
 from django.utils import timezone
+import math
 import uuid
 
+from streams.services import counters, entitlements, rollups, stream_keys, transitions
+
 
 class LiveStream(models.Model):
     """
@@ -56,7 +60,11 @@ class LiveStream(models.Model):
     # OBS/RTMP configuration
     channel_arn = models.CharField(max_length=255, blank=True)
     playback_url = models.URLField(blank=True)
-    ingest_endpoint = models.URLField(blank=True)
+    ingest_endpoint = models.CharField(
+        max_length=200,
+        blank=True,
+        validators=[URLValidator(schemes=['rtmp', 'rtmps', 'srt'])]
+    )
 
     # WebRTC configuration
     webrtc_session_id = models.CharField(max_length=100, blank=True)
@@ -117,13 +125,18 @@ class LiveStream(models.Model):
                 'ticket_price': 'Paid streams must have a ticket price greater than 0.'
             })
 
-        if self.stream_mode == 'obs' and self.status == 'live':
+        if self.status == 'live':
+            self.validate_live_config()
+
+    def validate_live_config(self):
+        """Check the stream mode has what it needs to go live"""
+        if self.stream_mode == 'obs':
             if not self.ingest_endpoint or not self.playback_url:
                 raise ValidationError(
                     'OBS streams require ingest_endpoint and playback_url.'
                 )
 
-        if self.stream_mode == 'webcam' and self.status == 'live':
+        if self.stream_mode == 'webcam':
             if not self.webrtc_session_id:
                 raise ValidationError(
                     'WebRTC streams require a webrtc_session_id.'
@@ -134,56 +147,97 @@ class LiveStream(models.Model):
         if not self.stream_key:
             self.stream_key = str(uuid.uuid4())
 
-        # Run validation
-        self.full_clean()
+        # Run validation; narrow updates only check the fields they write
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None:
+            self.full_clean()
+            if not self._state.adding:
+                # is_paid or the owner may have changed
+                transaction.on_commit(lambda: entitlements.invalidate(self.pk))
+        else:
+            self.clean_fields(exclude=[
+                field.name for field in self._meta.fields
+                if field.name not in update_fields
+            ])
 
         super().save(*args, **kwargs)
 
     # Stream lifecycle methods
     def go_live(self):
-        """Transition stream to live status"""
-        if self.status == 'live':
-            return  # Already live
+        """
+        Transition stream to live status.
+        Returns False if another worker already moved it out of idle.
+        """
+        self.validate_live_config()
+
+        started_at = timezone.now()
+        if not transitions.go_live(self.pk, started_at):
+            self.refresh_from_db(fields=['status', 'started_at', 'ended_at'])
+            return False
 
         self.status = 'live'
-        self.started_at = timezone.now()
+        self.started_at = started_at
         self.viewer_count = 0
-        self.save(update_fields=['status', 'started_at', 'viewer_count'])
+        return True
 
     def end_stream(self):
-        """End the stream and finalize metrics"""
-        if self.status == 'ended':
-            return  # Already ended
-        
+        """
+        End the stream and finalize metrics.
+        Returns False if the stream had already ended.
+        """
+        _, live_peak = self.live_counts()
+
+        ended_at = timezone.now()
+        if not transitions.end(self.pk, ended_at):
+            self.refresh_from_db(fields=['status', 'ended_at', 'viewer_count', 'peak_viewers'])
+            return False
+
         self.status = 'ended'
-        self.ended_at = timezone.now()
+        self.ended_at = ended_at
         self.viewer_count = 0
-        self.save(update_fields=['status', 'ended_at', 'viewer_count'])
+        self.peak_viewers = max(self.peak_viewers, live_peak)
+        return True
+
+    def rotate_stream_key(self):
+        """Issue a new stream key, the previous one stops working at once"""
+        previous_key = self.stream_key
+        self.stream_key = str(uuid.uuid4())
+        LiveStream.objects.filter(pk=self.pk).update(stream_key=self.stream_key)
+        transaction.on_commit(lambda: stream_keys.invalidate(previous_key))
 
     # Viewer management methods
     def increment_viewers(self, count=1):
         """
-        Increment viewer count atomically.
-        Updates peak_viewers if current count exceeds it.
+        Increment viewer count atomically in Redis.
+        Updates peak_viewers if current count exceeds it; the row itself
+        is written at most once per STREAM_COUNTER_FLUSH_INTERVAL.
         """
-        self.viewer_count += count
-        
-        if self.viewer_count > self.peak_viewers:
-            self.peak_viewers = self.viewer_count
-            self.save(update_fields=['viewer_count', 'peak_viewers'])
-        else:
-            self.save(update_fields=['viewer_count'])
+        self.viewer_count, self.peak_viewers = counters.increment(
+            self.pk, count, seed=(self.viewer_count, self.peak_viewers)
+        )
+        counters.maybe_flush(self.pk)
 
     def decrement_viewers(self, count=1):
         """Decrement viewer count, ensuring it never goes below zero"""
-        self.viewer_count = max(0, self.viewer_count - count)
-        self.save(update_fields=['viewer_count'])
+        self.viewer_count, self.peak_viewers = counters.decrement(
+            self.pk, count, seed=(self.viewer_count, self.peak_viewers)
+        )
+        counters.maybe_flush(self.pk)
 
     def update_peak_viewers(self, value):
         """Update peak viewers if the provided value is higher"""
         if value > self.peak_viewers:
             self.peak_viewers = value
-            self.save(update_fields=['peak_viewers'])
+            LiveStream.objects.filter(
+                pk=self.pk, peak_viewers__lt=value
+            ).update(peak_viewers=value)
+
+    def live_counts(self):
+        """Return the live (viewer_count, peak_viewers), Redis first"""
+        live = counters.get_counts(self.pk)
+        if live is None:
+            return self.viewer_count, self.peak_viewers
+        return live
 
     # Utility properties
     @property
@@ -233,7 +287,8 @@ class StreamViewer(models.Model):
     user_agent = models.CharField(max_length=255, blank=True)
 
     # Timing
-    joined_at = models.DateTimeField(auto_now_add=True)
+    # Not auto_now_add: buffered joins are persisted with their event time
+    joined_at = models.DateTimeField(default=timezone.now)
     left_at = models.DateTimeField(null=True, blank=True)
     duration_seconds = models.PositiveIntegerField(default=0)
 
@@ -256,10 +311,173 @@ class StreamViewer(models.Model):
             return  # Already marked as left
         
         self.left_at = timezone.now()
-        self.duration_seconds = int((self.left_at - self.joined_at).total_seconds())
-        self.save(update_fields=['left_at', 'duration_seconds'])
+        self.duration_seconds = self.session_seconds(self.joined_at, self.left_at)
+        with transaction.atomic():
+            self.save(update_fields=['left_at', 'duration_seconds'])
+            rollups.record_sessions([(self.stream_id, self.joined_at, self.left_at)])
+
+    @staticmethod
+    def session_seconds(joined_at, left_at):
+        """Watched seconds between two instants, a started second counts"""
+        return max(0, math.ceil((left_at - joined_at).total_seconds()))
 
     @property
     def is_active(self):
         """Check if viewer is still watching"""
         return self.left_at is None
+
+
+class StreamMinuteRollup(models.Model):
+    """
+    Per-minute viewer aggregates of a stream, filled as sessions close.
+    """
+
+    stream = models.ForeignKey(
+        LiveStream,
+        on_delete=models.CASCADE,
+        related_name='minute_rollups'
+    )
+    minute = models.DateTimeField()
+
+    concurrent_viewers = models.PositiveIntegerField(default=0)
+    joins = models.PositiveIntegerField(default=0)
+    leaves = models.PositiveIntegerField(default=0)
+    watch_seconds = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        ordering = ['minute']
+        verbose_name = 'Stream Minute Rollup'
+        verbose_name_plural = 'Stream Minute Rollups'
+        constraints = [
+            models.UniqueConstraint(fields=['stream', 'minute'],
+                                    name='unique_stream_minute_rollup'),
+        ]
+
+    def __str__(self):
+        return f"{self.stream_id} @ {self.minute:%Y-%m-%d %H:%M} ({self.concurrent_viewers})"
+
+
+class StreamRetentionRollup(models.Model):
+    """
+    Number of closed sessions of a stream by full minutes watched.
+    """
+
+    stream = models.ForeignKey(
+        LiveStream,
+        on_delete=models.CASCADE,
+        related_name='retention_rollups'
+    )
+    watched_minutes = models.PositiveIntegerField()
+    sessions = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['watched_minutes']
+        verbose_name = 'Stream Retention Rollup'
+        verbose_name_plural = 'Stream Retention Rollups'
+        constraints = [
+            models.UniqueConstraint(fields=['stream', 'watched_minutes'],
+                                    name='unique_stream_retention_rollup'),
+        ]
+
+    def __str__(self):
+        return f"{self.stream_id}: {self.sessions} session(s) for {self.watched_minutes} min"
+
+
+class StreamViewerArchive(models.Model):
+    """
+    Viewer sessions of long-ended streams, moved out of StreamViewer.
+    Write-once storage for billing: no index besides the stream.
+    """
+
+    id = models.UUIDField(primary_key=True, editable=False)
+
+    stream = models.ForeignKey(
+        LiveStream,
+        on_delete=models.CASCADE,
+        related_name='archived_views'
+    )
+
+    # No constraint: deleting a user must not scan the archive
+    viewer = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.DO_NOTHING,
+        null=True,
+        blank=True,
+        db_constraint=False,
+        related_name='+'
+    )
+
+    session_id = models.UUIDField()
+    ip_address = models.GenericIPAddressField(null=True, blank=True)
+    user_agent = models.CharField(max_length=255, blank=True)
+
+    joined_at = models.DateTimeField()
+    left_at = models.DateTimeField(null=True, blank=True)
+    duration_seconds = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = 'Archived Stream View'
+        verbose_name_plural = 'Archived Stream Views'
+
+    def __str__(self):
+        return f"{self.session_id} - {self.stream_id} ({self.duration_seconds}s)"
+
+
+class StreamSummary(models.Model):
+    """
+    Post-stream totals over all viewer sessions, live and archived.
+    """
+
+    stream = models.OneToOneField(
+        LiveStream,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='summary'
+    )
+
+    sessions = models.PositiveIntegerField(default=0)
+    unique_viewers = models.PositiveIntegerField(default=0)
+    anonymous_sessions = models.PositiveIntegerField(default=0)
+    total_watch_seconds = models.PositiveBigIntegerField(default=0)
+    avg_watch_seconds = models.FloatField(default=0)
+    peak_viewers = models.PositiveIntegerField(default=0)
+
+    computed_at = models.DateTimeField()
+    archived_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'Stream Summary'
+        verbose_name_plural = 'Stream Summaries'
+
+    def __str__(self):
+        return f"{self.stream_id}: {self.sessions} session(s), {self.unique_viewers} viewer(s)"
+
+
+class StreamEntitlement(models.Model):
+    """
+    Right of a user to watch a paid stream.
+    """
+
+    stream = models.ForeignKey(
+        LiveStream,
+        on_delete=models.CASCADE,
+        related_name='entitlements'
+    )
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='stream_entitlements'
+    )
+    source = models.CharField(max_length=20, default='purchase')
+    granted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Stream Entitlement'
+        verbose_name_plural = 'Stream Entitlements'
+        constraints = [
+            models.UniqueConstraint(fields=['stream', 'user'],
+                                    name='unique_stream_entitlement'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} -> {self.stream_id} ({self.source})"
@@ -0,0 +1,9 @@
+#!/usr/bin/env python3
+"""streams permission"""
+
+from rest_framework.permissions import BasePermission
+
+
+class IsStreamOwner(BasePermission):
+    def has_object_permission(self, request, view, obj):
+        return request.user.is_staff or obj.created_by_id == request.user.id
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""streams serializers"""
+
+from rest_framework import serializers
+from streams.models import LiveStream, StreamSummary
+from streams.services import exports
+
+
+class ViewerSessionSerializer(serializers.Serializer):
+    session_id = serializers.UUIDField()
+
+
+class IngestCallbackSerializer(serializers.Serializer):
+    """nginx-rtmp style on_publish / on_done callback"""
+    name = serializers.CharField(max_length=100)
+    call = serializers.ChoiceField(choices=['publish', 'done'])
+
+
+class ViewerExportSerializer(serializers.Serializer):
+    output = serializers.ChoiceField(choices=list(exports.RENDERERS), default='ndjson')
+    since = serializers.DateTimeField(required=False)
+    until = serializers.DateTimeField(required=False)
+    cursor = serializers.CharField(required=False)
+
+    def validate_cursor(self, value):
+        try:
+            exports.decode_cursor(value)
+        except ValueError as exc:
+            raise serializers.ValidationError(str(exc))
+        return value
+
+
+class LiveStreamArchiveSerializer(serializers.ModelSerializer):
+    creator_name = serializers.CharField(source='created_by.name', read_only=True)
+
+    class Meta:
+        model = LiveStream
+        fields = [
+            'id', 'title', 'creator_name', 'stream_mode', 'peak_viewers',
+            'started_at', 'ended_at', 'created_at',
+        ]
+
+
+class StreamSummarySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = StreamSummary
+        fields = [
+            'stream', 'sessions', 'unique_viewers', 'anonymous_sessions',
+            'total_watch_seconds', 'avg_watch_seconds', 'peak_viewers',
+            'computed_at', 'archived_at',
+        ]
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Archival of viewer sessions of long-ended streams.
+
+StreamViewer only has to serve current streams, so sessions of streams
+ended more than STREAM_ARCHIVE_AFTER_DAYS ago are summarised, then moved
+to StreamViewerArchive by chunks, each chunk being one
+DELETE ... RETURNING feeding an INSERT, i.e. its own short transaction.
+An interrupted run is simply resumed by the next one. A row already in
+the archive fails its chunk rather than being deleted without a copy.
+"""
+
+from datetime import timedelta
+from django.conf import settings
+from django.db import connection
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+from streams.services import summaries
+
+
+COLUMNS = [
+    'id', 'stream_id', 'viewer_id', 'session_id', 'ip_address', 'user_agent',
+    'joined_at', 'left_at', 'duration_seconds',
+]
+
+
+def archivable_streams(days=None):
+    """Ended streams older than `days` that still have live sessions"""
+    from streams.models import LiveStream, StreamViewer
+
+    days = settings.STREAM_ARCHIVE_AFTER_DAYS if days is None else days
+    return LiveStream.objects.filter(
+        status='ended',
+        ended_at__lt=timezone.now() - timedelta(days=days),
+    ).filter(
+        Exists(StreamViewer.objects.filter(stream=OuterRef('pk')))
+    )
+
+
+def archive_stream(stream_id, chunk_size=5000):
+    """Summarise a stream, then move its sessions. Returns rows moved."""
+    from streams.models import StreamSummary, StreamViewer, StreamViewerArchive
+
+    summaries.compute(stream_id)
+
+    columns = ', '.join(COLUMNS)
+    hot = StreamViewer._meta.db_table
+    sql = f"""
+        WITH moved AS (
+            DELETE FROM {hot} WHERE id IN (
+                SELECT id FROM {hot} WHERE stream_id = %s LIMIT %s
+            )
+            RETURNING {columns}
+        )
+        INSERT INTO {StreamViewerArchive._meta.db_table} ({columns})
+        SELECT {columns} FROM moved
+    """
+    moved = 0
+    with connection.cursor() as cursor:
+        while True:
+            cursor.execute(sql, [stream_id, chunk_size])
+            moved += cursor.rowcount
+            if cursor.rowcount < chunk_size:
+                break
+
+    StreamSummary.objects.filter(stream_id=stream_id).update(archived_at=timezone.now())
+    return moved
+
+
+def closed_sessions(stream_id, chunk_size=10000):
+    """Yield (joined_at, left_at) of the closed sessions, live and archived"""
+    from streams.models import StreamViewer, StreamViewerArchive
+
+    for model in (StreamViewer, StreamViewerArchive):
+        yield from model.objects.filter(
+            stream_id=stream_id, left_at__isnull=False
+        ).values_list('joined_at', 'left_at').iterator(chunk_size=chunk_size)
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""Redis-backed live viewer counters for LiveStream"""
+
+from django.conf import settings
+from django.db.models import Value
+from django.db.models.functions import Greatest
+from streams.services import updates
+from users.core.redis import redis_client
+
+
+DIRTY_KEY = 'streams:counters:dirty'
+
+# Atomically apply a delta to the viewer count (never below zero), keep
+# the peak and publish the new values. The hash is seeded from the
+# database values the first time a stream is touched so a Redis restart
+# does not reset the peak.
+_APPLY_DELTA = redis_client.register_script("""
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    redis.call('HSET', KEYS[1], 'viewers', ARGV[2], 'peak', ARGV[3])
+end
+local viewers = redis.call('HINCRBY', KEYS[1], 'viewers', ARGV[1])
+if viewers < 0 then
+    viewers = 0
+    redis.call('HSET', KEYS[1], 'viewers', 0)
+end
+local peak = tonumber(redis.call('HGET', KEYS[1], 'peak'))
+if viewers > peak then
+    peak = viewers
+    redis.call('HSET', KEYS[1], 'peak', peak)
+end
+redis.call('EXPIRE', KEYS[1], ARGV[4])
+redis.call('SADD', KEYS[2], ARGV[5])
+redis.call('PUBLISH', ARGV[6], cjson.encode(
+    {stream = ARGV[5], viewer_count = viewers, peak_viewers = peak}))
+return {viewers, peak}
+""")
+
+
+def _key(stream_id):
+    return f"stream:{stream_id}:counters"
+
+
+def _apply(stream_id, delta, seed):
+    seed_viewers, seed_peak = seed
+    viewers, peak = _APPLY_DELTA(
+        keys=[_key(stream_id), DIRTY_KEY],
+        args=[delta, seed_viewers, seed_peak,
+              settings.STREAM_COUNTER_TTL, str(stream_id), updates.CHANNEL],
+    )
+    return int(viewers), int(peak)
+
+
+def increment(stream_id, count=1, seed=(0, 0)):
+    """Add viewers and return the live (viewer_count, peak_viewers)"""
+    return _apply(stream_id, count, seed)
+
+
+def decrement(stream_id, count=1, seed=(0, 0)):
+    """Remove viewers and return the live (viewer_count, peak_viewers)"""
+    return _apply(stream_id, -count, seed)
+
+
+def get_counts(stream_id):
+    """Return the live (viewer_count, peak_viewers), or None if not tracked"""
+    values = redis_client.hmget(_key(stream_id), 'viewers', 'peak')
+    if values[0] is None:
+        return None
+    return int(values[0]), int(values[1])
+
+
+def get_many(stream_ids):
+    """Return {stream_id: (viewer_count, peak_viewers)} for tracked streams"""
+    pipe = redis_client.pipeline(transaction=False)
+    for stream_id in stream_ids:
+        pipe.hmget(_key(stream_id), 'viewers', 'peak')
+
+    counts = {}
+    for stream_id, values in zip(stream_ids, pipe.execute()):
+        if values[0] is not None:
+            counts[stream_id] = (int(values[0]), int(values[1]))
+    return counts
+
+
+def reset(stream_id):
+    """Stop tracking a stream and return its last (viewer_count, peak_viewers)"""
+    pipe = redis_client.pipeline()
+    pipe.hmget(_key(stream_id), 'viewers', 'peak')
+    pipe.delete(_key(stream_id))
+    pipe.srem(DIRTY_KEY, str(stream_id))
+    values, _, _ = pipe.execute()
+    if values[0] is None:
+        return None
+    return int(values[0]), int(values[1])
+
+
+def flush(stream_id):
+    """Write the live counters of one stream to its LiveStream row"""
+    from streams.models import LiveStream
+
+    counts = get_counts(stream_id)
+    if counts is None:
+        return False
+
+    viewers, peak = counts
+    LiveStream.objects.filter(pk=stream_id).update(
+        viewer_count=viewers,
+        peak_viewers=Greatest('peak_viewers', Value(peak)),
+    )
+    return True
+
+
+def maybe_flush(stream_id):
+    """
+    Flush a stream at most once per STREAM_COUNTER_FLUSH_INTERVAL,
+    whichever worker gets there first.
+    """
+    acquired = redis_client.set(
+        f"stream:{stream_id}:counters:flushed",
+        1,
+        nx=True,
+        ex=settings.STREAM_COUNTER_FLUSH_INTERVAL,
+    )
+    if acquired:
+        return flush(stream_id)
+    return False
+
+
+def flush_all(batch_size=500):
+    """Flush every stream whose counters changed since the last flush"""
+    flushed = 0
+    while True:
+        stream_ids = redis_client.spop(DIRTY_KEY, batch_size)
+        if not stream_ids:
+            return flushed
+        for stream_id in stream_ids:
+            if flush(stream_id):
+                flushed += 1
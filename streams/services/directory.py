@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Precomputed "live now" directory.
+
+The list of live streams only changes on go_live()/end_stream(), so it is
+rebuilt on those transitions and kept in the cache; readers never query
+LiveStream. Viewer counts are overlaid from the Redis counters on read.
+"""
+
+from django.core.cache import cache
+from streams.services import counters
+
+
+SNAPSHOT_KEY = 'streams:directory:live'
+
+
+def rebuild():
+    """Recompute the snapshot from the (status, -created_at) index"""
+    from streams.models import LiveStream
+
+    rows = LiveStream.objects.filter(status='live').order_by('-created_at').values(
+        'id', 'title', 'created_by__name', 'stream_mode', 'viewer_count',
+        'playback_url', 'started_at',
+    )
+    snapshot = [
+        {
+            'id': str(row['id']),
+            'title': row['title'],
+            'creator_name': row['created_by__name'],
+            'stream_mode': row['stream_mode'],
+            'viewer_count': row['viewer_count'],
+            'playback_url': row['playback_url'],
+            'started_at': row['started_at'].isoformat() if row['started_at'] else None,
+        }
+        for row in rows
+    ]
+    cache.set(SNAPSHOT_KEY, snapshot, timeout=None)
+    return snapshot
+
+
+def live_streams():
+    """Live streams with their current viewer counts"""
+    snapshot = cache.get(SNAPSHOT_KEY)
+    if snapshot is None:
+        snapshot = rebuild()
+
+    live = counters.get_many([entry['id'] for entry in snapshot])
+    for entry in snapshot:
+        if entry['id'] in live:
+            entry['viewer_count'] = live[entry['id']][0]
+    return snapshot
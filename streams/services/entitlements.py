@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Cached answers to "may this user watch this stream".
+
+Each stream has a Redis set of entitled user ids (owner and buyers), with
+sentinel members telling that the set is loaded and whether the stream is
+free. A check is a single SMISMEMBER. On a cold set one caller loads it
+from the database while concurrent callers wait for it instead of all
+hitting Postgres.
+"""
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from users.core.redis import redis_client
+
+
+LOADED = '__loaded__'
+FREE = '__free__'
+
+LOAD_LOCK_TIMEOUT = 10
+LOAD_WAIT = 0.5
+
+# Record a grant (ARGV[2]) for loads in progress and add it to the set
+# if loaded; a cold set gets it on load
+_GRANT = redis_client.register_script("""
+redis.call('SADD', KEYS[2], ARGV[2])
+redis.call('EXPIRE', KEYS[2], ARGV[3])
+if redis.call('SISMEMBER', KEYS[1], ARGV[1]) == 1 then
+    redis.call('SADD', KEYS[1], ARGV[2])
+end
+return 1
+""")
+
+# Swap a freshly built set in, with the grants made while it was built
+_PUBLISH = redis_client.register_script("""
+if redis.call('EXISTS', KEYS[3]) == 1 then
+    redis.call('SUNIONSTORE', KEYS[1], KEYS[1], KEYS[3])
+end
+redis.call('RENAME', KEYS[1], KEYS[2])
+redis.call('EXPIRE', KEYS[2], ARGV[1])
+return 1
+""")
+
+
+def _key(stream_id):
+    return f"stream:{stream_id}:entitled"
+
+
+def _grants_key(stream_id):
+    return f"stream:{stream_id}:entitled:grants"
+
+
+def is_entitled(stream_id, user_id=None):
+    """Check a user (None for anonymous) against the cached set"""
+    members = [LOADED, FREE] + ([str(user_id)] if user_id else [])
+    loaded, free, *user = redis_client.smismember(_key(stream_id), members)
+    if not loaded:
+        if not warm(stream_id, wait=True):
+            return _check_database(stream_id, user_id)
+        loaded, free, *user = redis_client.smismember(_key(stream_id), members)
+    return bool(free or (user and user[0]))
+
+
+def warm(stream_id, wait=False):
+    """
+    Load the set of a stream unless it is being loaded already.
+    With wait, give the loading caller a moment. Returns True once loaded.
+    """
+    from streams.models import LiveStream, StreamEntitlement
+
+    lock = redis_client.lock(f"{_key(stream_id)}:loading", timeout=LOAD_LOCK_TIMEOUT)
+    if not lock.acquire(blocking=wait, blocking_timeout=LOAD_WAIT):
+        return False
+
+    try:
+        if wait and redis_client.sismember(_key(stream_id), LOADED):
+            return True  # Loaded by the caller we waited for
+
+        stream = LiveStream.objects.filter(pk=stream_id).values(
+            'is_paid', 'created_by_id'
+        ).first()
+        if stream is None:
+            return False
+
+        members = [LOADED, str(stream['created_by_id'])]
+        if not stream['is_paid']:
+            members.append(FREE)
+        members += [
+            str(user_id) for user_id in StreamEntitlement.objects.filter(
+                stream_id=stream_id
+            ).values_list('user_id', flat=True).iterator()
+        ]
+
+        # Built aside then renamed: grants committed after the read above
+        # are recorded in the grants key and merged in by the swap
+        building = f"{_key(stream_id)}:building"
+        pipe = redis_client.pipeline()
+        pipe.delete(building)
+        for start in range(0, len(members), 10000):
+            pipe.sadd(building, *members[start:start + 10000])
+        pipe.execute()
+        _PUBLISH(keys=[building, _key(stream_id), _grants_key(stream_id)],
+                 args=[settings.STREAM_ENTITLEMENT_TTL])
+        return True
+    finally:
+        lock.release()
+
+
+def grant(stream_id, user_id, source='purchase'):
+    """Entitle a user to a stream, visible to checks once committed"""
+    from streams.models import StreamEntitlement
+
+    _, created = StreamEntitlement.objects.get_or_create(
+        stream_id=stream_id, user_id=user_id, defaults={'source': source}
+    )
+    transaction.on_commit(lambda: _GRANT(
+        keys=[_key(stream_id), _grants_key(stream_id)],
+        args=[LOADED, str(user_id), LOAD_LOCK_TIMEOUT * 2],
+    ))
+    return created
+
+
+def invalidate(stream_id):
+    redis_client.delete(_key(stream_id))
+
+
+def _check_database(stream_id, user_id):
+    from streams.models import LiveStream
+
+    allowed = Q(is_paid=False)
+    if user_id:
+        allowed |= Q(created_by_id=user_id) | Q(entitlements__user_id=user_id)
+    return LiveStream.objects.filter(allowed, pk=stream_id).exists()
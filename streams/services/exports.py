@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Constant-memory exports of viewer sessions for billing.
+
+Rows are read in (joined_at, id) order through a server-side cursor and
+rendered one line at a time. Every line carries the cursor token of its
+row, so an interrupted download resumes right after the last line the
+client received.
+"""
+
+import base64
+import csv
+import io
+import json
+import uuid
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+
+FIELDS = [
+    'session_id', 'viewer_id', 'viewer_name', 'joined_at', 'left_at',
+    'duration_seconds', 'ip_address', 'user_agent',
+]
+
+
+def encode_cursor(joined_at, row_id):
+    raw = json.dumps([joined_at.isoformat(), str(row_id)]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Return (joined_at, id), ValueError on a malformed token"""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        joined_at, row_id = json.loads(raw)
+        joined_at = parse_datetime(joined_at)
+        row_id = uuid.UUID(row_id)
+    except (AttributeError, TypeError, ValueError) as exc:
+        raise ValueError("Invalid cursor.") from exc
+    if joined_at is None:
+        raise ValueError("Invalid cursor.")
+    return joined_at, row_id
+
+
+def iter_sessions(stream_id, since=None, until=None, cursor=None, chunk_size=2000):
+    """Yield session rows of a stream, live and archived, oldest first"""
+    from streams.models import StreamViewer, StreamViewerArchive
+
+    filters = Q(stream_id=stream_id)
+    if since:
+        filters &= Q(joined_at__gte=since)
+    if until:
+        filters &= Q(joined_at__lt=until)
+    if cursor:
+        joined_at, row_id = decode_cursor(cursor)
+        filters &= Q(joined_at__gt=joined_at) | Q(joined_at=joined_at, id__gt=row_id)
+
+    hot, archived = (
+        model.objects.filter(filters).values(
+            'id', 'session_id', 'viewer_id', 'viewer__name', 'joined_at', 'left_at',
+            'duration_seconds', 'ip_address', 'user_agent',
+        )
+        for model in (StreamViewer, StreamViewerArchive)
+    )
+    rows = hot.union(archived, all=True).order_by('joined_at', 'id')
+    for row in rows.iterator(chunk_size=chunk_size):
+        yield {
+            'session_id': str(row['session_id']),
+            'viewer_id': row['viewer_id'],
+            'viewer_name': row['viewer__name'],
+            'joined_at': row['joined_at'].isoformat(),
+            'left_at': row['left_at'].isoformat() if row['left_at'] else None,
+            'duration_seconds': row['duration_seconds'],
+            'ip_address': row['ip_address'],
+            'user_agent': row['user_agent'],
+            'cursor': encode_cursor(row['joined_at'], row['id']),
+        }
+
+
+def render_ndjson(rows):
+    for row in rows:
+        yield json.dumps(row) + '\n'
+
+
+def render_csv(rows):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=FIELDS + ['cursor'])
+    writer.writeheader()
+    for row in rows:
+        writer.writerow(row)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+RENDERERS = {
+    'ndjson': (render_ndjson, 'application/x-ndjson'),
+    'csv': (render_csv, 'text/csv'),
+}
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Viewer heartbeats kept in Redis, and the reaper closing silent sessions.
+
+Each stream has a sorted set of its open sessions scored by the last
+heartbeat timestamp, so a heartbeat is a single ZADD and never touches
+the database.
+"""
+
+import time
+from datetime import datetime, timezone as dt_timezone
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import (
+    Case, DateTimeField, DurationField, ExpressionWrapper, F,
+    IntegerField, Value, When,
+)
+from django.db.models.functions import Cast, Ceil, Extract, Greatest
+from streams.services import counters, ingestion, rollups
+from users.core.redis import redis_client
+
+
+STREAMS_KEY = 'streams:heartbeats'
+INFLIGHT_KEY = 'streams:heartbeats:inflight'
+LOCK_KEY = 'streams:heartbeats:lock'
+
+LOCK_TIMEOUT = 300
+
+# Move up to ARGV[2] sessions last seen before ARGV[1] to the in-flight
+# hash (session -> "stream|last seen"), return how many were moved
+_POP_EXPIRED = redis_client.register_script("""
+local expired = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1],
+                           'WITHSCORES', 'LIMIT', 0, ARGV[2])
+for i = 1, #expired, 2 do
+    redis.call('ZREM', KEYS[1], expired[i])
+    redis.call('HSET', KEYS[3], expired[i], ARGV[3] .. '|' .. expired[i + 1])
+end
+if redis.call('ZCARD', KEYS[1]) == 0 then
+    redis.call('SREM', KEYS[2], ARGV[3])
+end
+return #expired / 2
+""")
+
+
+def _key(stream_id):
+    return f"stream:{stream_id}:heartbeats"
+
+
+def start(stream_id, session_id):
+    """Register a new viewer session"""
+    pipe = redis_client.pipeline()
+    pipe.zadd(_key(stream_id), {str(session_id): time.time()})
+    pipe.sadd(STREAMS_KEY, str(stream_id))
+    pipe.execute()
+
+
+def beat(stream_id, session_id):
+    """Refresh a session, False if it is unknown or was already reaped"""
+    return bool(redis_client.zadd(
+        _key(stream_id), {str(session_id): time.time()}, xx=True, ch=True
+    ))
+
+
+def end(stream_id, session_id):
+    """Forget a session, True if it was still open"""
+    return bool(redis_client.zrem(_key(stream_id), str(session_id)))
+
+
+def active_count(stream_id):
+    return redis_client.zcard(_key(stream_id))
+
+
+def reap(timeout=None, batch_size=1000):
+    """
+    Close every session whose last heartbeat is older than timeout.
+    Returns the number of sessions closed, 0 if another reaper is running.
+
+    Expired sessions are first moved to an in-flight hash and only removed
+    from it once their rows are closed, so a reaper that dies mid-way
+    leaves them to the next run.
+    """
+    timeout = timeout or settings.STREAM_HEARTBEAT_TIMEOUT
+    cutoff = time.time() - timeout
+    lock = redis_client.lock(LOCK_KEY, timeout=LOCK_TIMEOUT)
+    if not lock.acquire(blocking=False):
+        return 0
+
+    try:
+        for stream_id in redis_client.smembers(STREAMS_KEY):
+            while _POP_EXPIRED(
+                keys=[_key(stream_id), STREAMS_KEY, INFLIGHT_KEY],
+                args=[cutoff, batch_size, stream_id],
+            ) == batch_size:
+                pass
+
+        # Joins of the popped sessions may still be waiting in the buffer
+        ingestion.drain()
+
+        sessions = {}
+        for session_id, value in redis_client.hgetall(INFLIGHT_KEY).items():
+            stream_id, seen = value.split('|')
+            sessions.setdefault(stream_id, {})[session_id] = datetime.fromtimestamp(
+                float(seen), tz=dt_timezone.utc
+            )
+
+        reaped = 0
+        for stream_id, last_seen in sessions.items():
+            items = list(last_seen.items())
+            for start in range(0, len(items), batch_size):
+                _close(stream_id, dict(items[start:start + batch_size]))
+            reaped += len(items)
+        return reaped
+    finally:
+        lock.release()
+
+
+def _close(stream_id, last_seen):
+    """Close in-flight sessions of a stream at their last heartbeat"""
+    from streams.models import StreamViewer
+
+    left_at = Case(
+        *[When(session_id=session_id, then=Value(seen))
+          for session_id, seen in last_seen.items()],
+        output_field=DateTimeField(),
+    )
+    watched = ExpressionWrapper(left_at - F('joined_at'), output_field=DurationField())
+
+    with transaction.atomic():
+        closing = list(StreamViewer.objects.select_for_update().filter(
+            session_id__in=list(last_seen), left_at__isnull=True
+        ).values_list('id', flat=True))
+        StreamViewer.objects.filter(id__in=closing).update(
+            left_at=left_at,
+            duration_seconds=Greatest(
+                Value(0), Cast(Ceil(Extract(watched, 'epoch')), IntegerField())
+            ),
+        )
+        rollups.record_sessions(StreamViewer.objects.filter(
+            id__in=closing
+        ).values_list('stream_id', 'joined_at', 'left_at'))
+
+    redis_client.hdel(INFLIGHT_KEY, *last_seen)
+    counters.decrement(stream_id, len(last_seen))
+    counters.maybe_flush(stream_id)
+
+
+def close_ended(stream_ids):
+    """
+    Close every session still open on the ended streams among stream_ids
+    at the time their stream ended, and forget their heartbeats.
+    Returns the number of sessions closed.
+    """
+    from streams.models import LiveStream, StreamViewer
+
+    stream_ids = [str(stream_id) for stream_id in stream_ids]
+    # Joins of these streams may still be waiting in the buffer
+    ingestion.drain()
+
+    sql = f"""
+        UPDATE {StreamViewer._meta.db_table} v SET
+            left_at = GREATEST(s.ended_at, v.joined_at),
+            duration_seconds = GREATEST(
+                0, CEIL(EXTRACT(EPOCH FROM s.ended_at - v.joined_at))
+            )::integer
+        FROM {LiveStream._meta.db_table} s
+        WHERE v.stream_id = s.id AND s.id = ANY(%s::uuid[])
+          AND s.status = 'ended' AND v.left_at IS NULL
+        RETURNING v.stream_id, v.joined_at, v.left_at
+    """
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [stream_ids])
+            closed = cursor.fetchall()
+        rollups.record_sessions(closed)
+
+    ended = [str(pk) for pk in LiveStream.objects.filter(
+        pk__in=stream_ids, status='ended'
+    ).values_list('pk', flat=True)]
+    if ended:
+        pipe = redis_client.pipeline()
+        pipe.delete(*[_key(stream_id) for stream_id in ended])
+        pipe.srem(STREAMS_KEY, *ended)
+        pipe.execute()
+    return len(closed)
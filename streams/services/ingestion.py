@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Buffered ingestion of StreamViewer join/leave events.
+
+Events are pushed to a Redis list on the request path and persisted in
+batches with bulk_create / bulk_update, either by the request that fills
+a batch, once per STREAM_VIEWER_FLUSH_INTERVAL, or by the
+process_viewer_events worker. A batch is moved to an in-flight list
+before being written and only removed once committed, so a worker that
+dies mid-flush leaves it to be replayed by the next flush. Replays are
+harmless: joins are inserted with ignore_conflicts and leaves only touch
+sessions that are still open.
+"""
+
+import json
+import time
+import uuid
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from streams.services import rollups
+from users.core.redis import redis_client
+
+
+QUEUE_KEY = 'streams:viewer_events'
+INFLIGHT_KEY = 'streams:viewer_events:inflight'
+STATS_KEY = 'streams:viewer_events:stats'
+FLUSH_LOCK_KEY = 'streams:viewer_events:lock'
+FLUSH_GATE_KEY = 'streams:viewer_events:flushed'
+
+FLUSH_LOCK_TIMEOUT = 60
+
+# Move up to ARGV[1] events from the queue to the in-flight list
+_CLAIM = redis_client.register_script("""
+local items = redis.call('LRANGE', KEYS[1], 0, tonumber(ARGV[1]) - 1)
+if #items > 0 then
+    redis.call('LTRIM', KEYS[1], #items, -1)
+    for i = 1, #items, 1000 do
+        redis.call('RPUSH', KEYS[2], unpack(items, i, math.min(i + 999, #items)))
+    end
+end
+return items
+""")
+
+
+def record_join(stream_id, viewer_id=None, ip_address=None, user_agent='',
+                session_id=None, joined_at=None):
+    """Buffer a viewer join and return its session id"""
+    session_id = str(session_id or uuid.uuid4())
+    _enqueue({
+        'type': 'join',
+        'id': str(uuid.uuid4()),
+        'session_id': session_id,
+        'stream_id': str(stream_id),
+        'viewer_id': viewer_id,
+        'ip_address': ip_address,
+        'user_agent': (user_agent or '')[:255],
+        'at': (joined_at or timezone.now()).isoformat(),
+    })
+    return session_id
+
+
+def record_leave(session_id, left_at=None):
+    """Buffer a viewer leave for a session"""
+    _enqueue({
+        'type': 'leave',
+        'session_id': str(session_id),
+        'at': (left_at or timezone.now()).isoformat(),
+    })
+
+
+def _enqueue(event):
+    pipe = redis_client.pipeline()
+    pipe.rpush(QUEUE_KEY, json.dumps(event))
+    pipe.hincrby(STATS_KEY, 'enqueued', 1)
+    depth, _ = pipe.execute()
+
+    if depth >= settings.STREAM_VIEWER_BUFFER_MAX:
+        # Backpressure: producers help with one batch, never wait for the
+        # whole queue (skipped when another flush holds the lock)
+        redis_client.hincrby(STATS_KEY, 'backpressure', 1)
+        flush()
+    elif depth >= settings.STREAM_VIEWER_BATCH_SIZE or redis_client.set(
+        FLUSH_GATE_KEY, 1, nx=True, ex=settings.STREAM_VIEWER_FLUSH_INTERVAL
+    ):
+        flush()
+
+
+def flush(batch_size=None):
+    """
+    Persist one batch of buffered events.
+    Returns the number of events handled, 0 if another flush is running.
+    """
+    batch_size = batch_size or settings.STREAM_VIEWER_BATCH_SIZE
+    lock = redis_client.lock(FLUSH_LOCK_KEY, timeout=FLUSH_LOCK_TIMEOUT)
+    if not lock.acquire(blocking=False):
+        return 0
+
+    try:
+        # Replay whatever a crashed flush left behind before claiming more
+        raw_events = redis_client.lrange(INFLIGHT_KEY, 0, -1)
+        if not raw_events:
+            raw_events = _CLAIM(keys=[QUEUE_KEY, INFLIGHT_KEY], args=[batch_size])
+        if not raw_events:
+            return 0
+
+        started = time.monotonic()
+        dropped = _persist([json.loads(raw) for raw in raw_events])
+
+        pipe = redis_client.pipeline()
+        pipe.delete(INFLIGHT_KEY)
+        pipe.hincrby(STATS_KEY, 'flushed', len(raw_events))
+        pipe.hincrby(STATS_KEY, 'batches', 1)
+        pipe.hincrby(STATS_KEY, 'dropped', dropped)
+        pipe.hset(STATS_KEY, mapping={
+            'last_flush_at': timezone.now().isoformat(),
+            'last_flush_ms': round((time.monotonic() - started) * 1000, 2),
+            'last_batch_size': len(raw_events),
+        })
+        pipe.execute()
+        return len(raw_events)
+    finally:
+        lock.release()
+
+
+def drain(batch_size=None):
+    """Flush until the buffer is empty, e.g. on graceful shutdown"""
+    total = 0
+    while True:
+        handled = flush(batch_size)
+        if not handled:
+            if redis_client.llen(QUEUE_KEY) or redis_client.llen(INFLIGHT_KEY):
+                time.sleep(0.05)  # Another worker holds the lock
+                continue
+            return total
+        total += handled
+
+
+def stats():
+    """Buffer depth and flush/backpressure counters"""
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.llen(QUEUE_KEY)
+    pipe.llen(INFLIGHT_KEY)
+    pipe.hgetall(STATS_KEY)
+    depth, inflight, counters = pipe.execute()
+
+    result = {
+        'depth': depth,
+        'inflight': inflight,
+        'buffer_max': settings.STREAM_VIEWER_BUFFER_MAX,
+    }
+    for name in ('enqueued', 'flushed', 'batches', 'dropped', 'backpressure'):
+        result[name] = int(counters.get(name, 0))
+    result['last_flush_at'] = counters.get('last_flush_at')
+    result['last_flush_ms'] = float(counters.get('last_flush_ms', 0))
+    result['last_batch_size'] = int(counters.get('last_batch_size', 0))
+    return result
+
+
+def _persist(events):
+    """Write a batch in one transaction, return how many events were dropped"""
+    from streams.models import LiveStream, StreamViewer
+
+    joins = [event for event in events if event['type'] == 'join']
+    leaves = {}
+    for event in events:
+        if event['type'] == 'leave':
+            leaves[event['session_id']] = parse_datetime(event['at'])
+
+    # Joins for deleted streams or users would fail the whole batch
+    stream_ids = {
+        str(pk) for pk in LiveStream.objects.filter(
+            pk__in={event['stream_id'] for event in joins}
+        ).values_list('pk', flat=True)
+    }
+    viewer_ids = set(get_user_model().objects.filter(
+        pk__in={event['viewer_id'] for event in joins if event['viewer_id']}
+    ).values_list('pk', flat=True))
+
+    viewers = [
+        StreamViewer(
+            id=event['id'],
+            session_id=event['session_id'],
+            stream_id=event['stream_id'],
+            viewer_id=event['viewer_id'] if event['viewer_id'] in viewer_ids else None,
+            ip_address=event['ip_address'],
+            user_agent=event['user_agent'],
+            joined_at=parse_datetime(event['at']),
+        )
+        for event in joins if event['stream_id'] in stream_ids
+    ]
+    dropped = len(joins) - len(viewers)
+
+    with transaction.atomic():
+        StreamViewer.objects.bulk_create(viewers, ignore_conflicts=True)
+
+        if leaves:
+            closed = list(StreamViewer.objects.select_for_update().filter(
+                session_id__in=list(leaves), left_at__isnull=True
+            ).only('id', 'session_id', 'stream', 'joined_at'))
+            for viewer in closed:
+                viewer.left_at = max(leaves[str(viewer.session_id)], viewer.joined_at)
+                viewer.duration_seconds = StreamViewer.session_seconds(
+                    viewer.joined_at, viewer.left_at
+                )
+            StreamViewer.objects.bulk_update(
+                closed, ['left_at', 'duration_seconds'], batch_size=1000
+            )
+            rollups.record_sessions(
+                (viewer.stream_id, viewer.joined_at, viewer.left_at) for viewer in closed
+            )
+            dropped += len(leaves) - len(closed)
+
+    return dropped
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+stream_key -> (stream id, status, mode) lookups for the ingest callbacks.
+
+Lookups go through a process-local LRU, then Redis, then the database.
+Local entries live STREAM_KEY_LOCAL_TTL seconds, which bounds how long
+another process may miss an invalidation; Redis entries are dropped as
+soon as a key is rotated or its stream ends, and so are the local entries
+of the process doing it. Redis entries also expire after
+STREAM_KEY_REDIS_TTL seconds, and a value read from the database is only
+written back if no key was forgotten meanwhile (generation counter).
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+from users.core.redis import redis_client
+
+
+KEY_PREFIX = 'streams:stream_key:'
+GENERATION_KEY = 'streams:stream_keys:generation'
+
+# Cache ARGV[1] for key KEYS[1] (reverse entry KEYS[2]) unless the
+# generation KEYS[3] moved past ARGV[3] since the database was read
+_STORE_IF_CURRENT = redis_client.register_script("""
+if (redis.call('GET', KEYS[3]) or '0') ~= ARGV[3] then
+    return 0
+end
+redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[2])
+redis.call('SET', KEYS[2], ARGV[4], 'EX', ARGV[2])
+return 1
+""")
+
+# Drop the cached key of a stream (reverse entry KEYS[1]) and bump the generation
+_FORGET = redis_client.register_script("""
+redis.call('INCR', KEYS[2])
+local stream_key = redis.call('GET', KEYS[1])
+if stream_key then
+    redis.call('DEL', ARGV[1] .. stream_key, KEYS[1])
+end
+return stream_key
+""")
+
+def _cache_key(stream_key):
+    return f"{KEY_PREFIX}{stream_key}"
+
+
+def _id_key(stream_id):
+    return f"streams:stream_key_of:{stream_id}"
+
+
+class LocalCache:
+    """Thread-safe LRU whose entries expire after `ttl` seconds"""
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def pop(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def discard(self, predicate):
+        """Drop the entries whose value matches predicate"""
+        with self.lock:
+            for key in [key for key, (_, value) in self.entries.items() if predicate(value)]:
+                del self.entries[key]
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+local_cache = LocalCache(settings.STREAM_KEY_CACHE_SIZE, settings.STREAM_KEY_LOCAL_TTL)
+
+
+def resolve(stream_key):
+    """Return (stream_id, status, stream_mode), or None for an unknown key"""
+    from streams.models import LiveStream
+
+    found = local_cache.get(stream_key)
+    if found is not None:
+        return found
+
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.get(_cache_key(stream_key))
+    pipe.get(GENERATION_KEY)
+    cached, generation = pipe.execute()
+    if cached is not None:
+        found = tuple(cached.split('|'))
+    else:
+        row = LiveStream.objects.filter(stream_key=stream_key).values_list(
+            'pk', 'status', 'stream_mode'
+        ).first()
+        if row is None:
+            return None  # Unknown keys are not cached, they are never reused
+        found = (str(row[0]), row[1], row[2])
+        if not _STORE_IF_CURRENT(
+            keys=[_cache_key(stream_key), _id_key(found[0]), GENERATION_KEY],
+            args=['|'.join(found), settings.STREAM_KEY_REDIS_TTL, generation or '0', stream_key],
+        ):
+            return found  # Possibly stale already: not cached anywhere
+
+    local_cache.set(stream_key, found)
+    return found
+
+
+def store(stream_key, stream_id, status, stream_mode):
+    """Record a status change made by this process in both tiers"""
+    found = (str(stream_id), status, stream_mode)
+    pipe = redis_client.pipeline()
+    pipe.set(_cache_key(stream_key), '|'.join(found), ex=settings.STREAM_KEY_REDIS_TTL)
+    pipe.set(_id_key(found[0]), stream_key, ex=settings.STREAM_KEY_REDIS_TTL)
+    pipe.execute()
+    local_cache.set(stream_key, found)
+
+
+def invalidate(stream_key):
+    """Forget a key, e.g. once rotated"""
+    pipe = redis_client.pipeline()
+    pipe.incr(GENERATION_KEY)
+    pipe.delete(_cache_key(stream_key))
+    pipe.execute()
+    local_cache.pop(stream_key)
+
+
+def forget(stream_id):
+    """Forget whatever key of a stream is cached, e.g. once it ended"""
+    stream_id = str(stream_id)
+    _FORGET(keys=[_id_key(stream_id), GENERATION_KEY], args=[KEY_PREFIX])
+    local_cache.discard(lambda found: found[0] == stream_id)
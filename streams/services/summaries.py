@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Per-stream totals stored in StreamSummary.
+
+Summaries are computed by one INSERT ... SELECT over the live and
+archived sessions of a batch of streams, so they stay exact whichever
+part of the sessions has already been archived. Sessions still open on
+an ended stream are closed at its end first, so they count with the
+time actually watched. Ending a stream queues
+its summary; the build_stream_summaries worker computes queued
+summaries in batches, off the request path.
+"""
+
+from django.db import connection
+from streams.services import heartbeats
+from users.core.redis import redis_client
+
+
+PENDING_KEY = 'streams:summaries:pending'
+
+SESSION_COLUMNS = ['stream_id', 'viewer_id', 'session_id', 'duration_seconds']
+
+
+def compute_many(stream_ids):
+    """Compute and store the summaries of streams, return how many"""
+    from streams.models import LiveStream, StreamSummary, StreamViewer, StreamViewerArchive
+
+    stream_ids = [str(stream_id) for stream_id in stream_ids]
+    if not stream_ids:
+        return 0
+    heartbeats.close_ended(stream_ids)
+
+    columns = ', '.join(SESSION_COLUMNS)
+    sql = f"""
+        INSERT INTO {StreamSummary._meta.db_table} (
+            stream_id, sessions, unique_viewers, anonymous_sessions,
+            total_watch_seconds, avg_watch_seconds, peak_viewers, computed_at
+        )
+        SELECT
+            s.id,
+            COUNT(v.session_id),
+            COUNT(DISTINCT v.viewer_id),
+            COUNT(v.session_id) FILTER (WHERE v.viewer_id IS NULL),
+            COALESCE(SUM(v.duration_seconds), 0),
+            COALESCE(AVG(v.duration_seconds), 0),
+            s.peak_viewers,
+            NOW()
+        FROM {LiveStream._meta.db_table} s
+        LEFT JOIN (
+            SELECT {columns} FROM {StreamViewer._meta.db_table}
+            WHERE stream_id = ANY(%s::uuid[])
+            UNION ALL
+            SELECT {columns} FROM {StreamViewerArchive._meta.db_table}
+            WHERE stream_id = ANY(%s::uuid[])
+        ) v ON v.stream_id = s.id
+        WHERE s.id = ANY(%s::uuid[])
+        GROUP BY s.id
+        ON CONFLICT (stream_id) DO UPDATE SET
+            sessions = EXCLUDED.sessions,
+            unique_viewers = EXCLUDED.unique_viewers,
+            anonymous_sessions = EXCLUDED.anonymous_sessions,
+            total_watch_seconds = EXCLUDED.total_watch_seconds,
+            avg_watch_seconds = EXCLUDED.avg_watch_seconds,
+            peak_viewers = EXCLUDED.peak_viewers,
+            computed_at = EXCLUDED.computed_at
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [stream_ids, stream_ids, stream_ids])
+        return cursor.rowcount
+
+
+def compute(stream_id):
+    """Compute and store the summary of one stream"""
+    return compute_many([stream_id]) == 1
+
+
+def enqueue(stream_id):
+    redis_client.sadd(PENDING_KEY, str(stream_id))
+
+
+def build_pending(batch_size=200):
+    """Compute every queued summary, batch by batch"""
+    built = 0
+    while True:
+        stream_ids = redis_client.spop(PENDING_KEY, batch_size)
+        if not stream_ids:
+            return built
+        try:
+            built += compute_many(stream_ids)
+        except Exception:
+            redis_client.sadd(PENDING_KEY, *stream_ids)  # Retried next run
+            raise
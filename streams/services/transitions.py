@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+LiveStream lifecycle transitions as single guarded UPDATEs.
+
+Each transition is `UPDATE ... WHERE id = ? AND status IN (...)`, so when
+several workers handle the same callback exactly one of them wins, in one
+round trip and without loading the row. The winner sends
+stream_transitioned; losers get False and nothing else happens. Going
+live also requires, in the same WHERE, what LiveStream.validate_live_config
+checks, so callers that skip the model cannot bring up a broken stream.
+"""
+
+from django.db.models import Q, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+from streams.services import counters
+
+
+# Allowed source statuses of each target status
+SOURCES = {
+    'live': ('idle',),
+    'ended': ('idle', 'live'),
+}
+
+# LiveStream.validate_live_config as a filter
+LIVE_READY = (
+    Q(stream_mode='obs', ingest_endpoint__gt='', playback_url__gt='')
+    | Q(stream_mode='webcam', webrtc_session_id__gt='')
+    | ~Q(stream_mode__in=['obs', 'webcam'])
+)
+
+
+def transition(stream_id, status, condition=Q(), **values):
+    """Move a stream to `status` if its current status (and `condition`) allows it"""
+    from streams.models import LiveStream
+    from streams.signals import stream_transitioned
+
+    won = LiveStream.objects.filter(
+        condition, pk=stream_id, status__in=SOURCES[status]
+    ).update(status=status, **values) == 1
+    if won:
+        stream_transitioned.send(
+            sender=LiveStream, stream_id=stream_id, status=status, at=timezone.now()
+        )
+    return won
+
+
+def go_live(stream_id, started_at=None):
+    return transition(
+        stream_id, 'live', LIVE_READY, started_at=started_at or timezone.now(), viewer_count=0
+    )
+
+
+def end(stream_id, ended_at=None):
+    # Keep the peak reached while the counters lived in Redis
+    live = counters.get_counts(stream_id)
+    return transition(
+        stream_id, 'ended',
+        ended_at=ended_at or timezone.now(),
+        viewer_count=0,
+        peak_viewers=Greatest('peak_viewers', Value(live[1] if live else 0)),
+    )
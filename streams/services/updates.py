@@ -0,0 +1,25 @@
+#!/usr/bin/env python3
+"""Publish live stream updates for the push channel"""
+
+import json
+from users.core.redis import redis_client
+
+
+# Every process holds one subscription on this channel and fans out locally
+CHANNEL = 'streams:updates'
+
+
+def status_key(stream_id):
+    return f"stream:{stream_id}:status"
+
+
+def publish_status(stream_id, status, viewer_count=None):
+    """Record and broadcast a lifecycle change"""
+    update = {'stream': str(stream_id), 'status': status}
+    if viewer_count is not None:
+        update['viewer_count'] = viewer_count
+
+    pipe = redis_client.pipeline()
+    pipe.set(status_key(stream_id), status, ex=86400)
+    pipe.publish(CHANNEL, json.dumps(update))
+    pipe.execute()
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Idempotent ingestion of Mux live stream webhooks.
+
+The endpoint only verifies the signature and, in one Redis round trip,
+marks the event id as seen (SET NX EX) and queues it; Mux retries of an
+event already seen are acknowledged and dropped. The
+process_stream_webhooks worker applies the queue in batches: events are
+grouped per Mux live stream, repeated states collapsed, matched to
+LiveStream rows on channel_arn in one query and applied in order as
+guarded transitions, so replaying a batch is harmless.
+"""
+
+import hashlib
+import hmac
+import json
+import time
+from django.conf import settings
+from streams.services import transitions
+from users.core.redis import redis_client
+
+
+QUEUE_KEY = 'streams:webhooks'
+INFLIGHT_KEY = 'streams:webhooks:inflight'
+STATS_KEY = 'streams:webhooks:stats'
+LOCK_KEY = 'streams:webhooks:lock'
+
+LOCK_TIMEOUT = 60
+
+# Mux live stream event types and the status they move a stream to
+EVENT_STATUSES = {
+    'video.live_stream.active': 'live',
+    'video.live_stream.idle': 'ended',
+    'video.live_stream.disabled': 'ended',
+}
+
+# Queue ARGV[1] unless event id KEYS[1] was already seen
+_ACCEPT = redis_client.register_script("""
+if not redis.call('SET', KEYS[1], 1, 'NX', 'EX', ARGV[2]) then
+    redis.call('HINCRBY', KEYS[3], 'duplicates', 1)
+    return 0
+end
+redis.call('RPUSH', KEYS[2], ARGV[1])
+redis.call('HINCRBY', KEYS[3], 'accepted', 1)
+return 1
+""")
+
+# Move up to ARGV[1] events from the queue to the in-flight list
+_CLAIM = redis_client.register_script("""
+local items = redis.call('LRANGE', KEYS[1], 0, tonumber(ARGV[1]) - 1)
+if #items > 0 then
+    redis.call('LTRIM', KEYS[1], #items, -1)
+    for i = 1, #items, 1000 do
+        redis.call('RPUSH', KEYS[2], unpack(items, i, math.min(i + 999, #items)))
+    end
+end
+return items
+""")
+
+
+def verify_signature(body, header, secret=None, tolerance=None, now=None):
+    """Check a `Mux-Signature: t=<timestamp>,v1=<hmac>` header"""
+    secret = secret or settings.MUX_WEBHOOK_SECRET
+    tolerance = tolerance or settings.MUX_WEBHOOK_TOLERANCE
+    if not secret or not header:
+        return False
+
+    parts = dict(part.split('=', 1) for part in header.split(',') if '=' in part)
+    try:
+        timestamp = int(parts['t'])
+    except (KeyError, ValueError):
+        return False
+    if abs((now or time.time()) - timestamp) > tolerance:
+        return False
+
+    expected = hmac.new(
+        secret.encode(), f"{timestamp}.".encode() + body, hashlib.sha256
+    ).hexdigest()
+    return hmac.compare_digest(expected, parts.get('v1', ''))
+
+
+def accept(event):
+    """Queue an event unless already seen, return whether it was queued"""
+    # Only what apply_batch needs is queued
+    data = event.get('data') or {}
+    queued = {
+        'id': event['id'],
+        'type': event['type'],
+        'created_at': event.get('created_at', ''),
+        'live_stream_id': data.get('id'),
+    }
+    return bool(_ACCEPT(
+        keys=[f"streams:webhooks:seen:{event['id']}", QUEUE_KEY, STATS_KEY],
+        args=[json.dumps(queued), settings.STREAM_WEBHOOK_DEDUPE_TTL],
+    ))
+
+
+def apply_batch(batch_size=None):
+    """
+    Apply one batch of queued events.
+    Returns the number of events handled, 0 if another worker is applying.
+    """
+    batch_size = batch_size or settings.STREAM_WEBHOOK_BATCH_SIZE
+    lock = redis_client.lock(LOCK_KEY, timeout=LOCK_TIMEOUT)
+    if not lock.acquire(blocking=False):
+        return 0
+
+    try:
+        # Replay whatever a crashed worker left behind before claiming more
+        raw_events = redis_client.lrange(INFLIGHT_KEY, 0, -1)
+        if not raw_events:
+            raw_events = _CLAIM(keys=[QUEUE_KEY, INFLIGHT_KEY], args=[batch_size])
+        if not raw_events:
+            return 0
+
+        applied = _apply([json.loads(raw) for raw in raw_events])
+
+        pipe = redis_client.pipeline()
+        pipe.delete(INFLIGHT_KEY)
+        pipe.hincrby(STATS_KEY, 'processed', len(raw_events))
+        pipe.hincrby(STATS_KEY, 'transitions', applied)
+        pipe.execute()
+        return len(raw_events)
+    finally:
+        lock.release()
+
+
+def drain(batch_size=None):
+    """Apply until the queue is empty"""
+    total = 0
+    while True:
+        handled = apply_batch(batch_size)
+        if not handled:
+            if redis_client.llen(QUEUE_KEY) or redis_client.llen(INFLIGHT_KEY):
+                time.sleep(0.05)  # Another worker holds the lock
+                continue
+            return total
+        total += handled
+
+
+def stats():
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.llen(QUEUE_KEY)
+    pipe.hgetall(STATS_KEY)
+    depth, counters = pipe.execute()
+
+    result = {'depth': depth}
+    for name in ('accepted', 'duplicates', 'processed', 'transitions'):
+        result[name] = int(counters.get(name, 0))
+    return result
+
+
+def _apply(events):
+    """Apply the state events of each Mux live stream in order, return wins"""
+    from streams.models import LiveStream
+
+    sequences = {}
+    for event in sorted(events, key=lambda event: event['created_at']):
+        if event['type'] in EVENT_STATUSES and event['live_stream_id']:
+            sequence = sequences.setdefault(event['live_stream_id'], [])
+            target = EVENT_STATUSES[event['type']]
+            if not sequence or sequence[-1] != target:
+                sequence.append(target)
+
+    streams = LiveStream.objects.filter(
+        channel_arn__in=list(sequences)
+    ).values_list('pk', 'channel_arn', 'status')
+
+    applied = 0
+    for stream_id, channel_arn, current in streams:
+        for target in sequences[channel_arn]:
+            # An idle event for a stream that never went live is not an end
+            if target == 'ended' and current != 'live':
+                continue
+            if target == 'live':
+                won = transitions.go_live(stream_id)
+            else:
+                won = transitions.end(stream_id)
+            if won:
+                current = target
+                applied += 1
+    return applied
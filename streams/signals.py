@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""Streams signals"""
+
+from django.db import transaction
+from django.dispatch import Signal, receiver
+from streams.services import (
+    counters, directory, entitlements, stream_keys, summaries, updates,
+)
+
+
+# Sent once per won lifecycle transition, with stream_id, status and at
+stream_transitioned = Signal()
+
+
+@receiver(stream_transitioned)
+def reset_live_counters(sender, stream_id, status, **kwargs):
+    counters.reset(stream_id)
+
+
+@receiver(stream_transitioned)
+def refresh_live_views(sender, stream_id, status, **kwargs):
+    transaction.on_commit(directory.rebuild)
+    transaction.on_commit(lambda: updates.publish_status(stream_id, status, 0))
+
+
+@receiver(stream_transitioned)
+def warm_entitlements(sender, stream_id, status, **kwargs):
+    if status == 'live':
+        transaction.on_commit(lambda: entitlements.warm(stream_id))
+    else:
+        transaction.on_commit(lambda: entitlements.invalidate(stream_id))
+
+
+@receiver(stream_transitioned)
+def forget_stream_key(sender, stream_id, status, **kwargs):
+    if status == 'ended':
+        transaction.on_commit(lambda: stream_keys.forget(stream_id))
+
+
+@receiver(stream_transitioned)
+def queue_summary(sender, stream_id, status, **kwargs):
+    if status == 'ended':
+        transaction.on_commit(lambda: summaries.enqueue(stream_id))
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Server-Sent Events push channel for live stream updates.
+
+Each ASGI process keeps a single Redis pub/sub subscription and fans the
+updates out to its connected clients, so the Redis cost grows with the
+number of processes, not of viewers. Updates for a client are merged
+and sent at most STREAM_PUSH_MAX_RATE times per second. Nothing here
+reads the database.
+"""
+
+import asyncio
+import json
+import re
+from collections import defaultdict
+from django.conf import settings
+from streams.services import counters, updates
+from users.core.redis import get_async_redis_client
+
+
+PATH_RE = re.compile(r'^/api/streams/(?P<stream_id>[0-9a-f-]{36})/events/$')
+
+
+class Subscription:
+    """Latest known state of a stream for one client, coalesced"""
+
+    def __init__(self, stream_id, max_rate):
+        self.stream_id = stream_id
+        self.interval = 1 / max_rate if max_rate else 0
+        self.state = {}
+        self.pending = asyncio.Event()
+        self.last_sent = 0
+
+    def push(self, update):
+        self.state.update(update)
+        self.pending.set()
+
+    async def next(self):
+        """Wait for the next merged update, honouring the rate limit"""
+        await self.pending.wait()
+        loop = asyncio.get_running_loop()
+        delay = self.last_sent + self.interval - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)  # Updates arriving meanwhile are merged
+
+        self.pending.clear()
+        self.last_sent = loop.time()
+        return dict(self.state)
+
+
+class StreamUpdateHub:
+    """One Redis subscription per process, fanned out to subscriptions"""
+
+    def __init__(self, max_rate=None):
+        self.max_rate = max_rate or settings.STREAM_PUSH_MAX_RATE
+        self.subscriptions = defaultdict(set)
+        self.redis = None
+        self.listener = None
+        self.starting = asyncio.Lock()
+
+    async def subscribe(self, stream_id):
+        async with self.starting:
+            if self.listener is None or self.listener.done():
+                await self.start()
+
+        subscription = Subscription(stream_id, self.max_rate)
+        subscription.push(await self.snapshot(stream_id))
+        self.subscriptions[stream_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        subscribers = self.subscriptions.get(subscription.stream_id)
+        if subscribers is not None:
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self.subscriptions[subscription.stream_id]
+
+    async def start(self):
+        self.redis = get_async_redis_client()
+        pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+        await pubsub.subscribe(updates.CHANNEL)
+        self.listener = asyncio.create_task(self.listen(pubsub))
+
+    async def stop(self):
+        if self.listener is not None:
+            self.listener.cancel()
+            try:
+                await self.listener
+            except asyncio.CancelledError:
+                pass
+        if self.redis is not None:
+            await self.redis.aclose()
+
+    async def listen(self, pubsub):
+        try:
+            async for message in pubsub.listen():
+                update = json.loads(message['data'])
+                stream_id = update.pop('stream')
+                for subscription in self.subscriptions.get(stream_id, ()):
+                    subscription.push(update)
+        finally:
+            await pubsub.aclose()
+
+    async def snapshot(self, stream_id):
+        """Current values from Redis to greet a new subscriber"""
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.hmget(counters._key(stream_id), 'viewers', 'peak')
+        pipe.get(updates.status_key(stream_id))
+        (viewers, peak), status = await pipe.execute()
+        return {
+            'status': status,
+            'viewer_count': int(viewers or 0),
+            'peak_viewers': int(peak or 0),
+        }
+
+
+hub = None
+
+
+async def sse_application(scope, receive, send):
+    """ASGI app serving /api/streams/<id>/events/ as text/event-stream"""
+    global hub
+    if hub is None:
+        hub = StreamUpdateHub()
+
+    stream_id = PATH_RE.match(scope['path'])['stream_id']
+    subscription = await hub.subscribe(stream_id)
+
+    await send({
+        'type': 'http.response.start',
+        'status': 200,
+        'headers': [
+            (b'content-type', b'text/event-stream'),
+            (b'cache-control', b'no-cache'),
+            (b'x-accel-buffering', b'no'),
+        ],
+    })
+
+    async def forward():
+        while True:
+            update = await subscription.next()
+            await send({
+                'type': 'http.response.body',
+                'body': f"data: {json.dumps(update)}\n\n".encode(),
+                'more_body': True,
+            })
+
+    async def disconnected():
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+
+    sender = asyncio.create_task(forward())
+    watcher = asyncio.create_task(disconnected())
+    try:
+        await asyncio.wait({sender, watcher}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        sender.cancel()
+        watcher.cancel()
+        hub.unsubscribe(subscription)
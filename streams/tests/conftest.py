@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Fixtures partagées des tests streams : faux fournisseur Mux
+"""
+
+import hashlib
+import hmac
+import json
+import time
+import uuid
+import pytest
+from pathlib import Path
+from rest_framework.test import APIClient
+
+from users.core.redis import redis_client
+
+
+RECORDED_WEBHOOKS = Path(__file__).parent / 'fixtures' / 'mux_webhooks.json'
+WEBHOOK_SECRET = 'test-mux-webhook-secret'
+
+
+class FakeMuxProvider:
+    """Rejoue des webhooks Mux enregistrés, signés comme le ferait Mux"""
+
+    def __init__(self, client, secret=WEBHOOK_SECRET):
+        self.client = client
+        self.secret = secret
+        self.recorded = {
+            event['type']: event for event in json.loads(RECORDED_WEBHOOKS.read_text())
+        }
+
+    def event(self, event_type, live_stream_id, event_id=None, stream_key='key'):
+        payload = json.dumps(self.recorded[event_type])
+        for name, value in (('live_stream_id', live_stream_id),
+                            ('event_id', event_id or str(uuid.uuid4())),
+                            ('stream_key', stream_key)):
+            payload = payload.replace('{%s}' % name, value)
+        return json.loads(payload)
+
+    def sign(self, body, timestamp=None):
+        timestamp = int(timestamp or time.time())
+        digest = hmac.new(
+            self.secret.encode(), f"{timestamp}.".encode() + body, hashlib.sha256
+        ).hexdigest()
+        return f"t={timestamp},v1={digest}"
+
+    def send(self, event, signature=None):
+        body = json.dumps(event).encode()
+        return self.client.post(
+            '/api/streams/webhooks/mux/',
+            data=body,
+            content_type='application/json',
+            HTTP_MUX_SIGNATURE=signature or self.sign(body),
+        )
+
+    def replay(self, events, times=1):
+        """Envoie chaque événement `times` fois, comme les retries Mux"""
+        return [self.send(event) for event in events for _ in range(times)]
+
+
+@pytest.fixture
+def mux(settings):
+    settings.MUX_WEBHOOK_SECRET = WEBHOOK_SECRET
+    for pattern in ('streams:webhooks*',):
+        keys = list(redis_client.scan_iter(pattern))
+        if keys:
+            redis_client.delete(*keys)
+    return FakeMuxProvider(APIClient())
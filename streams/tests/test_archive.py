@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Tests de l'archivage des sessions et des résumés de streams
+"""
+
+import pytest
+from datetime import timedelta
+from django.core.management import call_command
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from streams.models import (
+    LiveStream, StreamMinuteRollup, StreamSummary, StreamViewer, StreamViewerArchive,
+)
+from streams.services import archive, exports
+
+
+@pytest.fixture
+def artist_user(db, django_user_model):
+    """Créer un utilisateur avec le rôle artist"""
+    return django_user_model.objects.create_user(
+        email='artist@test.com',
+        password='testpass123',
+        name='Test Artist',
+        role='artist'
+    )
+
+
+def make_ended_stream(user, title, ended_days_ago, sessions):
+    ended_at = timezone.now() - timedelta(days=ended_days_ago)
+    stream = LiveStream.objects.create(created_by=user, title=title)
+    LiveStream.objects.filter(pk=stream.pk).update(
+        status='ended', ended_at=ended_at, peak_viewers=3
+    )
+    StreamViewer.objects.bulk_create([
+        StreamViewer(
+            stream=stream,
+            viewer=viewer,
+            joined_at=ended_at - timedelta(hours=1, seconds=-index),
+            left_at=ended_at - timedelta(hours=1, seconds=-index - duration),
+            duration_seconds=duration,
+        )
+        for index, (viewer, duration) in enumerate(sessions)
+    ])
+    return stream
+
+
+@pytest.mark.django_db
+class TestArchival:
+    """Tests du job d'archivage"""
+
+    def test_old_streams_are_summarised_and_moved(self, artist_user):
+        """Test que les sessions anciennes sont résumées puis archivées"""
+        old = make_ended_stream(artist_user, 'Old', 40, [
+            (artist_user, 60), (artist_user, 120), (None, 300), (None, 120), (None, 0),
+        ])
+        recent = make_ended_stream(artist_user, 'Recent', 1, [(None, 60)])
+
+        call_command('archive_stream_viewers', chunk_size=2, stdout=None)
+
+        assert not StreamViewer.objects.filter(stream=old).exists()
+        assert StreamViewerArchive.objects.filter(stream=old).count() == 5
+        assert StreamViewer.objects.filter(stream=recent).count() == 1
+
+        summary = StreamSummary.objects.get(stream=old)
+        assert summary.sessions == 5
+        assert summary.unique_viewers == 1
+        assert summary.anonymous_sessions == 3
+        assert summary.total_watch_seconds == 600
+        assert summary.avg_watch_seconds == 120
+        assert summary.peak_viewers == 3
+        assert summary.archived_at is not None
+
+    def test_archived_sessions_stay_readable(self, artist_user):
+        """Test que l'export et le backfill lisent aussi l'archive"""
+        stream = make_ended_stream(artist_user, 'Billing', 40, [(artist_user, 90), (None, 30)])
+        call_command('archive_stream_viewers', stdout=None)
+
+        rows = list(exports.iter_sessions(stream.pk))
+        assert [row['duration_seconds'] for row in rows] == [90, 30]
+        assert rows[0]['viewer_name'] == 'Test Artist'
+
+        call_command('backfill_stream_rollups', stream=str(stream.pk), stdout=None)
+        assert StreamMinuteRollup.objects.filter(stream=stream).exists()
+
+    def test_rerun_is_a_noop(self, artist_user):
+        """Test qu'une seconde exécution ne change rien"""
+        stream = make_ended_stream(artist_user, 'Twice', 40, [(None, 60)])
+        call_command('archive_stream_viewers', stdout=None)
+        first = StreamSummary.objects.get(stream=stream).archived_at
+
+        call_command('archive_stream_viewers', stdout=None)
+
+        assert StreamSummary.objects.get(stream=stream).archived_at == first
+        assert StreamViewerArchive.objects.filter(stream=stream).count() == 1
+
+    def test_conflicting_row_is_not_lost(self, artist_user):
+        """Test qu'une session déjà archivée fait échouer le lot sans la supprimer"""
+        stream = make_ended_stream(artist_user, 'Conflict', 40, [(None, 60)])
+        viewer = StreamViewer.objects.get(stream=stream)
+        StreamViewerArchive.objects.create(id=viewer.id, stream=stream, session_id=viewer.session_id,
+                                           joined_at=viewer.joined_at)
+
+        with pytest.raises(IntegrityError), transaction.atomic():
+            archive.archive_stream(stream.pk)
+
+        assert StreamViewer.objects.filter(pk=viewer.pk).exists()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Tests unitaires pour streams/services/counters.py
+"""
+
+import pytest
+
+from streams.models import LiveStream
+from streams.services import counters
+
+
+@pytest.fixture
+def artist_user(db, django_user_model):
+    """Créer un utilisateur avec le rôle artist"""
+    return django_user_model.objects.create_user(
+        email='artist@test.com',
+        password='testpass123',
+        name='Test Artist',
+        role='artist'
+    )
+
+
+@pytest.fixture
+def live_stream(db, artist_user):
+    """Créer un stream live"""
+    stream = LiveStream.objects.create(
+        created_by=artist_user,
+        title='Counter Stream',
+        stream_mode='obs',
+        ingest_endpoint='rtmp://test.com/ingest',
+        playback_url='https://test.com/playback.m3u8',
+    )
+    stream.go_live()
+    yield stream
+    counters.reset(stream.pk)
+
+
+@pytest.mark.django_db
+class TestViewerCounters:
+    """Tests des compteurs de viewers dans Redis"""
+
+    def test_increment_tracks_peak(self, live_stream):
+        """Test que le peak suit le maximum atteint"""
+        assert counters.increment(live_stream.pk, 3) == (3, 3)
+        assert counters.decrement(live_stream.pk, 2) == (1, 3)
+        assert counters.get_counts(live_stream.pk) == (1, 3)
+
+    def test_decrement_never_negative(self, live_stream):
+        """Test que le compteur ne devient jamais négatif"""
+        assert counters.decrement(live_stream.pk, 5) == (0, 0)
+
+    def test_seed_from_database_values(self, live_stream):
+        """Test que le compteur est initialisé depuis la base"""
+        assert counters.increment(live_stream.pk, 1, seed=(4, 10)) == (5, 10)
+
+    def test_instances_share_the_counter(self, live_stream):
+        """Test que deux instances (workers) ne perdent pas d'incréments"""
+        other = LiveStream.objects.get(pk=live_stream.pk)
+
+        live_stream.increment_viewers()
+        other.increment_viewers()
+
+        assert other.viewer_count == 2
+        assert live_stream.live_counts() == (2, 2)
+
+    def test_flush_writes_row(self, live_stream):
+        """Test que flush écrit les compteurs dans la base"""
+        counters.increment(live_stream.pk, 7)
+        counters.decrement(live_stream.pk, 2)
+
+        assert counters.flush_all() >= 1
+
+        live_stream.refresh_from_db()
+        assert live_stream.viewer_count == 5
+        assert live_stream.peak_viewers == 7
+
+    def test_end_stream_keeps_peak(self, live_stream):
+        """Test que end_stream conserve le peak de Redis"""
+        counters.increment(live_stream.pk, 12)
+
+        live_stream.end_stream()
+        live_stream.refresh_from_db()
+
+        assert live_stream.viewer_count == 0
+        assert live_stream.peak_viewers == 12
+        assert counters.get_counts(live_stream.pk) is None
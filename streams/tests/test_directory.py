@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Tests de l'annuaire des streams live et de l'archive
+"""
+
+import pytest
+from django.core.cache import cache
+from rest_framework.test import APIClient
+
+from streams.models import LiveStream
+from streams.services import counters, directory
+
+
+@pytest.fixture(autouse=True)
+def clear_snapshot():
+    cache.delete(directory.SNAPSHOT_KEY)
+    yield
+    cache.delete(directory.SNAPSHOT_KEY)
+
+
+@pytest.fixture
+def artist_user(db, django_user_model):
+    """Créer un utilisateur avec le rôle artist"""
+    return django_user_model.objects.create_user(
+        email='artist@test.com',
+        password='testpass123',
+        name='Test Artist',
+        role='artist'
+    )
+
+
+def make_stream(user, title):
+    return LiveStream.objects.create(
+        created_by=user,
+        title=title,
+        ingest_endpoint='rtmp://test.com/ingest',
+        playback_url='https://test.com/playback.m3u8',
+    )
+
+
+@pytest.mark.django_db
+class TestLiveNowDirectory:
+    """Tests de l'endpoint live now"""
+
+    def test_snapshot_follows_transitions(self, artist_user,
+                                          django_capture_on_commit_callbacks):
+        """Test que le snapshot est reconstruit sur go_live/end_stream"""
+        stream = make_stream(artist_user, 'Live Concert')
+        with django_capture_on_commit_callbacks(execute=True):
+            stream.go_live()
+
+        live = directory.live_streams()
+        assert [entry['title'] for entry in live] == ['Live Concert']
+        assert live[0]['creator_name'] == 'Test Artist'
+
+        with django_capture_on_commit_callbacks(execute=True):
+            stream.end_stream()
+
+        assert directory.live_streams() == []
+
+    def test_live_endpoint_does_not_query_database(self, artist_user,
+                                                   django_assert_num_queries,
+                                                   django_capture_on_commit_callbacks):
+        """Test que la lecture ne touche pas la base et lit les compteurs live"""
+        stream = make_stream(artist_user, 'Busy Concert')
+        with django_capture_on_commit_callbacks(execute=True):
+            stream.go_live()
+        counters.increment(stream.pk, 42)
+
+        with django_assert_num_queries(0):
+            response = APIClient().get('/api/streams/live/')
+
+        assert response.status_code == 200
+        assert response.data['count'] == 1
+        assert response.data['results'][0]['viewer_count'] == 42
+        counters.reset(stream.pk)
+
+
+@pytest.mark.django_db
+class TestEndedStreamsArchive:
+    """Tests de l'archive paginée par curseur"""
+
+    def test_cursor_pagination(self, artist_user):
+        """Test le parcours de l'archive page par page"""
+        for index in range(3):
+            stream = make_stream(artist_user, f'Ended {index}')
+            stream.go_live()
+            stream.end_stream()
+        make_stream(artist_user, 'Still idle')
+
+        client = APIClient()
+        first = client.get('/api/streams/ended/?page_size=2')
+        second = client.get(first.data['next'])
+
+        titles = [row['title'] for row in first.data['results'] + second.data['results']]
+        assert titles == ['Ended 2', 'Ended 1', 'Ended 0']
+        assert second.data['next'] is None
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Tests des droits d'accès aux streams payants
+"""
+
+import threading
+import pytest
+from rest_framework.test import APIClient
+
+from streams.models import LiveStream
+from streams.services import counters, entitlements, heartbeats
+
+
+@pytest.fixture
+def artist_user(db, django_user_model):
+    """Créer un utilisateur avec le rôle artist"""
+    return django_user_model.objects.create_user(
+        email='artist@test.com',
+        password='testpass123',
+        name='Test Artist',
+        role='artist'
+    )
+
+
+@pytest.fixture
+def fan_user(db, django_user_model):
+    """Créer un utilisateur avec le rôle fan"""
+    return django_user_model.objects.create_user(
+        email='fan@test.com',
+        password='testpass123',
+        name='Test Fan',
+        role='fan'
+    )
+
+
+@pytest.fixture
+def paid_stream(db, artist_user):
+    stream = LiveStream.objects.create(
+        created_by=artist_user,
+        title='Paid Concert',
+        is_paid=True,
+        ticket_price=10,
+        ingest_endpoint='rtmp://test.com/ingest',
+        playback_url='https://test.com/playback.m3u8',
+    )
+    yield stream
+    entitlements.invalidate(stream.pk)
+    entitlements.redis_client.delete(entitlements._grants_key(stream.pk))
+
+
+@pytest.mark.django_db
+class TestEntitlementChecks:
+    """Tests du service d'entitlements"""
+
+    def test_warm_set_answers_without_database(self, paid_stream, artist_user, fan_user,
+                                               django_assert_num_queries):
+        """Test qu'un set chaud répond sans toucher Postgres"""
+        entitlements.warm(paid_stream.pk)
+
+        with django_assert_num_queries(0):
+            assert entitlements.is_entitled(paid_stream.pk, artist_user.id)
+            assert not entitlements.is_entitled(paid_stream.pk, fan_user.id)
+            assert not entitlements.is_entitled(paid_stream.pk, None)
+
+    def test_grant_is_visible_after_commit(self, paid_stream, fan_user,
+                                           django_capture_on_commit_callbacks):
+        """Test qu'un achat ouvre l'accès sans recharger le set"""
+        entitlements.warm(paid_stream.pk)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            assert entitlements.grant(paid_stream.pk, fan_user.id) is True
+
+        assert entitlements.is_entitled(paid_stream.pk, fan_user.id)
+
+    def test_grant_during_load_is_kept(self, paid_stream, fan_user, monkeypatch,
+                                       django_capture_on_commit_callbacks):
+        """Test qu'un achat validé pendant un chargement n'est pas perdu"""
+        publish = entitlements._PUBLISH
+
+        def grant_then_publish(keys, args):
+            # Committed after the load read the database, before the swap
+            with django_capture_on_commit_callbacks(execute=True):
+                entitlements.grant(paid_stream.pk, fan_user.id)
+            return publish(keys=keys, args=args)
+
+        monkeypatch.setattr(entitlements, '_PUBLISH', grant_then_publish)
+        assert entitlements.warm(paid_stream.pk)
+
+        assert entitlements.is_entitled(paid_stream.pk, fan_user.id)
+
+    def test_cold_miss_loads_from_database(self, paid_stream, fan_user):
+        """Test le chargement à froid depuis la base"""
+        entitlements.grant(paid_stream.pk, fan_user.id)
+        entitlements.invalidate(paid_stream.pk)
+
+        assert entitlements.is_entitled(paid_stream.pk, fan_user.id)
+        assert entitlements.is_entitled(paid_stream.pk, 999999) is False
+
+    def test_free_stream_is_open_to_everyone(self, artist_user):
+        """Test qu'un stream gratuit est ouvert aux anonymes"""
+        stream = LiveStream.objects.create(created_by=artist_user, title='Free')
+
+        assert entitlements.is_entitled(stream.pk, None)
+
+    def test_cold_load_is_single_flight(self, paid_stream, fan_user):
+        """Test qu'un seul appelant charge un set froid"""
+        lock = entitlements.redis_client.lock(
+            f"stream:{paid_stream.pk}:entitled:loading", timeout=5, thread_local=False
+        )
+        lock.acquire()
+        released = threading.Timer(0.1, lock.release)
+        released.start()
+        try:
+            # The lock holder finishes without loading: the waiter loads it
+            assert entitlements.warm(paid_stream.pk, wait=True)
+        finally:
+            released.join()
+
+        assert entitlements.is_entitled(paid_stream.pk, fan_user.id) is False
+
+
+@pytest.mark.django_db
+class TestEntitlementEnforcement:
+    """Tests des endpoints join/heartbeat sur un stream payant"""
+
+    def test_join_requires_entitlement(self, paid_stream, fan_user,
+                                       django_capture_on_commit_callbacks):
+        """Test qu'un fan sans ticket ne peut pas rejoindre"""
+        with django_capture_on_commit_callbacks(execute=True):
+            paid_stream.go_live()
+        client = APIClient()
+        client.force_authenticate(fan_user)
+
+        refused = client.post(f'/api/streams/{paid_stream.pk}/join/')
+        with django_capture_on_commit_callbacks(execute=True):
+            entitlements.grant(paid_stream.pk, fan_user.id)
+        accepted = client.post(f'/api/streams/{paid_stream.pk}/join/')
+
+        assert refused.status_code == 403
+        assert accepted.status_code == 201
+        heartbeats.end(paid_stream.pk, accepted.data['session_id'])
+        counters.reset(paid_stream.pk)
+
+    def test_heartbeat_requires_entitlement(self, paid_stream):
+        """Test qu'un anonyme ne peut pas envoyer de heartbeat"""
+        response = APIClient().post(f'/api/streams/{paid_stream.pk}/heartbeat/',
+                                    {'session_id': str(paid_stream.pk)}, format='json')
+
+        assert response.status_code == 403
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Tests de l'export des sessions de visionnage
+"""
+
+import base64
+import csv
+import io
+import json
+import pytest
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.core.management import call_command
+from rest_framework.test import APIClient
+
+from streams.models import LiveStream, StreamViewer
+from streams.services import exports
+
+
+START = datetime(2025, 6, 1, 20, 0, tzinfo=dt_timezone.utc)
+
+
+@pytest.fixture
+def artist_user(db, django_user_model):
+    """Créer un utilisateur avec le rôle artist"""
+    return django_user_model.objects.create_user(
+        email='artist@test.com',
+        password='testpass123',
+        name='Test Artist',
+        role='artist'
+    )
+
+
+@pytest.fixture
+def stream(db, artist_user):
+    stream = LiveStream.objects.create(created_by=artist_user, title='Paid Stream')
+    StreamViewer.objects.bulk_create([
+        StreamViewer(
+            stream=stream,
+            viewer=artist_user if minute == 0 else None,
+            ip_address='10.0.0.1',
+            user_agent='Test Agent',
+            joined_at=START + timedelta(minutes=minute),
+            left_at=START + timedelta(minutes=minute + 5),
+            duration_seconds=300,
+        )
+        for minute in range(5)
+    ])
+    return stream
+
+
+def _read(response):
+    return b''.join(response.streaming_content).decode()
+
+
+@pytest.mark.django_db
+class TestExportService:
+    """Tests du service d'export"""
+
+    def test_rows_are_ordered_and_filtered(self, stream):
+        """Test l'ordre chronologique et le filtre par période"""
+        rows = list(exports.iter_sessions(
+            stream.pk,
+            since=START + timedelta(minutes=1),
+            until=START + timedelta(minutes=4),
+            chunk_size=2,
+        ))
+
+        assert [row['joined_at'] for row in rows] == [
+            (START + timedelta(minutes=minute)).isoformat() for minute in (1, 2, 3)
+        ]
+
+    def test_resume_from_cursor(self, stream):
+        """Test la reprise d'un export interrompu"""
+        rows = list(exports.iter_sessions(stream.pk))
+
+        resumed = list(exports.iter_sessions(stream.pk, cursor=rows[1]['cursor']))
+
+        assert resumed == rows[2:]
+
+    def test_invalid_cursor(self):
+        """Test qu'un curseur invalide est refusé"""
+        forged = [
+            ['2026-01-01T00:00:00+00:00', 'notauuid'],
+            [12, '6f1c2a8e-3d4b-4c5a-9e7f-0a1b2c3d4e5f'],
+            ['2026-01-01T00:00:00+00:00', 12],
+        ]
+        tokens = ['not-a-cursor'] + [
+            base64.urlsafe_b64encode(json.dumps(value).encode()).decode() for value in forged
+        ]
+        for token in tokens:
+            with pytest.raises(ValueError):
+                exports.decode_cursor(token)
+
+
+@pytest.mark.django_db
+class TestExportEndpoint:
+    """Tests de l'endpoint d'export"""
+
+    def test_owner_downloads_ndjson(self, stream, artist_user):
+        """Test l'export NDJSON en streaming"""
+        client = APIClient()
+        client.force_authenticate(artist_user)
+
+        response = client.get(f'/api/streams/{stream.pk}/viewers/export/')
+
+        assert response.status_code == 200
+        assert response.streaming
+        lines = [json.loads(line) for line in _read(response).splitlines()]
+        assert len(lines) == 5
+        assert lines[0]['viewer_name'] == 'Test Artist'
+        assert lines[0]['duration_seconds'] == 300
+
+    def test_owner_downloads_csv(self, stream, artist_user):
+        """Test l'export CSV"""
+        client = APIClient()
+        client.force_authenticate(artist_user)
+
+        response = client.get(f'/api/streams/{stream.pk}/viewers/export/?output=csv')
+
+        rows = list(csv.DictReader(io.StringIO(_read(response))))
+        assert response['Content-Type'] == 'text/csv'
+        assert len(rows) == 5
+        assert rows[0]['ip_address'] == '10.0.0.1'
+
+    def test_invalid_cursor_is_rejected(self, stream, artist_user):
+        """Test qu'un curseur invalide renvoie une erreur 400"""
+        client = APIClient()
+        client.force_authenticate(artist_user)
+
+        response = client.get(f'/api/streams/{stream.pk}/viewers/export/?cursor=abc')
+
+        assert response.status_code == 400
+
+    def test_other_user_is_rejected(self, stream, django_user_model):
+        """Test qu'un autre utilisateur ne peut pas exporter"""
+        fan = django_user_model.objects.create_user(
+            email='fan@test.com', password='testpass123', name='Fan', role='fan'
+        )
+        client = APIClient()
+        client.force_authenticate(fan)
+
+        response = client.get(f'/api/streams/{stream.pk}/viewers/export/')
+
+        assert response.status_code == 403
+
+
+@pytest.mark.django_db
+def test_export_command(stream, tmp_path):
+    """Test la commande d'export vers un fichier"""
+    target = tmp_path / 'viewers.csv'
+
+    call_command('export_stream_viewers', str(stream.pk), output='csv', file=str(target))
+
+    assert len(target.read_text().splitlines()) == 6
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Tests des sessions viewers (join/heartbeat/leave) et du reaper
+"""
+
+import time
+import uuid
+import pytest
+from datetime import timedelta
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from streams.models import LiveStream, StreamViewer
+from streams.services import counters, heartbeats, ingestion
+from users.core.redis import redis_client
+
+
+@pytest.fixture(autouse=True)
+def clear_heartbeats():
+    """Le reaper parcourt tous les streams : oublier ceux des autres tests"""
+    keys = list(redis_client.scan_iter('stream:*:heartbeats'))
+    redis_client.delete(heartbeats.STREAMS_KEY, heartbeats.INFLIGHT_KEY, *keys)
+
+
+@pytest.fixture
+def artist_user(db, django_user_model):
+    """Créer un utilisateur avec le rôle artist"""
+    return django_user_model.objects.create_user(
+        email='artist@test.com',
+        password='testpass123',
+        name='Test Artist',
+        role='artist'
+    )
+
+
+@pytest.fixture
+def live_stream(db, artist_user):
+    """Créer un stream live"""
+    stream = LiveStream.objects.create(
+        created_by=artist_user,
+        title='Heartbeat Stream',
+        ingest_endpoint='rtmp://test.com/ingest',
+        playback_url='https://test.com/playback.m3u8',
+    )
+    stream.go_live()
+    yield stream
+    counters.reset(stream.pk)
+    redis_client.delete(heartbeats._key(stream.pk))
+
+
+@pytest.fixture
+def client():
+    return APIClient()
+
+
+def join(client, stream):
+    response = client.post(f'/api/streams/{stream.pk}/join/')
+    assert response.status_code == 201
+    return response.data['session_id']
+
+
+@pytest.mark.django_db
+class TestViewerSessions:
+    """Tests des endpoints de session viewer"""
+
+    def test_join_counts_viewer(self, client, live_stream):
+        """Test qu'un join incrémente le compteur live"""
+        join(client, live_stream)
+
+        assert counters.get_counts(live_stream.pk) == (1, 1)
+        assert heartbeats.active_count(live_stream.pk) == 1
+
+    def test_join_requires_live_stream(self, client, artist_user):
+        """Test qu'on ne rejoint pas un stream inactif"""
+        stream = LiveStream.objects.create(created_by=artist_user, title='Idle')
+
+        response = client.post(f'/api/streams/{stream.pk}/join/')
+
+        assert response.status_code == 404
+
+    def test_heartbeat_known_session(self, client, live_stream):
+        """Test heartbeat d'une session ouverte"""
+        session_id = join(client, live_stream)
+
+        response = client.post(f'/api/streams/{live_stream.pk}/heartbeat/',
+                               {'session_id': session_id}, format='json')
+
+        assert response.status_code == 204
+
+    def test_heartbeat_unknown_session(self, client, live_stream):
+        """Test heartbeat d'une session inconnue ou expirée"""
+        response = client.post(f'/api/streams/{live_stream.pk}/heartbeat/',
+                               {'session_id': str(uuid.uuid4())}, format='json')
+
+        assert response.status_code == 410
+
+    def test_leave_is_counted_once(self, client, live_stream):
+        """Test qu'un double leave ne décrémente qu'une fois"""
+        join(client, live_stream)
+        session_id = join(client, live_stream)
+
+        for _ in range(2):
+            client.post(f'/api/streams/{live_stream.pk}/leave/',
+                        {'session_id': session_id}, format='json')
+        ingestion.drain()
+
+        assert counters.get_counts(live_stream.pk) == (1, 2)
+        assert StreamViewer.objects.get(session_id=session_id).left_at is not None
+
+
+@pytest.mark.django_db
+class TestStaleSessionReaper:
+    """Tests du reaper des sessions silencieuses"""
+
+    def test_reap_closes_expired_sessions(self, client, live_stream):
+        """Test que le reaper ferme les sessions sans heartbeat"""
+        stale = join(client, live_stream)
+        fresh = join(client, live_stream)
+        ingestion.drain()
+        StreamViewer.objects.filter(session_id=stale).update(
+            joined_at=timezone.now() - timedelta(seconds=300)
+        )
+        last_seen = time.time() - 120
+        redis_client.zadd(heartbeats._key(live_stream.pk), {stale: last_seen})
+
+        assert heartbeats.reap(timeout=45) == 1
+
+        viewer = StreamViewer.objects.get(session_id=stale)
+        assert viewer.left_at is not None
+        assert abs(viewer.left_at.timestamp() - last_seen) < 1
+        assert 179 <= viewer.duration_seconds <= 181
+        assert StreamViewer.objects.get(session_id=fresh).is_active
+        assert counters.get_counts(live_stream.pk) == (1, 2)
+
+    def test_join_still_buffered_is_closed(self, client, live_stream):
+        """Test qu'une session dont le join est encore dans le buffer est bien fermée"""
+        redis_client.set(ingestion.FLUSH_GATE_KEY, 1, ex=60)  # Pas de flush au join
+        session_id = join(client, live_stream)
+        redis_client.zadd(heartbeats._key(live_stream.pk), {session_id: time.time() - 120})
+        assert StreamViewer.objects.filter(session_id=session_id).count() == 0
+
+        assert heartbeats.reap(timeout=45) == 1
+
+        assert StreamViewer.objects.get(session_id=session_id).left_at is not None
+
+    def test_sessions_left_in_flight_are_closed_next_run(self, client, live_stream):
+        """Test que les sessions d'un reaper tombé sont reprises"""
+        session_id = join(client, live_stream)
+        ingestion.drain()
+        redis_client.zrem(heartbeats._key(live_stream.pk), session_id)
+        redis_client.hset(heartbeats.INFLIGHT_KEY, session_id, f"{live_stream.pk}|{time.time() - 60}")
+
+        assert heartbeats.reap(timeout=45) == 1
+
+        assert StreamViewer.objects.get(session_id=session_id).left_at is not None
+        assert not redis_client.hexists(heartbeats.INFLIGHT_KEY, session_id)
+
+    def test_reaped_session_cannot_heartbeat(self, client, live_stream):
+        """Test qu'une session fermée par le reaper doit rejoindre à nouveau"""
+        session_id = join(client, live_stream)
+        redis_client.zadd(heartbeats._key(live_stream.pk), {session_id: 0})
+        heartbeats.reap(timeout=45)
+
+        assert heartbeats.beat(live_stream.pk, session_id) is False
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Tests unitaires pour streams/services/ingestion.py
+"""
+
+import json
+import uuid
+import pytest
+from datetime import timedelta
+from django.utils import timezone
+
+from streams.models import LiveStream, StreamViewer
+from streams.services import ingestion
+from users.core.redis import redis_client
+
+
+@pytest.fixture(autouse=True)
+def clean_buffer(settings):
+    """Vider le buffer et désactiver le flush périodique"""
+    settings.STREAM_VIEWER_BATCH_SIZE = 100
+    keys = [ingestion.QUEUE_KEY, ingestion.INFLIGHT_KEY, ingestion.STATS_KEY]
+    redis_client.delete(*keys)
+    redis_client.set(ingestion.FLUSH_GATE_KEY, 1, ex=3600)
+    yield
+    redis_client.delete(ingestion.FLUSH_GATE_KEY, *keys)
+
+
+@pytest.fixture
+def artist_user(db, django_user_model):
+    """Créer un utilisateur avec le rôle artist"""
+    return django_user_model.objects.create_user(
+        email='artist@test.com',
+        password='testpass123',
+        name='Test Artist',
+        role='artist'
+    )
+
+
+@pytest.fixture
+def live_stream(db, artist_user):
+    """Créer un stream de base"""
+    return LiveStream.objects.create(created_by=artist_user, title='Buffered Stream')
+
+
+@pytest.mark.django_db
+class TestViewerEventIngestion:
+    """Tests de l'ingestion par lots des join/leave"""
+
+    def test_joins_are_buffered_until_flush(self, live_stream):
+        """Test que les joins ne touchent pas la base avant le flush"""
+        joined_at = timezone.now() - timedelta(minutes=5)
+        session_id = ingestion.record_join(live_stream.pk, ip_address='10.0.0.1',
+                                           joined_at=joined_at)
+
+        assert not StreamViewer.objects.exists()
+        assert ingestion.flush() == 1
+
+        viewer = StreamViewer.objects.get(session_id=session_id)
+        assert viewer.joined_at == joined_at
+        assert viewer.ip_address == '10.0.0.1'
+
+    def test_batch_size_triggers_flush(self, live_stream, settings):
+        """Test qu'un lot plein est écrit immédiatement"""
+        settings.STREAM_VIEWER_BATCH_SIZE = 3
+
+        for _ in range(3):
+            ingestion.record_join(live_stream.pk)
+
+        assert StreamViewer.objects.filter(stream=live_stream).count() == 3
+        assert ingestion.stats()['depth'] == 0
+
+    def test_backpressure_flushes_one_batch(self, live_stream, settings):
+        """Test qu'un buffer plein fait écrire un seul lot au producteur"""
+        settings.STREAM_VIEWER_BUFFER_MAX = 5
+        settings.STREAM_VIEWER_BATCH_SIZE = 3
+        redis_client.rpush(ingestion.QUEUE_KEY, *[json.dumps({
+            'type': 'leave', 'session_id': str(uuid.uuid4()), 'at': timezone.now().isoformat(),
+        }) for _ in range(7)])
+
+        ingestion.record_join(live_stream.pk)
+
+        assert redis_client.llen(ingestion.QUEUE_KEY) == 5
+        assert ingestion.stats()['backpressure'] == 1
+
+    def test_leave_closes_session(self, live_stream):
+        """Test qu'un leave renseigne left_at et la durée"""
+        joined_at = timezone.now() - timedelta(seconds=90)
+        session_id = ingestion.record_join(live_stream.pk, joined_at=joined_at)
+        ingestion.record_leave(session_id, left_at=joined_at + timedelta(seconds=60))
+
+        ingestion.drain()
+
+        viewer = StreamViewer.objects.get(session_id=session_id)
+        assert not viewer.is_active
+        assert viewer.duration_seconds == 60
+
+    def test_inflight_batch_is_replayed_once(self, live_stream):
+        """Test qu'un lot abandonné en cours de flush est rejoué sans doublon"""
+        event = {
+            'type': 'join', 'id': str(uuid.uuid4()), 'session_id': str(uuid.uuid4()),
+            'stream_id': str(live_stream.pk), 'viewer_id': None, 'ip_address': None,
+            'user_agent': '', 'at': timezone.now().isoformat(),
+        }
+        redis_client.rpush(ingestion.INFLIGHT_KEY, json.dumps(event))
+        ingestion.flush()
+        redis_client.rpush(ingestion.INFLIGHT_KEY, json.dumps(event))
+        ingestion.flush()
+
+        assert StreamViewer.objects.filter(session_id=event['session_id']).count() == 1
+        assert ingestion.stats()['inflight'] == 0
+
+    def test_unknown_stream_is_dropped(self, live_stream):
+        """Test qu'un join pour un stream supprimé ne bloque pas le lot"""
+        ingestion.record_join(uuid.uuid4())
+        ingestion.record_join(live_stream.pk)
+
+        ingestion.drain()
+
+        stats = ingestion.stats()
+        assert StreamViewer.objects.count() == 1
+        assert stats['dropped'] == 1
+        assert stats['enqueued'] == stats['flushed'] == 2
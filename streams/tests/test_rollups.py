@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Tests des rollups par minute et des courbes de rétention
+"""
+
+import pytest
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.core.management import call_command
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from streams.models import LiveStream, StreamMinuteRollup, StreamViewer
+from streams.services import rollups
+
+
+START = datetime(2025, 6, 1, 20, 0, tzinfo=dt_timezone.utc)
+
+
+@pytest.fixture
+def artist_user(db, django_user_model):
+    """Créer un utilisateur avec le rôle artist"""
+    return django_user_model.objects.create_user(
+        email='artist@test.com',
+        password='testpass123',
+        name='Test Artist',
+        role='artist'
+    )
+
+
+@pytest.fixture
+def stream(db, artist_user):
+    return LiveStream.objects.create(created_by=artist_user, title='Rollup Stream')
+
+
+def test_compute_buckets():
+    """Test le calcul vectorisé des buckets par minute"""
+    base = START.timestamp()
+    joined = [base + 30, base + 60]
+    left = [base + 120, base + 90]
+
+    minutes, concurrent, joins, leaves, watch = rollups.compute_buckets(joined, left)
+
+    assert list(minutes - minutes[0]) == [0, 1]
+    assert list(concurrent) == [1, 2]
+    assert list(joins) == [1, 1]
+    assert list(leaves) == [0, 2]
+    assert list(watch) == [30, 90]
+
+
+def test_compute_retention():
+    """Test l'histogramme des minutes regardées"""
+    watched_minutes, sessions = rollups.compute_retention([0, 0, 0], [30, 90, 150])
+
+    assert list(watched_minutes) == [0, 1, 2]
+    assert list(sessions) == [1, 1, 1]
+
+
+@pytest.mark.django_db
+class TestIncrementalRollups:
+    """Tests de l'alimentation incrémentale des rollups"""
+
+    def test_closing_sessions_feeds_rollups(self, stream):
+        """Test que chaque session fermée alimente les rollups"""
+        rollups.record_sessions([
+            (stream.pk, START + timedelta(seconds=30), START + timedelta(seconds=120)),
+        ])
+        rollups.record_sessions([
+            (stream.pk, START + timedelta(seconds=60), START + timedelta(seconds=90)),
+        ])
+
+        rows = list(StreamMinuteRollup.objects.filter(stream=stream).values_list(
+            'concurrent_viewers', 'joins', 'leaves', 'watch_seconds'))
+        assert rows == [(1, 1, 0, 30), (2, 1, 2, 90)]
+
+        curve = rollups.retention(stream.pk)
+        assert [point['viewers'] for point in curve] == [2, 1]
+        assert curve[1]['ratio'] == 0.5
+
+    def test_backfill_matches_incremental(self, stream):
+        """Test que le backfill NumPy retrouve les mêmes rollups"""
+        for offset in (0, 45, 200):
+            viewer = StreamViewer.objects.create(
+                stream=stream, joined_at=START + timedelta(seconds=offset)
+            )
+            StreamViewer.objects.filter(pk=viewer.pk).update(
+                left_at=START + timedelta(seconds=offset + 150)
+            )
+        rollups.record_sessions(StreamViewer.objects.filter(
+            stream=stream).values_list('stream_id', 'joined_at', 'left_at'))
+        incremental = list(StreamMinuteRollup.objects.filter(stream=stream).values_list(
+            'minute', 'concurrent_viewers', 'joins', 'leaves', 'watch_seconds'))
+
+        call_command('backfill_stream_rollups', stream=str(stream.pk), stdout=None)
+
+        backfilled = list(StreamMinuteRollup.objects.filter(stream=stream).values_list(
+            'minute', 'concurrent_viewers', 'joins', 'leaves', 'watch_seconds'))
+        assert backfilled == incremental
+        assert sum(row[4] for row in backfilled) == 450
+
+    def test_mark_left_feeds_rollups(self, stream):
+        """Test que mark_left met à jour les rollups"""
+        viewer = StreamViewer.objects.create(
+            stream=stream, joined_at=timezone.now() - timedelta(seconds=10)
+        )
+        viewer.mark_left()
+
+        assert StreamMinuteRollup.objects.filter(stream=stream, leaves=1).exists()
+
+
+@pytest.mark.django_db
+class TestAnalyticsEndpoint:
+    """Tests des endpoints d'analytics"""
+
+    def test_owner_reads_concurrency(self, stream, artist_user):
+        """Test que le créateur lit la courbe de concurrence"""
+        rollups.record_sessions([(stream.pk, START, START + timedelta(minutes=3))])
+        client = APIClient()
+        client.force_authenticate(artist_user)
+
+        response = client.get(f'/api/streams/{stream.pk}/analytics/concurrency/')
+
+        assert response.status_code == 200
+        assert [row['concurrent_viewers'] for row in response.data['results']] == [1, 1, 1]
+
+    def test_other_user_is_rejected(self, stream, django_user_model):
+        """Test qu'un autre utilisateur n'a pas accès aux analytics"""
+        fan = django_user_model.objects.create_user(
+            email='fan@test.com', password='testpass123', name='Fan', role='fan'
+        )
+        client = APIClient()
+        client.force_authenticate(fan)
+
+        response = client.get(f'/api/streams/{stream.pk}/analytics/retention/')
+
+        assert response.status_code == 403
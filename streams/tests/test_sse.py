@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Tests du canal push SSE (streams/sse.py)
+"""
+
+import asyncio
+import json
+import uuid
+
+from streams import sse
+from streams.services import counters
+
+
+def test_subscription_coalesces_updates():
+    """Test que les mises à jour rapprochées sont fusionnées et limitées"""
+    async def scenario():
+        subscription = sse.Subscription('stream', max_rate=4)
+        for count in range(1, 4):
+            subscription.push({'viewer_count': count})
+        first = await subscription.next()
+
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        subscription.push({'viewer_count': 4})
+        subscription.push({'status': 'ended'})
+        second = await subscription.next()
+        return first, second, loop.time() - started
+
+    first, second, elapsed = asyncio.run(scenario())
+
+    assert first == {'viewer_count': 3}
+    assert second == {'viewer_count': 4, 'status': 'ended'}
+    assert elapsed >= 0.2
+
+
+def test_hub_fans_out_counter_updates():
+    """Test que le hub relaie les compteurs publiés par Redis"""
+    stream_id = str(uuid.uuid4())
+
+    async def scenario():
+        hub = sse.StreamUpdateHub(max_rate=100)
+        try:
+            first_client = await hub.subscribe(stream_id)
+            second_client = await hub.subscribe(stream_id)
+            greeting = await first_client.next()
+            await second_client.next()
+
+            counters.increment(stream_id, 3)
+            updates = [
+                await asyncio.wait_for(client.next(), timeout=2)
+                for client in (first_client, second_client)
+            ]
+            return greeting, updates
+        finally:
+            await hub.stop()
+
+    try:
+        greeting, updates = asyncio.run(scenario())
+    finally:
+        counters.reset(stream_id)
+
+    assert greeting == {'status': None, 'viewer_count': 0, 'peak_viewers': 0}
+    assert all(update['viewer_count'] == 3 for update in updates)
+
+
+def test_sse_application_streams_events():
+    """Test l'application ASGI jusqu'à la déconnexion du client"""
+    stream_id = str(uuid.uuid4())
+    scope = {'type': 'http', 'path': f'/api/streams/{stream_id}/events/'}
+    sent = []
+
+    async def scenario():
+        sse.hub = sse.StreamUpdateHub(max_rate=100)
+        disconnect = asyncio.Event()
+
+        async def receive():
+            await disconnect.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            sent.append(message)
+            if message.get('body'):
+                disconnect.set()
+
+        try:
+            await asyncio.wait_for(sse.sse_application(scope, receive, send), timeout=2)
+        finally:
+            await sse.hub.stop()
+            sse.hub = None
+
+    asyncio.run(scenario())
+
+    assert sent[0]['status'] == 200
+    assert (b'content-type', b'text/event-stream') in sent[0]['headers']
+    payload = json.loads(sent[1]['body'].decode().removeprefix('data: '))
+    assert payload['viewer_count'] == 0
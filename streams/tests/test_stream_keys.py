@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Tests de l'authentification d'ingest par stream key
+"""
+
+import time
+import pytest
+from rest_framework.test import APIClient
+
+from streams.models import LiveStream
+from streams.services import stream_keys
+
+
+INGEST_URL = '/api/streams/ingest/auth/?secret=ingest-secret'
+
+
+@pytest.fixture(autouse=True)
+def ingest_settings(settings):
+    settings.STREAM_INGEST_SECRET = 'ingest-secret'
+    stream_keys.local_cache.clear()
+
+
+@pytest.fixture
+def artist_user(db, django_user_model):
+    """Créer un utilisateur avec le rôle artist"""
+    return django_user_model.objects.create_user(
+        email='artist@test.com',
+        password='testpass123',
+        name='Test Artist',
+        role='artist'
+    )
+
+
+@pytest.fixture
+def stream(db, artist_user):
+    return LiveStream.objects.create(
+        created_by=artist_user,
+        title='OBS Stream',
+        ingest_endpoint='rtmp://test.com/ingest',
+        playback_url='https://test.com/playback.m3u8',
+    )
+
+
+def publish(stream_key, call='publish', url=INGEST_URL):
+    return APIClient().post(url, {'name': stream_key, 'call': call, 'app': 'live'})
+
+
+def test_local_cache_is_lru_with_ttl():
+    """Test l'éviction LRU et l'expiration du cache local"""
+    cache = stream_keys.LocalCache(maxsize=2, ttl=0.05)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+
+    assert cache.get('b') is None
+    assert cache.get('a') == 1
+    time.sleep(0.06)
+    assert cache.get('c') is None
+
+
+@pytest.mark.django_db
+class TestIngestAuth:
+    """Tests du callback on_publish / on_done"""
+
+    def test_publish_goes_live(self, stream):
+        """Test que le premier publish passe le stream en live"""
+        response = publish(stream.stream_key)
+
+        assert response.status_code == 204
+        assert LiveStream.objects.get(pk=stream.pk).status == 'live'
+
+    def test_reconnect_is_served_from_cache(self, stream, django_assert_num_queries):
+        """Test qu'une reconnexion ne touche pas la base"""
+        publish(stream.stream_key)
+
+        with django_assert_num_queries(0):
+            assert publish(stream.stream_key).status_code == 204
+            assert publish(stream.stream_key, call='done').status_code == 204
+
+    def test_warm_lookup_is_sub_millisecond(self, stream):
+        """Test le temps de résolution d'une clé chaude"""
+        stream_keys.resolve(stream.stream_key)
+        timings = []
+        for _ in range(1000):
+            started = time.perf_counter()
+            stream_keys.resolve(stream.stream_key)
+            timings.append(time.perf_counter() - started)
+
+        assert sorted(timings)[989] < 0.001
+
+    def test_unknown_key_and_secret_are_rejected(self, stream):
+        """Test le refus d'une clé inconnue ou d'un mauvais secret"""
+        assert publish('unknown-key').status_code == 403
+        assert publish(stream.stream_key,
+                       url='/api/streams/ingest/auth/?secret=wrong').status_code == 403
+
+    def test_non_ascii_secret_is_rejected(self, stream):
+        """Test qu'un secret non ASCII est refusé sans erreur serveur"""
+        response = publish(stream.stream_key, url='/api/streams/ingest/auth/?secret=clé')
+
+        assert response.status_code == 403
+
+    def test_stale_read_is_not_cached_after_forget(self, stream, monkeypatch):
+        """Test qu'une lecture antérieure à forget() n'est pas réécrite en cache"""
+        real_filter = LiveStream.objects.filter
+
+        def filter_then_forget(*args, **kwargs):
+            rows = list(real_filter(*args, **kwargs).values_list('pk', 'status', 'stream_mode'))
+            stream_keys.forget(stream.pk)  # Le stream se termine pendant la lecture
+            return real_filter(pk__in=[row[0] for row in rows])
+
+        monkeypatch.setattr(LiveStream.objects, 'filter', filter_then_forget)
+        assert stream_keys.resolve(stream.stream_key) is not None
+        monkeypatch.undo()
+
+        assert stream_keys.redis_client.get(stream_keys._cache_key(stream.stream_key)) is None
+        assert stream_keys.local_cache.get(stream.stream_key) is None
+
+    def test_redis_entry_expires(self, stream):
+        """Test que l'entrée Redis porte un TTL"""
+        stream_keys.resolve(stream.stream_key)
+
+        assert stream_keys.redis_client.ttl(stream_keys._cache_key(stream.stream_key)) > 0
+
+    def test_ended_stream_is_rejected(self, stream, django_capture_on_commit_callbacks):
+        """Test qu'un stream terminé ne peut plus publier"""
+        publish(stream.stream_key)
+        with django_capture_on_commit_callbacks(execute=True):
+            stream.end_stream()
+
+        assert publish(stream.stream_key).status_code == 403
+
+    def test_rotated_key_is_rejected(self, stream, django_capture_on_commit_callbacks):
+        """Test que l'ancienne clé est refusée après rotation"""
+        previous_key = stream.stream_key
+        publish(previous_key)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            stream.rotate_stream_key()
+
+        assert publish(previous_key).status_code == 403
+        assert publish(stream.stream_key).status_code == 204
+
+    def test_stream_without_live_config_is_rejected(self, artist_user):
+        """Test qu'un stream OBS sans endpoints ne passe pas live par l'ingest"""
+        stream = LiveStream.objects.create(created_by=artist_user, title='No Endpoint')
+
+        assert publish(stream.stream_key).status_code == 403
+        assert LiveStream.objects.get(pk=stream.pk).status == 'idle'
+
+    def test_webcam_stream_is_rejected(self, artist_user):
+        """Test qu'un stream WebRTC ne publie pas en RTMP"""
+        stream = LiveStream.objects.create(
+            created_by=artist_user, title='Webcam', stream_mode='webcam',
+            webrtc_session_id='session-1',
+        )
+
+        assert publish(stream.stream_key).status_code == 403
+        assert LiveStream.objects.get(pk=stream.pk).status == 'idle'
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Tests des résumés post-stream
+"""
+
+import pytest
+from datetime import timedelta
+from django.core.management import call_command
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from streams.models import LiveStream, StreamSummary, StreamViewer
+from streams.services import heartbeats, ingestion, summaries
+from users.core.redis import redis_client
+
+
+@pytest.fixture
+def artist_user(db, django_user_model):
+    """Créer un utilisateur avec le rôle artist"""
+    return django_user_model.objects.create_user(
+        email='artist@test.com',
+        password='testpass123',
+        name='Test Artist',
+        role='artist'
+    )
+
+
+@pytest.fixture
+def stream(db, artist_user):
+    stream = LiveStream.objects.create(
+        created_by=artist_user,
+        title='Summary Stream',
+        ingest_endpoint='rtmp://test.com/ingest',
+        playback_url='https://test.com/playback.m3u8',
+    )
+    now = timezone.now()
+    StreamViewer.objects.bulk_create([
+        StreamViewer(stream=stream, viewer=artist_user, joined_at=now,
+                     left_at=now + timedelta(seconds=40), duration_seconds=40),
+        StreamViewer(stream=stream, viewer=artist_user, joined_at=now,
+                     left_at=now + timedelta(seconds=20), duration_seconds=20),
+        StreamViewer(stream=stream, joined_at=now,
+                     left_at=now + timedelta(seconds=60), duration_seconds=60),
+    ])
+    return stream
+
+
+@pytest.mark.django_db
+class TestStreamSummaries:
+    """Tests du calcul et de la lecture des résumés"""
+
+    def test_end_stream_queues_summary(self, stream, django_capture_on_commit_callbacks):
+        """Test que end_stream met le résumé en file, construit par le worker"""
+        stream.go_live()
+        with django_capture_on_commit_callbacks(execute=True):
+            stream.end_stream()
+
+        assert redis_client.sismember(summaries.PENDING_KEY, str(stream.pk))
+        assert not StreamSummary.objects.filter(stream=stream).exists()
+
+        call_command('build_stream_summaries', stdout=None)
+
+        summary = StreamSummary.objects.get(stream=stream)
+        assert (summary.sessions, summary.unique_viewers, summary.anonymous_sessions) == (3, 1, 1)
+        assert summary.total_watch_seconds == 120
+        assert summary.avg_watch_seconds == 40
+
+    def test_open_sessions_are_closed_at_end(self, stream, artist_user):
+        """Test que les sessions encore ouvertes sont fermées à la fin du stream"""
+        stream.go_live()
+        joined_at = timezone.now() - timedelta(seconds=30)
+        open_session = StreamViewer.objects.create(stream=stream, joined_at=joined_at)
+        heartbeats.start(stream.pk, open_session.session_id)
+        redis_client.set(ingestion.FLUSH_GATE_KEY, 1)  # La jointure reste en buffer
+        buffered = ingestion.record_join(stream.pk, viewer_id=artist_user.pk)
+        redis_client.delete(ingestion.FLUSH_GATE_KEY)
+        stream.end_stream()
+
+        summaries.compute(stream.pk)
+
+        open_session.refresh_from_db()
+        assert open_session.left_at == stream.ended_at
+        assert open_session.duration_seconds == StreamViewer.session_seconds(
+            joined_at, stream.ended_at
+        )
+        assert StreamViewer.objects.get(session_id=buffered).left_at == stream.ended_at
+        assert heartbeats.active_count(stream.pk) == 0
+        summary = StreamSummary.objects.get(stream=stream)
+        assert summary.sessions == 5
+        assert summary.total_watch_seconds >= 150
+
+    def test_backfill_in_chunks(self, stream, artist_user):
+        """Test le recalcul de tous les streams terminés par lots"""
+        others = [LiveStream.objects.create(created_by=artist_user, title=f'Other {index}')
+                  for index in range(2)]
+        for ended in [stream] + others:
+            ended.end_stream()
+        LiveStream.objects.create(created_by=artist_user, title='Still idle')
+
+        call_command('build_stream_summaries', backfill=True, chunk_size=1, stdout=None)
+
+        assert StreamSummary.objects.count() == 3
+        assert StreamSummary.objects.get(stream=stream).sessions == 3
+        assert StreamSummary.objects.get(stream=others[0]).sessions == 0
+
+    def test_dashboard_reads_one_row(self, stream, artist_user, django_assert_num_queries):
+        """Test que l'endpoint lit une seule ligne"""
+        summaries.compute(stream.pk)
+        client = APIClient()
+        client.force_authenticate(artist_user)
+
+        with django_assert_num_queries(1):
+            response = client.get(f'/api/streams/{stream.pk}/summary/')
+
+        assert response.status_code == 200
+        assert response.data['total_watch_seconds'] == 120
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Tests des transitions gardées du cycle de vie des streams
+"""
+
+import pytest
+from django.core.exceptions import ValidationError
+
+from streams.models import LiveStream
+from streams.services import counters, transitions
+from streams.signals import stream_transitioned
+
+
+@pytest.fixture
+def artist_user(db, django_user_model):
+    """Créer un utilisateur avec le rôle artist"""
+    return django_user_model.objects.create_user(
+        email='artist@test.com',
+        password='testpass123',
+        name='Test Artist',
+        role='artist'
+    )
+
+
+@pytest.fixture
+def stream(db, artist_user):
+    return LiveStream.objects.create(
+        created_by=artist_user,
+        title='Race Stream',
+        ingest_endpoint='rtmp://test.com/ingest',
+        playback_url='https://test.com/playback.m3u8',
+    )
+
+
+@pytest.fixture
+def transitions_sent():
+    sent = []
+
+    def record(sender, stream_id, status, **kwargs):
+        sent.append((stream_id, status))
+
+    stream_transitioned.connect(record)
+    yield sent
+    stream_transitioned.disconnect(record)
+
+
+@pytest.mark.django_db
+class TestGuardedTransitions:
+    """Tests des UPDATE conditionnels"""
+
+    def test_only_one_worker_wins(self, stream, transitions_sent):
+        """Test que deux instances concurrentes ne gagnent qu'une fois"""
+        first = LiveStream.objects.get(pk=stream.pk)
+        second = LiveStream.objects.get(pk=stream.pk)
+
+        assert first.go_live() is True
+        assert second.go_live() is False
+        assert second.status == 'live'
+        assert second.started_at == first.started_at
+        assert transitions_sent == [(stream.pk, 'live')]
+
+    def test_transition_is_one_query(self, stream, django_assert_num_queries):
+        """Test qu'une transition se fait en un seul aller-retour"""
+        with django_assert_num_queries(1):
+            assert stream.go_live() is True
+
+        with django_assert_num_queries(1):
+            assert stream.end_stream() is True
+
+    def test_ended_stream_cannot_go_live(self, stream):
+        """Test qu'un stream terminé ne repasse pas live"""
+        stream.end_stream()
+
+        assert transitions.go_live(stream.pk) is False
+        assert LiveStream.objects.get(pk=stream.pk).status == 'ended'
+
+    def test_end_keeps_live_peak(self, stream):
+        """Test que la fin du stream conserve le peak de Redis"""
+        stream.go_live()
+        counters.increment(stream.pk, 7)
+
+        assert transitions.end(stream.pk) is True
+
+        stream.refresh_from_db()
+        assert stream.peak_viewers == 7
+        assert counters.get_counts(stream.pk) is None
+
+    def test_go_live_checks_config(self, artist_user):
+        """Test que la configuration OBS est vérifiée avant la transition"""
+        stream = LiveStream.objects.create(created_by=artist_user, title='No Endpoint')
+
+        with pytest.raises(ValidationError):
+            stream.go_live()
+
+        assert LiveStream.objects.get(pk=stream.pk).status == 'idle'
+        assert transitions.go_live(stream.pk) is False
+        assert LiveStream.objects.get(pk=stream.pk).status == 'idle'
+
+
+@pytest.mark.django_db
+def test_narrow_save_skips_full_clean(stream, django_assert_num_queries):
+    """Test qu'un save avec update_fields ne relit pas created_by"""
+    stream = LiveStream.objects.get(pk=stream.pk)
+    stream.title = 'Renamed'
+
+    with django_assert_num_queries(1):
+        stream.save(update_fields=['title'])
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Tests de l'ingestion des webhooks Mux
+"""
+
+import time
+import pytest
+from django.core.management import call_command
+
+from streams.models import LiveStream
+from streams.services import webhooks
+
+
+@pytest.fixture
+def artist_user(db, django_user_model):
+    """Créer un utilisateur avec le rôle artist"""
+    return django_user_model.objects.create_user(
+        email='artist@test.com',
+        password='testpass123',
+        name='Test Artist',
+        role='artist'
+    )
+
+
+@pytest.fixture
+def stream(db, artist_user):
+    return LiveStream.objects.create(
+        created_by=artist_user,
+        title='Mux Stream',
+        channel_arn='mux-live-stream-1',
+        ingest_endpoint='rtmps://global-live.mux.com:443/app',
+        playback_url='https://stream.mux.com/playback.m3u8',
+    )
+
+
+def test_verify_signature(mux):
+    """Test la vérification de la signature Mux"""
+    body = b'{"id": "evt"}'
+
+    assert webhooks.verify_signature(body, mux.sign(body))
+    assert not webhooks.verify_signature(body + b' ', mux.sign(body))
+    assert not webhooks.verify_signature(body, mux.sign(body, time.time() - 3600))
+    assert not webhooks.verify_signature(body, 'garbage')
+
+
+@pytest.mark.django_db
+class TestWebhookIngestion:
+    """Tests du endpoint et du worker"""
+
+    def test_invalid_signature_is_rejected(self, mux, stream):
+        """Test qu'un webhook mal signé est refusé et non mis en file"""
+        event = mux.event('video.live_stream.active', stream.channel_arn)
+
+        response = mux.send(event, signature='t=1,v1=deadbeef')
+
+        assert response.status_code == 400
+        assert webhooks.stats()['depth'] == 0
+
+    def test_retries_are_deduplicated(self, mux, stream, django_assert_num_queries):
+        """Test que les retries sont acquittés sans toucher la base"""
+        event = mux.event('video.live_stream.active', stream.channel_arn)
+
+        with django_assert_num_queries(0):
+            responses = mux.replay([event], times=3)
+
+        assert [response.status_code for response in responses] == [204] * 3
+        stats = webhooks.stats()
+        assert (stats['accepted'], stats['duplicates'], stats['depth']) == (1, 2, 1)
+
+    def test_worker_applies_latest_state(self, mux, stream):
+        """Test que le worker applique le dernier état de chaque stream"""
+        mux.replay([mux.event('video.live_stream.active', stream.channel_arn)], times=2)
+        call_command('process_stream_webhooks', stdout=None)
+
+        stream.refresh_from_db()
+        assert stream.status == 'live'
+
+        mux.replay([mux.event('video.live_stream.idle', stream.channel_arn)])
+        assert webhooks.apply_batch() == 1
+
+        stream.refresh_from_db()
+        assert stream.status == 'ended'
+        assert webhooks.stats()['transitions'] == 2
+
+    def test_idle_before_live_does_not_end(self, mux, stream):
+        """Test qu'un idle sur un stream jamais live ne le termine pas"""
+        mux.replay([mux.event('video.live_stream.connected', stream.channel_arn),
+                    mux.event('video.live_stream.idle', stream.channel_arn)])
+        webhooks.drain()
+
+        assert LiveStream.objects.get(pk=stream.pk).status == 'idle'
+
+    def test_live_then_idle_in_one_batch(self, mux, stream):
+        """Test qu'un active puis un idle du même lot font passer par live avant la fin"""
+        mux.replay([mux.event('video.live_stream.active', stream.channel_arn),
+                    mux.event('video.live_stream.idle', stream.channel_arn)])
+
+        assert webhooks.apply_batch() == 2
+
+        stream.refresh_from_db()
+        assert stream.status == 'ended'
+        assert stream.started_at is not None
+
+    def test_active_without_live_config_is_ignored(self, mux, artist_user):
+        """Test qu'un active pour un stream sans endpoints ne le passe pas live"""
+        stream = LiveStream.objects.create(created_by=artist_user, title='No Endpoint',
+                                           channel_arn='mux-no-endpoint')
+        mux.replay([mux.event('video.live_stream.active', stream.channel_arn)])
+
+        assert webhooks.apply_batch() == 1
+
+        assert LiveStream.objects.get(pk=stream.pk).status == 'idle'
+        assert webhooks.stats()['transitions'] == 0
+
+    def test_burst_is_applied_in_batches(self, mux, artist_user, django_assert_max_num_queries):
+        """Test qu'une rafale de webhooks est appliquée par lots"""
+        streams = [
+            LiveStream.objects.create(
+                created_by=artist_user,
+                title=f'Burst {index}',
+                channel_arn=f'mux-burst-{index}',
+                ingest_endpoint='rtmps://global-live.mux.com:443/app',
+                playback_url=f'https://stream.mux.com/burst-{index}.m3u8',
+            )
+            for index in range(20)
+        ]
+        events = [mux.event('video.live_stream.active', s.channel_arn) for s in streams]
+        mux.replay(events, times=5)
+
+        with django_assert_max_num_queries(21):
+            assert webhooks.apply_batch(batch_size=500) == 20
+
+        assert LiveStream.objects.filter(status='live').count() == 20
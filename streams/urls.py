@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+"""Streams urls"""
+
+from django.urls import path
+from streams.views import (
+    EndedStreamsListView,
+    LiveNowView,
+    MuxWebhookView,
+    StreamAnalyticsView,
+    StreamHeartbeatView,
+    StreamIngestAuthView,
+    StreamJoinView,
+    StreamLeaveView,
+    StreamSummaryView,
+    StreamViewerExportView,
+)
+
+urlpatterns = [
+    path('live/', LiveNowView.as_view(), name='streams-live-now'),
+    path('ended/', EndedStreamsListView.as_view(), name='streams-ended'),
+    path('ingest/auth/', StreamIngestAuthView.as_view(), name='streams-ingest-auth'),
+    path('webhooks/mux/', MuxWebhookView.as_view(), name='streams-mux-webhook'),
+    path('<uuid:stream_id>/join/', StreamJoinView.as_view(), name='stream-join'),
+    path('<uuid:stream_id>/heartbeat/', StreamHeartbeatView.as_view(),
+         name='stream-heartbeat'),
+    path('<uuid:stream_id>/leave/', StreamLeaveView.as_view(), name='stream-leave'),
+    path('<uuid:stream_id>/analytics/concurrency/', StreamAnalyticsView.as_view(),
+         {'report': 'concurrency'}, name='stream-analytics-concurrency'),
+    path('<uuid:stream_id>/analytics/retention/', StreamAnalyticsView.as_view(),
+         {'report': 'retention'}, name='stream-analytics-retention'),
+    path('<uuid:stream_id>/summary/', StreamSummaryView.as_view(), name='stream-summary'),
+    path('<uuid:stream_id>/viewers/export/', StreamViewerExportView.as_view(),
+         name='stream-viewers-export'),
+]
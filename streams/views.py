@@ -1,3 +1,239 @@
-from django.shortcuts import render
+#!/usr/bin/env python3
+"""Streams views"""
 
-# Create your views here.
+import hmac
+import json
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from rest_framework import status
+from rest_framework.generics import ListAPIView
+from rest_framework.pagination import CursorPagination
+from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from streams.models import LiveStream, StreamSummary
+from streams.permissions import IsStreamOwner
+from streams.serializers import (
+    IngestCallbackSerializer,
+    LiveStreamArchiveSerializer,
+    StreamSummarySerializer,
+    ViewerExportSerializer,
+    ViewerSessionSerializer,
+)
+from streams.services import (
+    counters, directory, entitlements, exports, heartbeats, ingestion, rollups,
+    stream_keys, transitions, webhooks,
+)
+
+
+class LiveNowView(APIView):
+    """Streams currently live, served from the precomputed snapshot"""
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        streams = directory.live_streams()
+        return Response({'count': len(streams), 'results': streams})
+
+
+class EndedStreamsPagination(CursorPagination):
+    ordering = '-created_at'
+    page_size = 20
+    max_page_size = 100
+    page_size_query_param = 'page_size'
+
+
+class EndedStreamsListView(ListAPIView):
+    """Archive of ended streams, keyset paginated on created_at"""
+    queryset = LiveStream.objects.filter(status='ended').select_related('created_by')
+    serializer_class = LiveStreamArchiveSerializer
+    pagination_class = EndedStreamsPagination
+    permission_classes = [AllowAny]
+
+
+class StreamJoinView(APIView):
+    """Open a viewer session on a live stream"""
+    permission_classes = [AllowAny]
+
+    def post(self, request, stream_id):
+        stream = get_object_or_404(
+            LiveStream.objects.only('id', 'status', 'viewer_count', 'peak_viewers'),
+            pk=stream_id, status='live'
+        )
+        viewer_id = request.user.id if request.user.is_authenticated else None
+        if not entitlements.is_entitled(stream.pk, viewer_id):
+            return Response({"detail": "A ticket is required to watch this stream."},
+                            status=status.HTTP_403_FORBIDDEN)
+
+        session_id = ingestion.record_join(
+            stream.pk,
+            viewer_id=viewer_id,
+            ip_address=request.META.get('REMOTE_ADDR'),
+            user_agent=request.headers.get('User-Agent', ''),
+        )
+        heartbeats.start(stream.pk, session_id)
+        stream.increment_viewers()
+
+        return Response({
+            'session_id': session_id,
+            'viewer_count': stream.viewer_count,
+        }, status=status.HTTP_201_CREATED)
+
+
+class StreamHeartbeatView(APIView):
+    """Keep a viewer session alive, no database access"""
+    permission_classes = [AllowAny]
+
+    def post(self, request, stream_id):
+        serializer = ViewerSessionSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        viewer_id = request.user.id if request.user.is_authenticated else None
+        if not entitlements.is_entitled(stream_id, viewer_id):
+            return Response({"detail": "A ticket is required to watch this stream."},
+                            status=status.HTTP_403_FORBIDDEN)
+
+        if not heartbeats.beat(stream_id, serializer.validated_data['session_id']):
+            return Response({"detail": "Session expired, join the stream again."},
+                            status=status.HTTP_410_GONE)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class StreamLeaveView(APIView):
+    """Close a viewer session"""
+    permission_classes = [AllowAny]
+
+    def post(self, request, stream_id):
+        serializer = ViewerSessionSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        session_id = serializer.validated_data['session_id']
+
+        # Only the first of leave/reaper decrements the live counter
+        if heartbeats.end(stream_id, session_id):
+            counters.decrement(stream_id)
+            counters.maybe_flush(stream_id)
+            ingestion.record_leave(session_id)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class StreamAnalyticsView(APIView):
+    """Concurrency and retention curves of a stream, read from rollups"""
+    permission_classes = [IsAuthenticated, IsStreamOwner]
+    reports = {
+        'concurrency': rollups.concurrency,
+        'retention': rollups.retention,
+    }
+
+    def get(self, request, stream_id, report):
+        stream = get_object_or_404(LiveStream.objects.only('id', 'created_by'), pk=stream_id)
+        self.check_object_permissions(request, stream)
+        return Response({
+            'stream': stream.pk,
+            'report': report,
+            'results': self.reports[report](stream.pk),
+        })
+
+
+class StreamSummaryView(APIView):
+    """Post-stream totals, precomputed once the stream ended"""
+    permission_classes = [IsAuthenticated, IsStreamOwner]
+
+    def get(self, request, stream_id):
+        summary = get_object_or_404(
+            StreamSummary.objects.select_related('stream'), stream_id=stream_id
+        )
+        self.check_object_permissions(request, summary.stream)
+        return Response(StreamSummarySerializer(summary).data)
+
+
+class StreamViewerExportView(APIView):
+    """
+    Per-session export of a stream as NDJSON or CSV, streamed row by row.
+    Pass the cursor of the last received row to resume a download.
+    """
+    permission_classes = [IsAuthenticated, IsStreamOwner]
+    chunk_size = 2000
+
+    def get(self, request, stream_id):
+        stream = get_object_or_404(LiveStream.objects.only('id', 'created_by'), pk=stream_id)
+        self.check_object_permissions(request, stream)
+
+        serializer = ViewerExportSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        params = serializer.validated_data
+
+        render, content_type = exports.RENDERERS[params['output']]
+        rows = exports.iter_sessions(
+            stream.pk,
+            since=params.get('since'),
+            until=params.get('until'),
+            cursor=params.get('cursor'),
+            chunk_size=self.chunk_size,
+        )
+        response = StreamingHttpResponse(render(rows), content_type=content_type)
+        response['Content-Disposition'] = (
+            f'attachment; filename="stream-{stream.pk}-viewers.{params["output"]}"'
+        )
+        return response
+
+
+class MuxWebhookView(APIView):
+    """Verify and queue Mux webhooks; they are applied by a worker"""
+    authentication_classes = []
+    permission_classes = [AllowAny]
+
+    def post(self, request):
+        body = request.body
+        if not webhooks.verify_signature(body, request.headers.get('Mux-Signature')):
+            return Response({"detail": "Invalid signature."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        try:
+            event = json.loads(body)
+            webhooks.accept(event)
+        except (ValueError, KeyError, TypeError):
+            return Response({"detail": "Malformed event."},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        # Duplicates are acknowledged too, or Mux would keep retrying them
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class StreamIngestAuthView(APIView):
+    """
+    on_publish / on_done callbacks of the RTMP ingest server.
+    A 2xx answer lets the encoder publish, anything else drops it.
+    """
+    authentication_classes = []
+    permission_classes = [AllowAny]
+
+    def post(self, request):
+        secret = settings.STREAM_INGEST_SECRET or ''
+        if not secret or not hmac.compare_digest(
+            secret.encode(), request.query_params.get('secret', '').encode()
+        ):
+            return Response(status=status.HTTP_403_FORBIDDEN)
+
+        serializer = IngestCallbackSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        stream_key = serializer.validated_data['name']
+
+        # Encoders reconnect within the provider window, ending is not ours
+        if serializer.validated_data['call'] == 'done':
+            return Response(status=status.HTTP_204_NO_CONTENT)
+
+        found = stream_keys.resolve(stream_key)
+        if not found or found[2] != 'obs':
+            return Response(status=status.HTTP_403_FORBIDDEN)
+
+        if found[1] == 'idle':
+            stream_id, _, stream_mode = found
+            if transitions.go_live(stream_id):
+                stream_keys.store(stream_key, stream_id, 'live', stream_mode)
+            else:
+                # Someone else moved it: read the current status again
+                stream_keys.invalidate(stream_key)
+            found = stream_keys.resolve(stream_key)
+
+        if not found or found[1] != 'live':
+            return Response(status=status.HTTP_403_FORBIDDEN)
+        return Response(status=status.HTTP_204_NO_CONTENT)
@@ -1,5 +1,7 @@
 from django.contrib import admin
+from django.db import transaction
 from .models import TicketType, Ticket
+from .services import catalog, holds, inventory, manifest
 
 
 @admin.register(Ticket)
@@ -7,6 +9,26 @@ class TicketAdmin(admin.ModelAdmin):
     list_display = ('ticket_type', 'buyer', 'purchased_at', 'event_title')
     search_fields = ('ticket_type__name', 'buyer__name')
     list_filter = ('purchased_at', 'ticket_type__event')
+    # Un ticket n'est créé ou changé de type que par l'API, qui tient le stock
+    readonly_fields = ('ticket_type',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def delete_model(self, request, obj):
+        self.delete_queryset(request, Ticket.objects.filter(pk=obj.pk))
+
+    def delete_queryset(self, request, queryset):
+        # Comme une suppression par l'API : stock rendu, tickets révoqués au scan
+        with transaction.atomic():
+            for ticket in queryset.select_related('ticket_type'):
+                if ticket.ticket_type_id:
+                    inventory.release(ticket)
+                    manifest.revoke(ticket.ticket_type.event_id, ticket.pk)
+                    transaction.on_commit(
+                        lambda ticket_type_id=ticket.ticket_type_id: holds.invalidate(ticket_type_id)
+                    )
+            queryset.delete()
 
     def event_title(self, obj):
         return obj.ticket_type.event.title
@@ -17,5 +39,45 @@ class TicketAdmin(admin.ModelAdmin):
 class TicketTypeAdmin(admin.ModelAdmin):
     list_display = ('name', 'event', 'price', 'quantity', 'tickets_sold', 'tickets_remaining')
     list_filter = ('event',)
+    list_select_related = ('event',)
     autocomplete_fields = ['event']
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).with_availability()
+
+    def save_model(self, request, obj, form, change):
+        with transaction.atomic():
+            if change:
+                TicketType.objects.select_for_update().filter(pk=obj.pk).first()
+            super().save_model(request, obj, form, change)
+            if change and 'event' in form.changed_data:
+                manifest.move_type(obj.pk, form.initial['event'], obj.event_id)
+        transaction.on_commit(lambda: catalog.invalidate(obj.event_id))
+        if change and 'event' in form.changed_data:
+            transaction.on_commit(lambda: catalog.invalidate(form.initial['event']))
+
+    def delete_model(self, request, obj):
+        self.delete_queryset(request, TicketType.objects.filter(pk=obj.pk))
+
+    def delete_queryset(self, request, queryset):
+        # Les tickets partent en cascade : ils sont révoqués au scan et dans les manifestes
+        with transaction.atomic():
+            event_ids = set()
+            for ticket_type in queryset:
+                event_ids.add(ticket_type.event_id)
+                manifest.revoke_many(ticket_type.event_id,
+                                     ticket_type.tickets.values_list('pk', flat=True))
+            queryset.delete()
+        for event_id in event_ids:
+            transaction.on_commit(lambda event_id=event_id: catalog.invalidate(event_id))
+
+    def tickets_sold(self, obj):
+        return obj.sold_count
+    tickets_sold.short_description = "Sold"
+    tickets_sold.admin_order_field = 'sold_count'
+
+    def tickets_remaining(self, obj):
+        return obj.remaining_count
+    tickets_remaining.short_description = "Remaining"
+    tickets_remaining.admin_order_field = 'remaining_count'
+
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""Benchmark de contention de l'inventaire des tickets"""
+
+import threading
+import time
+import uuid
+from datetime import timedelta
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+from artists.models import ArtistProfile
+from events.models import Event
+from tickets.models import Ticket, TicketType
+from tickets.services import inventory
+
+
+class Command(BaseCommand):
+    help = "Lance des achats concurrents sur un type de ticket jetable et vérifie l'absence de survente."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--buyers', type=int, default=500)
+        parser.add_argument('--threads', type=int, default=32)
+        parser.add_argument('--quantity', type=int, default=200,
+                            help="Stock du type de ticket, inférieur au nombre d'acheteurs.")
+
+    def handle(self, *args, **options):
+        ticket_type, users = self.setup(options['buyers'], options['quantity'])
+        try:
+            result = self.run(ticket_type, users, options['threads'])
+        finally:
+            self.cleanup(users)
+        self.stdout.write(
+            "{purchases} achat(s), {refused} refus, {errors} erreur(s) en {elapsed:.2f}s "
+            "({throughput:.0f} achats/s), sold={sold}, tickets={tickets}, "
+            "survente={oversold}".format(**result)
+        )
+
+    def setup(self, buyers, quantity):
+        tag = uuid.uuid4().hex[:8]
+        User = get_user_model()
+        promoter = User.objects.create_user(
+            name=f'bench-promoter-{tag}', email=f'promoter-{tag}@bench.local', role='promoter'
+        )
+        artist = ArtistProfile.objects.create(name=f'bench-artist-{tag}')
+        now = timezone.now()
+        event = Event.objects.create(
+            artist=artist, title=f'Benchmark {tag}', description='benchmark',
+            location='bench', date=now + timedelta(days=30), created_by=promoter,
+        )
+        ticket_type = TicketType.objects.create(
+            event=event, name='Bench', price=10, quantity=quantity,
+            sale_starts=now - timedelta(hours=1), sale_ends=now + timedelta(hours=1),
+        )
+        users = User.objects.bulk_create([
+            User(name=f'bench-fan-{tag}-{index}', email=f'fan-{tag}-{index}@bench.local',
+                 role='fan')
+            for index in range(buyers)
+        ])
+        return ticket_type, [promoter, artist, event] + users
+
+    def run(self, ticket_type, users, threads):
+        buyers = iter(users[3:])
+        lock = threading.Lock()
+        counts = {'purchases': 0, 'refused': 0, 'errors': 0}
+
+        def worker():
+            try:
+                while True:
+                    with lock:
+                        buyer = next(buyers, None)
+                    if buyer is None:
+                        return
+                    try:
+                        with transaction.atomic():
+                            price = inventory.reserve(ticket_type.pk)
+                            if price is not None:
+                                Ticket.objects.create(ticket_type=ticket_type, buyer=buyer,
+                                                      price_paid=price)
+                                outcome = 'purchases'
+                            else:
+                                outcome = 'refused'
+                    except Exception:
+                        outcome = 'errors'
+                    with lock:
+                        counts[outcome] += 1
+            finally:
+                connection.close()
+
+        started = time.perf_counter()
+        pool = [threading.Thread(target=worker) for _ in range(threads)]
+        for thread in pool:
+            thread.start()
+        for thread in pool:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        ticket_type.refresh_from_db()
+        tickets = Ticket.objects.filter(ticket_type=ticket_type).count()
+        return dict(
+            counts,
+            elapsed=elapsed,
+            throughput=(counts['purchases'] + counts['refused']) / elapsed,
+            sold=ticket_type.sold,
+            tickets=tickets,
+            oversold=max(0, tickets - ticket_type.quantity),
+        )
+
+    def cleanup(self, objects):
+        promoter, artist, event = objects[:3]
+        event.delete()
+        artist.delete()
+        get_user_model().objects.filter(pk__in=[user.pk for user in objects[3:]]).delete()
+        promoter.delete()
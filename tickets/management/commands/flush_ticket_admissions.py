@@ -0,0 +1,24 @@
+#!/usr/bin/env python3
+"""Écrit en base les entrées scannées aux portes"""
+
+import time
+from django.core.management.base import BaseCommand
+from tickets.services import admission
+
+
+class Command(BaseCommand):
+    help = "Écrit Ticket.admitted_at par lots depuis la file Redis des entrées."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true',
+                            help="Recommencer toutes les --interval secondes.")
+        parser.add_argument('--interval', type=int, default=2)
+        parser.add_argument('--batch-size', type=int, default=None)
+
+    def handle(self, *args, **options):
+        while True:
+            flushed = admission.drain(options['batch_size'])
+            self.stdout.write(f"Flushed {flushed} admission(s).")
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
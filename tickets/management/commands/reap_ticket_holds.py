@@ -0,0 +1,23 @@
+#!/usr/bin/env python3
+"""Rend au stock les holds de tickets expirés"""
+
+import time
+from django.core.management.base import BaseCommand
+from tickets.services import holds
+
+
+class Command(BaseCommand):
+    help = "Rend au stock Redis les places des holds expirés non confirmés."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true',
+                            help="Recommencer toutes les --interval secondes.")
+        parser.add_argument('--interval', type=int, default=5)
+
+    def handle(self, *args, **options):
+        while True:
+            reclaimed = holds.reap_expired()
+            self.stdout.write(f"Reclaimed {reclaimed} expired hold(s).")
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,26 @@
+#!/usr/bin/env python3
+"""Offre les places revenues en stock aux listes d'attente"""
+
+import time
+from django.core.management.base import BaseCommand
+from tickets.services import holds, waitlist
+
+
+class Command(BaseCommand):
+    help = "Transforme la tête des listes d'attente en holds quand des places reviennent."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true',
+                            help="Recommencer toutes les --interval secondes.")
+        parser.add_argument('--interval', type=int, default=2)
+        parser.add_argument('--batch-size', type=int, default=None)
+
+    def handle(self, *args, **options):
+        while True:
+            # Les places des holds expirés reviennent avant de faire les offres
+            holds.reap_expired()
+            offered = waitlist.release_all(options['batch_size'])
+            self.stdout.write(f"Released {offered} waitlist offer(s).")
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,25 @@
+#!/usr/bin/env python3
+"""Rend en PDF les tickets vendus d'un événement"""
+
+import time
+from django.core.management.base import BaseCommand
+from tickets.models import Ticket
+from tickets.services import rendering
+
+
+class Command(BaseCommand):
+    help = "Rend en lot les PDF des tickets d'un événement et les met en cache."
+
+    def add_arguments(self, parser):
+        parser.add_argument('event_id', type=int)
+        parser.add_argument('--chunk-size', type=int, default=200)
+
+    def handle(self, *args, **options):
+        tickets = Ticket.objects.filter(ticket_type__event_id=options['event_id']).select_related(
+            'ticket_type__event', 'buyer').order_by('pk')
+        started = time.monotonic()
+        rendered, cached = rendering.render_tickets(tickets, chunk_size=options['chunk_size'])
+        self.stdout.write(
+            f"Rendered {rendered} ticket(s), {cached} already cached, "
+            f"in {time.monotonic() - started:.1f}s."
+        )
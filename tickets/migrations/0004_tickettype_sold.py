@@ -0,0 +1,38 @@
+# Generated by Django 5.2.1 on 2026-10-17 02:24
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, F, Value
+from django.db.models.functions import Greatest
+
+
+def count_sold_tickets(apps, schema_editor):
+    # Les types déjà survendus gardent leurs tickets : quantity >= sold
+    TicketType = apps.get_model('tickets', 'TicketType')
+    for ticket_type in TicketType.objects.annotate(count=Count('tickets')).filter(count__gt=0):
+        TicketType.objects.filter(pk=ticket_type.pk).update(
+            sold=ticket_type.count,
+            quantity=Greatest(F('quantity'), Value(ticket_type.count)),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0006_event_created_at_event_updated_at_and_more'),
+        ('tickets', '0003_tickettype_created_by'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tickettype',
+            name='sold',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(count_sold_tickets, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='tickettype',
+            constraint=models.CheckConstraint(condition=models.Q(('sold__lte', models.F('quantity'))), name='ticket_type_sold_lte_quantity'),
+        ),
+    ]
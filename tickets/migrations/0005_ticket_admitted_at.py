@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-17 02:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0004_tickettype_sold'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ticket',
+            name='admitted_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+    ]
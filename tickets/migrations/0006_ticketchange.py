@@ -0,0 +1,29 @@
+# Generated by Django 5.2.1 on 2026-10-17 02:42
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0006_event_created_at_event_updated_at_and_more'),
+        ('tickets', '0005_ticket_admitted_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TicketChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ticket_id', models.BigIntegerField()),
+                ('revoked', models.BooleanField(default=True)),
+                ('changed_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ticket_changes', to='events.event')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['event', 'id'], name='ticket_change_event_id')],
+            },
+        ),
+    ]
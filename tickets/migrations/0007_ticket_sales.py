@@ -0,0 +1,57 @@
+# Generated by Django 5.2.1 on 2026-10-17 02:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, F
+from django.db.models.functions import TruncDate
+
+
+def aggregate_sales(apps, schema_editor):
+    # Les ventes passées sont valorisées au prix actuel du type
+    TicketType = apps.get_model('tickets', 'TicketType')
+    Ticket = apps.get_model('tickets', 'Ticket')
+    TicketSalesDaily = apps.get_model('tickets', 'TicketSalesDaily')
+
+    TicketType.objects.update(revenue=F('sold') * F('price'))
+    rows = Ticket.objects.filter(ticket_type__isnull=False).annotate(
+        day=TruncDate('purchased_at')
+    ).values('ticket_type_id', 'day', 'ticket_type__price').annotate(tickets=Count('id'))
+    TicketSalesDaily.objects.bulk_create(
+        (
+            TicketSalesDaily(
+                ticket_type_id=row['ticket_type_id'], day=row['day'], tickets=row['tickets'],
+                revenue=row['tickets'] * row['ticket_type__price'],
+            )
+            for row in rows.iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0006_ticketchange'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tickettype',
+            name='revenue',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=12),
+        ),
+        migrations.CreateModel(
+            name='TicketSalesDaily',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('tickets', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('ticket_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_sales', to='tickets.tickettype')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('ticket_type', 'day'), name='ticket_sales_daily_type_day')],
+            },
+        ),
+        migrations.RunPython(aggregate_sales, migrations.RunPython.noop),
+    ]
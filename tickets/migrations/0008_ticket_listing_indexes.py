@@ -0,0 +1,23 @@
+# Generated by Django 5.2.1 on 2026-10-17 02:48
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0007_ticket_sales'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['buyer', '-purchased_at', '-id'], name='ticket_buyer_purchased'),
+        ),
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['ticket_type', '-purchased_at', '-id'], name='ticket_type_purchased'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.1 on 2026-10-17 02:51
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0006_event_created_at_event_updated_at_and_more'),
+        ('tickets', '0008_ticket_listing_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='tickettype',
+            index=models.Index(fields=['event', 'sale_starts', 'sale_ends'], name='ticket_type_event_sale'),
+        ),
+    ]
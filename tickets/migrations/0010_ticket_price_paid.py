@@ -0,0 +1,30 @@
+# Generated by Django 5.2.1 on 2026-10-17 03:18
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_price_paid(apps, schema_editor):
+    # Les achats passés sont valorisés au prix actuel du type, comme les agrégats de ventes
+    TicketType = apps.get_model('tickets', 'TicketType')
+    Ticket = apps.get_model('tickets', 'Ticket')
+
+    Ticket.objects.filter(ticket_type__isnull=False).update(price_paid=Subquery(
+        TicketType.objects.filter(pk=OuterRef('ticket_type_id')).values('price')[:1]
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0009_tickettype_event_sale_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ticket',
+            name='price_paid',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=8),
+        ),
+        migrations.RunPython(backfill_price_paid, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.1 on 2026-10-17 03:40
+
+import tickets.models
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0006_event_created_at_event_updated_at_and_more'),
+        ('tickets', '0010_ticket_price_paid'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='ticketchange',
+            name='ticket_change_event_id',
+        ),
+        migrations.AddField(
+            model_name='ticket',
+            name='txid',
+            field=models.BigIntegerField(db_default=tickets.models.CurrentTransaction(), editable=False),
+        ),
+        migrations.AddField(
+            model_name='ticketchange',
+            name='txid',
+            field=models.BigIntegerField(db_default=tickets.models.CurrentTransaction(), editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['ticket_type', 'txid'], name='ticket_type_txid'),
+        ),
+        migrations.AddIndex(
+            model_name='ticketchange',
+            index=models.Index(fields=['event', 'txid'], name='ticket_change_event_txid'),
+        ),
+    ]
@@ -5,6 +5,23 @@ from django.utils import timezone
 from django.contrib.auth import get_user_model
 
 
+class CurrentTransaction(models.Func):
+    """Id 64 bits de la transaction Postgres qui écrit la ligne"""
+    template = 'pg_current_xact_id()::text::bigint'
+    output_field = models.BigIntegerField()
+
+
+class TicketTypeQuerySet(models.QuerySet):
+    def with_availability(self):
+        """Ajoute sold_count / remaining_count, filtrables et triables en SQL"""
+        return self.annotate(
+            sold_count=models.F('sold'),
+            remaining_count=models.ExpressionWrapper(
+                models.F('quantity') - models.F('sold'), output_field=models.IntegerField()
+            ),
+        )
+
+
 class TicketType(models.Model):
     """Un type de ticket mis en vente par un promoteur pour un événement"""
     event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name="ticket_types")
@@ -14,17 +31,32 @@ class TicketType(models.Model):
     sale_starts = models.DateTimeField()
     sale_ends = models.DateTimeField()
     created_by = models.ForeignKey(get_user_model(), on_delete=models.CASCADE, related_name='ticket_types', null=True, blank=True)
+    # Compteurs dénormalisés, modifiés uniquement par tickets.services.inventory
+    sold = models.PositiveIntegerField(default=0, editable=False)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0, editable=False)
+
+    objects = TicketTypeQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.CheckConstraint(condition=models.Q(sold__lte=models.F('quantity')),
+                                   name='ticket_type_sold_lte_quantity'),
+        ]
+        # Catalogue en vente d'un événement (tickets.services.catalog)
+        indexes = [
+            models.Index(fields=['event', 'sale_starts', 'sale_ends'], name='ticket_type_event_sale'),
+        ]
 
     def __str__(self):
         return f"{self.name} - {self.event.title}"
 
     @property
     def tickets_sold(self):
-        return self.tickets.count()
+        return self.sold
 
     @property
     def tickets_remaining(self):
-        return self.quantity - self.tickets_sold
+        return self.quantity - self.sold
 
 
 class Ticket(models.Model):
@@ -32,6 +64,54 @@ class Ticket(models.Model):
     ticket_type = models.ForeignKey(TicketType, on_delete=models.CASCADE, related_name="tickets", null=True)
     buyer = models.ForeignKey(User, on_delete=models.CASCADE, limit_choices_to={'role': 'fan'})
     purchased_at = models.DateTimeField(default=timezone.now)
+    # Prix payé, remboursé tel quel même si le prix du type a changé depuis
+    price_paid = models.DecimalField(max_digits=8, decimal_places=2, default=0, editable=False)
+    # Écrit par lots depuis tickets.services.admission
+    admitted_at = models.DateTimeField(null=True, blank=True, editable=False)
+    # Transaction d'insertion, ordre de validation des manifestes en delta
+    txid = models.BigIntegerField(db_default=CurrentTransaction(), editable=False)
+
+    class Meta:
+        # Pagination par curseur des listes de tickets (tickets.pagination)
+        indexes = [
+            models.Index(fields=['buyer', '-purchased_at', '-id'], name='ticket_buyer_purchased'),
+            models.Index(fields=['ticket_type', '-purchased_at', '-id'], name='ticket_type_purchased'),
+            models.Index(fields=['ticket_type', 'txid'], name='ticket_type_txid'),
+        ]
 
     def __str__(self):
         return f"{self.ticket_type.name} - {self.buyer.name}"
+
+
+class TicketSalesDaily(models.Model):
+    """Ventes d'un type de ticket sur une journée, tenues à jour à chaque achat"""
+    ticket_type = models.ForeignKey(TicketType, on_delete=models.CASCADE, related_name="daily_sales")
+    day = models.DateField()
+    tickets = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['ticket_type', 'day'], name='ticket_sales_daily_type_day'),
+        ]
+
+    def __str__(self):
+        return f"{self.ticket_type_id} {self.day}: {self.tickets}"
+
+
+class TicketChange(models.Model):
+    """
+    Journal des tickets retirés ou ajoutés à un événement hors achat
+    (suppression, changement de type), pour les manifestes en delta.
+    """
+    event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name="ticket_changes")
+    ticket_id = models.BigIntegerField()
+    revoked = models.BooleanField(default=True)
+    changed_at = models.DateTimeField(default=timezone.now)
+    txid = models.BigIntegerField(db_default=CurrentTransaction(), editable=False)
+
+    class Meta:
+        indexes = [models.Index(fields=['event', 'txid'], name='ticket_change_event_txid')]
+
+    def __str__(self):
+        return f"{'-' if self.revoked else '+'}{self.ticket_id} ({self.event_id})"
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Pagination par curseur (keyset) des listes de tickets.
+
+Les pages suivent (purchased_at, id) du plus récent au plus ancien : la
+page suivante est lue à partir du dernier ticket servi, sur les index
+(buyer | ticket_type, purchased_at, id), sans OFFSET. Les achats arrivés
+entre deux pages sont plus récents que le curseur et ne décalent rien.
+Le total est estimé par le planner de Postgres au-delà de
+EXACT_COUNT_LIMIT, pour ne pas payer un COUNT(*) sur 40k tickets.
+"""
+
+import base64
+import json
+from django.db import connection
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+EXACT_COUNT_LIMIT = 1000
+
+
+def encode_cursor(purchased_at, ticket_id):
+    raw = json.dumps([purchased_at.isoformat(), ticket_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Renvoie (purchased_at, id), ValueError si le curseur est invalide"""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        purchased_at, ticket_id = json.loads(raw)
+        purchased_at = parse_datetime(purchased_at)
+    except (TypeError, ValueError) as exc:
+        raise ValueError("Invalid cursor.") from exc
+    if purchased_at is None or not isinstance(ticket_id, int):
+        raise ValueError("Invalid cursor.")
+    return purchased_at, ticket_id
+
+
+def approximate_count(queryset):
+    """COUNT exact jusqu'à EXACT_COUNT_LIMIT, estimation d'EXPLAIN au-delà"""
+    exact = queryset.order_by()[:EXACT_COUNT_LIMIT + 1].count()
+    if exact <= EXACT_COUNT_LIMIT:
+        return exact
+
+    sql, params = queryset.order_by().query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return max(int(plan[0]['Plan']['Plan Rows']), exact)
+
+
+class TicketCursorPagination(BasePagination):
+    page_size = 50
+    max_page_size = 200
+    page_size_query_param = 'page_size'
+    cursor_query_param = 'cursor'
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(size, 1), self.max_page_size)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        page_size = self.get_page_size(request)
+        self.count = approximate_count(queryset)
+
+        token = request.query_params.get(self.cursor_query_param)
+        if token:
+            try:
+                purchased_at, ticket_id = decode_cursor(token)
+            except ValueError:
+                raise NotFound("Invalid cursor.")
+            queryset = queryset.filter(
+                Q(purchased_at__lt=purchased_at) | Q(purchased_at=purchased_at, id__lt=ticket_id)
+            )
+
+        # Une ligne de plus pour savoir s'il existe une page suivante
+        page = list(queryset.order_by('-purchased_at', '-id')[:page_size + 1])
+        self.has_next = len(page) > page_size
+        page = page[:page_size]
+        self.last = page[-1] if page else None
+        return page
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(
+            url, self.cursor_query_param, encode_cursor(self.last.purchased_at, self.last.pk)
+        )
+
+    def get_paginated_response(self, data):
+        return Response({
+            'count': self.count,
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['count', 'results'],
+            'properties': {
+                'count': {'type': 'integer', 'example': 123},
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
@@ -2,8 +2,10 @@
 """tickets serializers"""
 
 
+from django.conf import settings
 from rest_framework import serializers
 from .models import Ticket, TicketType
+from .services import admission
 
 class TicketTypeSerializer(serializers.ModelSerializer):
     tickets_sold = serializers.IntegerField(read_only=True)
@@ -13,13 +15,64 @@ class TicketTypeSerializer(serializers.ModelSerializer):
         model = TicketType
         fields = ['id', 'event', 'name', 'price', 'quantity', 'sale_starts', 'sale_ends', 'tickets_sold', 'tickets_remaining']
 
+    def validate_quantity(self, value):
+        if self.instance and value < self.instance.sold:
+            raise serializers.ValidationError("Quantity cannot be lower than tickets already sold.")
+        return value
+
 
 class TicketSerializer(serializers.ModelSerializer):
     ticket_type_name = serializers.CharField(source='ticket_type.name', read_only=True)
     event_title = serializers.CharField(source='ticket_type.event.title', read_only=True)
+    code = serializers.SerializerMethodField()
 
     class Meta:
         model = Ticket
-        fields = ['id', 'ticket_type', 'ticket_type_name', 'event_title', 'buyer', 'purchased_at']
+        fields = ['id', 'ticket_type', 'ticket_type_name', 'event_title', 'buyer', 'purchased_at', 'code']
         read_only_fields = ['id', 'buyer', 'purchased_at']
 
+    def get_code(self, obj):
+        return admission.sign(obj) if obj.ticket_type_id else None
+
+
+
+class TicketHoldSerializer(serializers.Serializer):
+    # Pas de PrimaryKeyRelatedField : un hold ne doit pas lire la base
+    ticket_type = serializers.IntegerField(min_value=1)
+    quantity = serializers.IntegerField(min_value=1, max_value=settings.TICKET_HOLD_MAX_QUANTITY, default=1)
+
+
+class HoldConfirmSerializer(serializers.Serializer):
+    hold = serializers.CharField(max_length=64)
+
+
+class CartLineSerializer(serializers.Serializer):
+    ticket_type = serializers.IntegerField(min_value=1)
+    quantity = serializers.IntegerField(min_value=1, max_value=settings.TICKET_CART_MAX_QUANTITY)
+
+
+class BulkPurchaseSerializer(serializers.Serializer):
+    lines = CartLineSerializer(many=True, allow_empty=False)
+
+    def validate_lines(self, value):
+        # Plusieurs lignes du même type sont fusionnées
+        lines = {}
+        for line in value:
+            lines[line['ticket_type']] = lines.get(line['ticket_type'], 0) + line['quantity']
+        if sum(lines.values()) > settings.TICKET_CART_MAX_QUANTITY:
+            raise serializers.ValidationError("Too many tickets in one cart.")
+        return lines
+
+
+class TicketScanSerializer(serializers.Serializer):
+    code = serializers.CharField(max_length=64)
+    event = serializers.IntegerField(min_value=1)
+
+
+class RenderEventSerializer(serializers.Serializer):
+    event = serializers.IntegerField(min_value=1)
+
+
+class SalesDashboardSerializer(serializers.Serializer):
+    event = serializers.IntegerField(min_value=1, required=False, source='event_id')
+    days = serializers.IntegerField(min_value=1, max_value=366, default=30)
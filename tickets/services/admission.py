@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Contrôle des tickets à l'entrée des salles.
+
+Chaque ticket porte un code compact signé (HMAC) avec son id, son type
+et son événement : un scanner le vérifie sans lire la base. L'entrée est
+marquée atomiquement dans un bitmap Redis par événement, indexé par id
+de ticket ; un deuxième passage du même ticket est détecté en O(1). Les
+entrées sont écrites dans Ticket.admitted_at par lots
+(flush_ticket_admissions).
+
+Clés Redis :
+- tickets:event:{id}:admitted   bitmap des tickets entrés
+- tickets:event:{id}:revoked    bitmap des tickets révoqués (manifest)
+- tickets:admissions            entrées à écrire en base, "ticket:timestamp"
+"""
+
+import base64
+import hashlib
+import hmac
+import struct
+import time
+from datetime import datetime, timezone as dt_timezone
+from django.conf import settings
+from django.db.models import Case, DateTimeField, Value, When
+from users.core.redis import redis_client
+
+
+QUEUE_KEY = 'tickets:admissions'
+INFLIGHT_KEY = 'tickets:admissions:inflight'
+LOCK_KEY = 'tickets:admissions:lock'
+
+LOCK_TIMEOUT = 60
+OWNER_TTL = 300
+
+VERSION = 1
+# Version, ticket, type, événement ; les offsets d'un bitmap Redis tiennent sur 32 bits
+PAYLOAD = struct.Struct('>BIII')
+MAC_SIZE = 10
+
+# KEYS: bitmap, file, révoqués ; ARGV: ticket id, entrée, ttl du bitmap
+# Renvoie 1 à la première entrée, 0 si le ticket est déjà entré, -1 s'il est révoqué
+_ADMIT = redis_client.register_script("""
+if redis.call('GETBIT', KEYS[3], ARGV[1]) == 1 then
+    return -1
+end
+if redis.call('SETBIT', KEYS[1], ARGV[1], 1) == 1 then
+    return 0
+end
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+redis.call('RPUSH', KEYS[2], ARGV[2])
+return 1
+""")
+
+# Déplace jusqu'à ARGV[1] entrées de la file vers la liste en cours
+_CLAIM = redis_client.register_script("""
+local items = redis.call('LRANGE', KEYS[1], 0, tonumber(ARGV[1]) - 1)
+if #items > 0 then
+    redis.call('LTRIM', KEYS[1], #items, -1)
+    redis.call('RPUSH', KEYS[2], unpack(items))
+end
+return items
+""")
+
+
+class ScanError(Exception):
+    """Entrée refusée ; `reason` vaut invalid, wrong_event, revoked ou duplicate"""
+
+    def __init__(self, reason, message):
+        super().__init__(message)
+        self.reason = reason
+
+
+def _mac(payload):
+    key = settings.TICKET_SIGNING_KEY.encode()
+    return hmac.new(key, payload, hashlib.sha256).digest()[:MAC_SIZE]
+
+
+def encode(ticket_id, ticket_type_id, event_id):
+    payload = PAYLOAD.pack(VERSION, ticket_id, ticket_type_id, event_id)
+    return base64.urlsafe_b64encode(payload + _mac(payload)).decode().rstrip('=')
+
+
+def sign(ticket):
+    """Code du ticket ; ticket chargé avec son type"""
+    return encode(ticket.pk, ticket.ticket_type_id, ticket.ticket_type.event_id)
+
+
+def verify(code):
+    """Renvoie (ticket, type, événement), ValueError si le code est invalide"""
+    try:
+        raw = base64.urlsafe_b64decode(code + '=' * (-len(code) % 4))
+    except (TypeError, ValueError) as exc:
+        raise ValueError("Invalid ticket code.") from exc
+    payload, mac = raw[:PAYLOAD.size], raw[PAYLOAD.size:]
+    if len(raw) != PAYLOAD.size + MAC_SIZE or not hmac.compare_digest(mac, _mac(payload)):
+        raise ValueError("Invalid ticket code.")
+    version, ticket_id, ticket_type_id, event_id = PAYLOAD.unpack(payload)
+    if version != VERSION:
+        raise ValueError("Invalid ticket code.")
+    return ticket_id, ticket_type_id, event_id
+
+
+def admitted_key(event_id):
+    return f"tickets:event:{event_id}:admitted"
+
+
+def revoked_key(event_id):
+    return f"tickets:event:{event_id}:revoked"
+
+
+def scan(code, event_id, now=None):
+    """Fait entrer un ticket à l'événement `event_id`, ScanError sinon"""
+    try:
+        ticket_id, ticket_type_id, ticket_event_id = verify(code)
+    except ValueError as exc:
+        raise ScanError('invalid', str(exc))
+    if ticket_event_id != event_id:
+        raise ScanError('wrong_event', "Ticket for another event.")
+
+    now = now or time.time()
+    admitted = _ADMIT(
+        keys=[admitted_key(event_id), QUEUE_KEY, revoked_key(event_id)],
+        args=[ticket_id, f"{ticket_id}:{now}", settings.TICKET_ADMISSION_TTL],
+    )
+    if admitted == -1:
+        raise ScanError('revoked', "Ticket revoked.")
+    if not admitted:
+        raise ScanError('duplicate', "Ticket already admitted.")
+    return {'ticket': ticket_id, 'ticket_type': ticket_type_id, 'event': event_id}
+
+
+def is_admitted(event_id, ticket_id):
+    return bool(redis_client.getbit(admitted_key(event_id), ticket_id))
+
+
+def event_owner(event_id):
+    """Créateur de l'événement, en cache OWNER_TTL secondes ; None si inconnu"""
+    from events.models import Event
+
+    key = f"tickets:event:{event_id}:owner"
+    owner = redis_client.get(key)
+    if owner is None:
+        owner = Event.objects.filter(pk=event_id).values_list('created_by_id', flat=True).first()
+        owner = owner or ''
+        redis_client.set(key, owner, ex=OWNER_TTL)
+    return int(owner) if owner else None
+
+
+def flush(batch_size=None):
+    """
+    Écrit un lot d'entrées dans Ticket.admitted_at.
+    Renvoie le nombre d'entrées traitées, 0 si un autre worker écrit.
+    """
+    from tickets.models import Ticket
+
+    batch_size = batch_size or settings.TICKET_ADMISSION_BATCH_SIZE
+    lock = redis_client.lock(LOCK_KEY, timeout=LOCK_TIMEOUT)
+    if not lock.acquire(blocking=False):
+        return 0
+
+    try:
+        # Reprendre d'abord ce qu'un worker tombé a laissé en cours
+        entries = redis_client.lrange(INFLIGHT_KEY, 0, -1)
+        if not entries:
+            entries = _CLAIM(keys=[QUEUE_KEY, INFLIGHT_KEY], args=[batch_size])
+        if not entries:
+            return 0
+
+        admitted = {}
+        for entry in entries:
+            ticket_id, timestamp = entry.split(':')
+            admitted.setdefault(int(ticket_id), datetime.fromtimestamp(float(timestamp), dt_timezone.utc))
+
+        # La première entrée connue en base est gardée
+        Ticket.objects.filter(pk__in=list(admitted), admitted_at__isnull=True).update(
+            admitted_at=Case(
+                *(When(pk=ticket_id, then=Value(at)) for ticket_id, at in admitted.items()),
+                output_field=DateTimeField(),
+            )
+        )
+        redis_client.delete(INFLIGHT_KEY)
+        return len(entries)
+    finally:
+        lock.release()
+
+
+def drain(batch_size=None):
+    """Écrit jusqu'à vider la file"""
+    total = 0
+    while True:
+        handled = flush(batch_size)
+        if not handled:
+            if redis_client.llen(QUEUE_KEY) or redis_client.llen(INFLIGHT_KEY):
+                time.sleep(0.05)  # Un autre worker a le verrou
+                continue
+            return total
+        total += handled
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Catalogue "en vente maintenant" d'un événement.
+
+Le catalogue (types dont la fenêtre de vente est ouverte) est mis en
+cache jusqu'à la prochaine ouverture ou fermeture de fenêtre : le cache
+expire exactement quand la liste change, et toute modification d'un
+type l'invalide. Un compteur de génération, incrémenté par chaque
+invalidation, empêche d'écrire un catalogue lu en base avant elle. Les
+places restantes ne sont pas figées dans le cache :
+elles sont lues à chaque requête dans le stock Redis des holds, puis
+dans le cache sale_info, et en base en une requête pour le reste.
+"""
+
+import json
+import math
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from users.core.redis import redis_client
+from . import holds
+
+
+# KEYS: catalogue, génération ; ARGV: catalogue, ttl, génération lue avant la construction
+# N'écrit le catalogue que si aucune invalidation n'est passée depuis
+_STORE = redis_client.register_script("""
+if (redis.call('GET', KEYS[2]) or '0') ~= ARGV[3] then
+    return 0
+end
+redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[2])
+return 1
+""")
+
+
+def _key(event_id):
+    return f"tickets:event:{event_id}:catalog"
+
+
+def _generation_key(event_id):
+    return f"{_key(event_id)}:generation"
+
+
+def build(event_id, now=None):
+    """Renvoie (types en vente, secondes jusqu'à la prochaine borne de fenêtre)"""
+    from tickets.models import TicketType
+
+    now = now or timezone.now()
+    on_sale, boundaries = [], []
+    rows = TicketType.objects.filter(event_id=event_id, sale_ends__gte=now).values(
+        'id', 'name', 'price', 'quantity', 'sold', 'sale_starts', 'sale_ends'
+    ).order_by('price', 'id')
+    for row in rows:
+        if row['sale_starts'] > now:
+            boundaries.append(row['sale_starts'])
+            continue
+        boundaries.append(row['sale_ends'])
+        on_sale.append({
+            'id': row['id'],
+            'name': row['name'],
+            'price': str(row['price']),
+            'quantity': row['quantity'],
+            'remaining': row['quantity'] - row['sold'],
+            'sale_starts': row['sale_starts'].isoformat(),
+            'sale_ends': row['sale_ends'].isoformat(),
+        })
+
+    ttl = settings.TICKET_CATALOG_MAX_TTL
+    if boundaries:
+        # sale_ends est inclus : la fenêtre ferme juste après
+        ttl = min(ttl, math.floor((min(boundaries) - now).total_seconds()) + 1)
+    return on_sale, max(ttl, 1)
+
+
+def on_sale(event_id, now=None):
+    """Types en vente de l'événement, avec leurs places restantes à jour"""
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.get(_key(event_id))
+    pipe.get(_generation_key(event_id))
+    raw, generation = pipe.execute()
+    if raw is None:
+        ticket_types, ttl = build(event_id, now)
+        _STORE(keys=[_key(event_id), _generation_key(event_id)],
+               args=[json.dumps(ticket_types), ttl, generation or '0'])
+    else:
+        ticket_types = json.loads(raw)
+    return _overlay_remaining(ticket_types)
+
+
+def invalidate(event_id):
+    pipe = redis_client.pipeline()
+    pipe.incr(_generation_key(event_id))
+    # Survit à toute construction en cours, qui dure moins qu'un catalogue
+    pipe.expire(_generation_key(event_id), settings.TICKET_CATALOG_MAX_TTL * 2)
+    pipe.delete(_key(event_id))
+    pipe.execute()
+
+
+def _overlay_remaining(ticket_types):
+    from tickets.models import TicketType
+
+    if not ticket_types:
+        return ticket_types
+    pipe = redis_client.pipeline(transaction=False)
+    for ticket_type in ticket_types:
+        keys = holds._keys(ticket_type['id'])
+        pipe.get(keys['stock'])
+        pipe.hget(keys['info'], 'available')
+    values = pipe.execute()
+
+    missing = {}
+    for index, ticket_type in enumerate(ticket_types):
+        stock, available = values[2 * index], values[2 * index + 1]
+        if stock is not None:
+            # Stock des holds : places ni vendues ni retenues
+            ticket_type['remaining'] = max(int(stock), 0)
+        elif available is not None:
+            ticket_type['remaining'] = int(available)
+        else:
+            missing[ticket_type['id']] = ticket_type
+
+    if missing:
+        pipe = redis_client.pipeline()
+        rows = TicketType.objects.filter(pk__in=list(missing)).values_list(
+            'pk', 'quantity', 'sold', 'sale_starts', 'sale_ends')
+        for ticket_type_id, quantity, sold, sale_starts, sale_ends in rows:
+            missing[ticket_type_id]['remaining'] = quantity - sold
+            # Même format que holds.sale_info, qui le relira aussi ; fenêtre lue
+            # en base avec le stock, jamais recopiée d'un catalogue en cache
+            info_key = holds._keys(ticket_type_id)['info']
+            pipe.hset(info_key, mapping={
+                'available': quantity - sold,
+                'sale_starts': sale_starts.isoformat(),
+                'sale_ends': sale_ends.isoformat(),
+            })
+            pipe.expire(info_key, holds.INFO_TTL)
+        pipe.execute()
+
+    for ticket_type in ticket_types:
+        ticket_type['sale_starts'] = parse_datetime(ticket_type['sale_starts'])
+        ticket_type['sale_ends'] = parse_datetime(ticket_type['sale_ends'])
+    return ticket_types
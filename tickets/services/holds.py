@@ -0,0 +1,383 @@
+#!/usr/bin/env python3
+"""
+Réservations (holds) de tickets pendant une mise en vente.
+
+Un acheteur obtient d'abord un hold court dans Redis, pris atomiquement
+sur le stock restant, puis le confirme : seule la confirmation touche
+Postgres (inventory.reserve + insertion des tickets). Les holds non
+confirmés rendent leur stock à l'expiration. Les achats directs (sans
+hold) prennent aussi leurs places sur ce stock avant la base, pour ne
+jamais vendre une place retenue par un hold. Les holds admis par seconde
+et par type de ticket sont limités à TICKET_HOLD_ADMISSION_RATE.
+
+Clés Redis par type de ticket :
+- tickets:{id}:stock    places ni vendues ni retenues
+- tickets:{id}:holds    zset des holds actifs, score = expiration
+- tickets:{id}:info     fenêtre de vente et stock en base, en cache
+- tickets:{id}:metrics  holds émis, expirés, convertis, annulés, refusés
+Postgres reste la référence : le compteur sold refuse toute survente.
+"""
+
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from users.core.redis import redis_client
+
+
+TYPES_KEY = 'tickets:holds:types'
+
+INFO_TTL = 30
+
+# Rendre au stock les holds expirés, commun à tous les scripts
+_RECLAIM = """
+local function reclaim(stock_key, holds_key, metrics_key, now)
+    local expired = redis.call('ZRANGEBYSCORE', holds_key, '-inf', now)
+    for _, member in ipairs(expired) do
+        local quantity = tonumber(string.match(member, '|(%d+)$'))
+        if redis.call('EXISTS', stock_key) == 1 then
+            redis.call('INCRBY', stock_key, quantity)
+        end
+        redis.call('ZREM', holds_key, member)
+    end
+    if #expired > 0 then
+        redis.call('HINCRBY', metrics_key, 'expired', #expired)
+    end
+    return #expired
+end
+
+-- Initialiser le stock depuis les places libres en base moins les holds actifs
+local function ensure_stock(stock_key, holds_key, available)
+    if redis.call('EXISTS', stock_key) == 0 then
+        local held = 0
+        for _, member in ipairs(redis.call('ZRANGE', holds_key, 0, -1)) do
+            held = held + tonumber(string.match(member, '|(%d+)$'))
+        end
+        redis.call('SET', stock_key, available - held)
+    end
+end
+"""
+
+# KEYS: stock, holds, metrics, hold, window, types
+# ARGV: now, ttl, member, quantity, available en base, rate (0 : sans limite), type id
+# Renvoie 1 si le hold est pris, 0 si épuisé, -1 si limité
+_HOLD = redis_client.register_script(_RECLAIM + """
+local now = tonumber(ARGV[1])
+local quantity = tonumber(ARGV[4])
+
+local admitted = redis.call('INCR', KEYS[5])
+if admitted == 1 then
+    redis.call('EXPIRE', KEYS[5], 2)
+end
+if tonumber(ARGV[6]) > 0 and admitted > tonumber(ARGV[6]) then
+    redis.call('HINCRBY', KEYS[3], 'throttled', 1)
+    return -1
+end
+
+reclaim(KEYS[1], KEYS[2], KEYS[3], now)
+ensure_stock(KEYS[1], KEYS[2], tonumber(ARGV[5]))
+
+if tonumber(redis.call('GET', KEYS[1])) < quantity then
+    redis.call('HINCRBY', KEYS[3], 'sold_out', 1)
+    return 0
+end
+redis.call('DECRBY', KEYS[1], quantity)
+redis.call('ZADD', KEYS[2], now + tonumber(ARGV[2]), ARGV[3])
+redis.call('SET', KEYS[4], ARGV[3], 'EX', tonumber(ARGV[2]) * 2)
+redis.call('SADD', KEYS[6], ARGV[7])
+redis.call('HINCRBY', KEYS[3], 'issued', 1)
+return 1
+""")
+
+# KEYS: stock, holds, metrics ; ARGV: now, quantité, available en base
+# Prend des places pour un achat direct, sans hold : 1 si pris, 0 si épuisé
+_TAKE = redis_client.register_script(_RECLAIM + """
+reclaim(KEYS[1], KEYS[2], KEYS[3], tonumber(ARGV[1]))
+ensure_stock(KEYS[1], KEYS[2], tonumber(ARGV[3]))
+if tonumber(redis.call('GET', KEYS[1])) < tonumber(ARGV[2]) then
+    return 0
+end
+redis.call('DECRBY', KEYS[1], ARGV[2])
+return 1
+""")
+
+# KEYS: stock, holds, metrics ; ARGV: now, available en base
+# Renvoie les places ni vendues ni retenues
+_REMAINING = redis_client.register_script(_RECLAIM + """
+reclaim(KEYS[1], KEYS[2], KEYS[3], tonumber(ARGV[1]))
+ensure_stock(KEYS[1], KEYS[2], tonumber(ARGV[2]))
+return tonumber(redis.call('GET', KEYS[1]))
+""")
+
+# KEYS: stock ; ARGV: quantité
+# Rend des places au stock s'il existe : recréé à partir de ces seules places, il serait faux
+_GIVE_BACK = redis_client.register_script("""
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    return redis.call('INCRBY', KEYS[1], ARGV[1])
+end
+return false
+""")
+
+# KEYS: hold, holds ; ARGV: now, user id
+# Retire un hold encore valide de cet acheteur et renvoie son membre
+_CLAIM = redis_client.register_script("""
+local member = redis.call('GET', KEYS[1])
+if not member or string.match(member, '^[^|]*|([^|]*)|') ~= ARGV[2] then
+    return false
+end
+redis.call('DEL', KEYS[1])
+local expires = redis.call('ZSCORE', KEYS[2], member)
+if not expires or tonumber(expires) <= tonumber(ARGV[1]) then
+    return false
+end
+redis.call('ZREM', KEYS[2], member)
+return member
+""")
+
+# KEYS: stock, holds, metrics ; ARGV: now
+_REAP = redis_client.register_script(_RECLAIM + """
+return reclaim(KEYS[1], KEYS[2], KEYS[3], tonumber(ARGV[1]))
+""")
+
+
+class HoldError(Exception):
+    """Hold refusé ; `reason` vaut closed, sold_out, throttled ou invalid"""
+
+    def __init__(self, reason, message):
+        super().__init__(message)
+        self.reason = reason
+
+
+def _keys(ticket_type_id):
+    prefix = f"tickets:{ticket_type_id}"
+    return {
+        'stock': f"{prefix}:stock",
+        'holds': f"{prefix}:holds",
+        'info': f"{prefix}:info",
+        'metrics': f"{prefix}:metrics",
+    }
+
+
+def _hold_key(hold_id):
+    return f"tickets:hold:{hold_id}"
+
+
+def sale_info(ticket_type_id):
+    """Fenêtre de vente et places restantes en base, en cache INFO_TTL secondes"""
+    return sale_infos([ticket_type_id]).get(ticket_type_id)
+
+
+def sale_infos(ticket_type_ids):
+    """sale_info de plusieurs types, les absents du cache lus en une requête"""
+    from tickets.models import TicketType
+
+    ticket_type_ids = list(ticket_type_ids)
+    pipe = redis_client.pipeline(transaction=False)
+    for ticket_type_id in ticket_type_ids:
+        pipe.hgetall(_keys(ticket_type_id)['info'])
+    infos = {ticket_type_id: info for ticket_type_id, info in zip(ticket_type_ids, pipe.execute()) if info}
+
+    # Ids gardés tels que l'appelant les donne : entiers, ou chaînes lues dans Redis
+    missing = {str(ticket_type_id): ticket_type_id for ticket_type_id in ticket_type_ids
+               if ticket_type_id not in infos}
+    if missing:
+        pipe = redis_client.pipeline()
+        rows = TicketType.objects.filter(pk__in=list(missing.values())).values(
+            'pk', 'quantity', 'sold', 'sale_starts', 'sale_ends'
+        )
+        for row in rows:
+            info = {
+                'available': row['quantity'] - row['sold'],
+                'sale_starts': row['sale_starts'].isoformat(),
+                'sale_ends': row['sale_ends'].isoformat(),
+            }
+            ticket_type_id = missing[str(row['pk'])]
+            infos[ticket_type_id] = info
+            pipe.hset(_keys(ticket_type_id)['info'], mapping=info)
+            pipe.expire(_keys(ticket_type_id)['info'], INFO_TTL)
+        pipe.execute()
+
+    return {
+        ticket_type_id: {
+            'available': int(info['available']),
+            'sale_starts': parse_datetime(info['sale_starts']),
+            'sale_ends': parse_datetime(info['sale_ends']),
+        }
+        for ticket_type_id, info in infos.items()
+    }
+
+
+def hold(ticket_type_id, user_id, quantity=1, admission_rate=None):
+    """
+    Retient `quantity` places, renvoie (hold_id, expires_at) ou lève HoldError.
+    `admission_rate=0` lève la limite d'admission (offres de la liste d'attente).
+    """
+    info = sale_info(ticket_type_id)
+    if info is None:
+        raise HoldError('invalid', "Unknown ticket type.")
+    now = timezone.now()
+    if not (info['sale_starts'] <= now <= info['sale_ends']):
+        raise HoldError('closed', "Sale close for this ticket.")
+
+    hold_id = uuid.uuid4().hex
+    member = f"{hold_id}|{user_id}|{quantity}"
+    keys = _keys(ticket_type_id)
+    ttl = settings.TICKET_HOLD_TTL
+    taken = _HOLD(
+        keys=[keys['stock'], keys['holds'], keys['metrics'], _hold_key(hold_id),
+              f"tickets:{ticket_type_id}:admitted:{int(time.time())}", TYPES_KEY],
+        args=[time.time(), ttl, member, quantity, info['available'],
+              settings.TICKET_HOLD_ADMISSION_RATE if admission_rate is None else admission_rate,
+              ticket_type_id],
+    )
+    if taken == -1:
+        raise HoldError('throttled', "Too many buyers, retry in a moment.")
+    if taken == 0:
+        raise HoldError('sold_out', "Ce ticket est épuisé.")
+    return f"{ticket_type_id}.{hold_id}", now + timedelta(seconds=ttl)
+
+
+def confirm(hold_token, buyer):
+    """Transforme un hold valide en tickets, renvoie la liste des tickets créés"""
+    from tickets.models import Ticket
+    from tickets.services import inventory
+
+    ticket_type_id, hold_id, user_id, quantity = _claim(hold_token, buyer.pk)
+    keys = _keys(ticket_type_id)
+    try:
+        with transaction.atomic():
+            price = inventory.reserve(ticket_type_id, quantity)
+            if price is None:
+                raise HoldError('sold_out', "Ce ticket est épuisé.")
+            tickets = Ticket.objects.bulk_create([
+                Ticket(ticket_type_id=ticket_type_id, buyer=buyer, price_paid=price)
+                for _ in range(quantity)
+            ])
+    except HoldError:
+        redis_client.delete(keys['stock'])  # Désynchronisé : recalculé au prochain hold
+        raise
+    except Exception:
+        give_back(ticket_type_id, quantity)
+        raise
+
+    pipe = redis_client.pipeline()
+    pipe.hincrby(keys['metrics'], 'converted', 1)
+    pipe.delete(keys['info'])  # Le stock en base a changé
+    pipe.execute()
+    return tickets
+
+
+def release(hold_token, user_id):
+    """Annule un hold : les places reviennent tout de suite au stock"""
+    ticket_type_id, _, _, quantity = _claim(hold_token, user_id)
+    give_back(ticket_type_id, quantity)
+    redis_client.hincrby(_keys(ticket_type_id)['metrics'], 'released', 1)
+
+
+def take(ticket_type_id, quantity=1, info=None):
+    """Prend des places pour un achat direct ; False si le stock restant ne suffit pas"""
+    info = info or sale_info(ticket_type_id)
+    if info is None:
+        raise HoldError('invalid', "Unknown ticket type.")
+    keys = _keys(ticket_type_id)
+    return bool(_TAKE(keys=[keys['stock'], keys['holds'], keys['metrics']],
+                      args=[time.time(), quantity, info['available']]))
+
+
+def remaining(ticket_type_id, info=None):
+    """Places ni vendues ni retenues par un hold"""
+    info = info or sale_info(ticket_type_id)
+    if info is None:
+        raise HoldError('invalid', "Unknown ticket type.")
+    keys = _keys(ticket_type_id)
+    return _REMAINING(keys=[keys['stock'], keys['holds'], keys['metrics']],
+                      args=[time.time(), info['available']])
+
+
+def give_back(ticket_type_id, quantity):
+    """Rend au stock des places prises mais pas vendues"""
+    _GIVE_BACK(keys=[_keys(ticket_type_id)['stock']], args=[quantity])
+
+
+def purchased(ticket_type_ids):
+    """Achat direct commité : le stock en base a changé, le stock Redis est déjà à jour"""
+    redis_client.delete(*[_keys(ticket_type_id)['info'] for ticket_type_id in ticket_type_ids])
+
+
+@contextmanager
+def taken(lines):
+    """
+    Prend les places {ticket_type_id: quantité} d'un achat direct le temps
+    de l'écrire en base. Lève HoldError sold_out si elles sont retenues par
+    des holds ; les rend si le bloc échoue.
+    """
+    infos = sale_infos(lines)
+    done = []
+    try:
+        for ticket_type_id, quantity in lines.items():
+            if ticket_type_id not in infos:
+                raise HoldError('invalid', "Unknown ticket type.")
+            if not take(ticket_type_id, quantity, infos[ticket_type_id]):
+                raise HoldError('sold_out', "Ce ticket est épuisé.")
+            done.append((ticket_type_id, quantity))
+        yield
+    except Exception:
+        for ticket_type_id, quantity in done:
+            give_back(ticket_type_id, quantity)
+        raise
+    transaction.on_commit(lambda: purchased(list(lines)))
+
+
+def _claim(hold_token, user_id):
+    try:
+        ticket_type_id, hold_id = hold_token.split('.', 1)
+        ticket_type_id = int(ticket_type_id)
+    except ValueError:
+        raise HoldError('invalid', "Invalid hold.")
+
+    member = _CLAIM(
+        keys=[_hold_key(hold_id), _keys(ticket_type_id)['holds']],
+        args=[time.time(), user_id],
+    )
+    if not member:
+        raise HoldError('invalid', "Hold expired or unknown.")
+    return ticket_type_id, hold_id, int(user_id), int(member.rsplit('|', 1)[1])
+
+
+def invalidate(ticket_type_id):
+    """Quantité ou fenêtre de vente modifiée : stock et cache recalculés"""
+    keys = _keys(ticket_type_id)
+    redis_client.delete(keys['stock'], keys['info'])
+
+
+def reap_expired():
+    """Rend au stock les holds expirés de tous les types, renvoie leur nombre"""
+    reclaimed = 0
+    for ticket_type_id in redis_client.smembers(TYPES_KEY):
+        keys = _keys(ticket_type_id)
+        reclaimed += _REAP(keys=[keys['stock'], keys['holds'], keys['metrics']],
+                           args=[time.time()])
+        if not redis_client.zcard(keys['holds']):
+            redis_client.srem(TYPES_KEY, ticket_type_id)
+    return reclaimed
+
+
+def metrics(ticket_type_id):
+    keys = _keys(ticket_type_id)
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.hgetall(keys['metrics'])
+    pipe.zcard(keys['holds'])
+    pipe.get(keys['stock'])
+    counters, active, stock = pipe.execute()
+
+    result = {
+        name: int(counters.get(name, 0))
+        for name in ('issued', 'expired', 'converted', 'released', 'sold_out', 'throttled')
+    }
+    result['active'] = active
+    result['stock'] = int(stock) if stock is not None else None
+    return result
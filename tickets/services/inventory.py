@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Inventaire des tickets : compteur `sold` de TicketType.
+
+Chaque vente est un seul UPDATE conditionnel `sold = sold + n WHERE
+sold + n <= quantity`, exécuté dans la transaction qui crée les tickets.
+Postgres sérialise les UPDATE concurrents sur la ligne et réévalue la
+condition, donc aucune survente possible et pas de COUNT sur les tickets.
+Le même UPDATE tient le chiffre d'affaires du type et renvoie le prix
+appliqué, gardé sur les tickets (Ticket.price_paid) pour les rembourser
+à ce prix. Les ventes du jour sont ajoutées dans la même transaction
+(tickets.services.sales).
+"""
+
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+from . import sales
+
+
+_RESERVE = """
+UPDATE tickets_tickettype
+SET sold = sold + %s, revenue = revenue + price * %s
+WHERE id = %s AND sold <= quantity - %s
+RETURNING price
+"""
+
+
+class CartError(Exception):
+    """Panier refusé : aucun ticket n'a été créé"""
+
+
+def reserve(ticket_type_id, quantity=1, day=None):
+    """
+    Prend `quantity` places si elles restent et renvoie le prix unitaire
+    appliqué, None si le type est épuisé. Les ventes vont sur le jour
+    `day`, aujourd'hui par défaut.
+    """
+    with transaction.atomic(savepoint=False):
+        with connection.cursor() as cursor:
+            cursor.execute(_RESERVE, [quantity, quantity, ticket_type_id, quantity])
+            row = cursor.fetchone()
+        if row is None:
+            return None
+        price = row[0]
+        sales.record({ticket_type_id: (quantity, price * quantity)}, day)
+    return price
+
+
+def release(ticket):
+    """Rend la place d'un ticket au stock (supprimé ou remboursé), à son prix payé"""
+    from tickets.models import TicketType
+
+    with transaction.atomic(savepoint=False):
+        released = TicketType.objects.filter(
+            pk=ticket.ticket_type_id, sold__gte=1
+        ).update(sold=F('sold') - 1, revenue=F('revenue') - ticket.price_paid) == 1
+        if released:
+            sales.record({ticket.ticket_type_id: (-1, -ticket.price_paid)},
+                         timezone.localdate(ticket.purchased_at))
+    return released
+
+
+def purchase_cart(buyer, lines):
+    """
+    Achète un panier {ticket_type_id: quantité} en tout ou rien.
+    Les types sont verrouillés dans l'ordre des ids (pas de deadlock entre
+    paniers), vérifiés en une passe, puis les tickets sont insérés d'un coup.
+    """
+    from tickets.models import Ticket, TicketType
+
+    now = timezone.now()
+    with transaction.atomic():
+        ticket_types = list(TicketType.objects.select_for_update().filter(
+            pk__in=list(lines)
+        ).order_by('pk'))
+        if len(ticket_types) != len(lines):
+            raise CartError("Unknown ticket type.")
+
+        for ticket_type in ticket_types:
+            if not (ticket_type.sale_starts <= now <= ticket_type.sale_ends):
+                raise CartError(f"Sale close for {ticket_type.name}.")
+            if ticket_type.tickets_remaining < lines[ticket_type.pk]:
+                raise CartError(f"Not enough {ticket_type.name} tickets left.")
+            ticket_type.sold += lines[ticket_type.pk]
+            ticket_type.revenue += ticket_type.price * lines[ticket_type.pk]
+
+        TicketType.objects.bulk_update(ticket_types, ['sold', 'revenue'])
+        sales.record({
+            ticket_type.pk: (lines[ticket_type.pk], ticket_type.price * lines[ticket_type.pk])
+            for ticket_type in ticket_types
+        }, timezone.localdate(now))
+        return Ticket.objects.bulk_create([
+            Ticket(ticket_type=ticket_type, buyer=buyer, purchased_at=now, price_paid=ticket_type.price)
+            for ticket_type in ticket_types
+            for _ in range(lines[ticket_type.pk])
+        ])
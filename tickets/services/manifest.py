@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Manifestes hors ligne des tickets valides d'un événement.
+
+Les scanners sans réseau fiable téléchargent la liste triée des ids de
+tickets valides, en entiers 64 bits big-endian, signée par HMAC. Un delta
+depuis une version ne contient que les tickets achetés depuis et les
+changements journalisés depuis (suppressions, changements de type),
+soit quelques kilo-octets.
+
+Les ids sont attribués à l'insertion mais validés dans un autre ordre,
+ils ne datent donc pas une ligne. Chaque Ticket et TicketChange garde la
+transaction qui l'a écrit (txid) ; la version est le xmin du snapshot
+Postgres pris avant la construction : toute transaction plus ancienne
+est terminée, donc déjà lue. Un delta relit les lignes de txid >= version,
+renvoyer un ticket ou un changement déjà connu est sans effet.
+"""
+
+import base64
+import sys
+from array import array
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils.crypto import salted_hmac
+from users.core.redis import redis_client
+from . import admission
+
+
+def parse_version(token):
+    """Renvoie le txid de la version, ValueError si elle est invalide"""
+    try:
+        txid = int(token)
+    except (TypeError, ValueError) as exc:
+        raise ValueError("Invalid manifest version.") from exc
+    if txid < 0:
+        raise ValueError("Invalid manifest version.")
+    return txid
+
+
+def current_version():
+    """Plus ancienne transaction encore en cours : les précédentes sont toutes visibles"""
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT pg_snapshot_xmin(pg_current_snapshot())::text::bigint")
+        return str(cursor.fetchone()[0])
+
+
+def pack(ticket_ids):
+    """Ids triés en uint64 big-endian"""
+    packed = array('Q', sorted(ticket_ids))
+    if sys.byteorder == 'little':
+        packed.byteswap()
+    return packed.tobytes()
+
+
+def unpack(data):
+    packed = array('Q')
+    packed.frombytes(data)
+    if sys.byteorder == 'little':
+        packed.byteswap()
+    return packed.tolist()
+
+
+def sign(event_id, since, version, added, removed):
+    message = f"{event_id}:{since or ''}:{version}:".encode() + added + b':' + removed
+    return salted_hmac('tickets.manifest', message, secret=settings.TICKET_SIGNING_KEY,
+                       algorithm='sha256').hexdigest()
+
+
+def build(event_id, since=None, chunk_size=10000):
+    """Manifeste complet, ou delta depuis la version `since`"""
+    from tickets.models import Ticket, TicketChange
+
+    # La version est prise avant la lecture : ce qui arrive pendant sera dans le prochain delta
+    version = current_version()
+    tickets = Ticket.objects.filter(ticket_type__event_id=event_id)
+
+    if since is None:
+        ids = tickets.order_by('pk').values_list('pk', flat=True).iterator(chunk_size=chunk_size)
+        added, removed = pack(ids), b''
+    else:
+        txid = parse_version(since)
+        new = set(tickets.filter(txid__gte=txid).values_list('pk', flat=True))
+        # Le dernier changement d'un ticket donne son état
+        revoked = {}
+        changes = TicketChange.objects.filter(event_id=event_id, txid__gte=txid).order_by('pk')
+        for changed_id, is_revoked in changes.values_list('ticket_id', 'revoked'):
+            revoked[changed_id] = is_revoked
+        removed_ids = {changed_id for changed_id, is_revoked in revoked.items() if is_revoked}
+        added_ids = (new | {changed_id for changed_id, is_revoked in revoked.items() if not is_revoked}) - removed_ids
+        added, removed = pack(added_ids), pack(removed_ids)
+
+    return {
+        'event': event_id,
+        'since': since,
+        'version': version,
+        'added': base64.b64encode(added).decode(),
+        'removed': base64.b64encode(removed).decode(),
+        'count': len(added) // 8,
+        'signature': sign(event_id, since, version, added, removed),
+    }
+
+
+def _mark(event_id, ticket_ids, revoked):
+    from tickets.models import TicketChange
+
+    ticket_ids = list(ticket_ids)
+    if not ticket_ids:
+        return
+    TicketChange.objects.bulk_create(
+        TicketChange(event_id=event_id, ticket_id=ticket_id, revoked=revoked)
+        for ticket_id in ticket_ids
+    )
+
+    def set_bits():
+        pipe = redis_client.pipeline(transaction=False)
+        for ticket_id in ticket_ids:
+            pipe.setbit(admission.revoked_key(event_id), ticket_id, int(revoked))
+        pipe.execute()
+
+    transaction.on_commit(set_bits)
+
+
+def revoke(event_id, ticket_id):
+    """Retire un ticket d'un événement : manifestes et scan le refusent"""
+    _mark(event_id, [ticket_id], True)
+
+
+def restore(event_id, ticket_id):
+    """Ajoute un ticket existant à un événement (changement de type)"""
+    _mark(event_id, [ticket_id], False)
+
+
+def revoke_many(event_id, ticket_ids):
+    """Retire des tickets d'un événement (type supprimé ou déplacé)"""
+    _mark(event_id, ticket_ids, True)
+
+
+def restore_many(event_id, ticket_ids):
+    """Ajoute des tickets existants à un événement (type déplacé)"""
+    _mark(event_id, ticket_ids, False)
+
+
+def move_type(ticket_type_id, previous_event, event_id):
+    """Journalise le passage de tous les tickets d'un type à un autre événement"""
+    from tickets.models import Ticket
+
+    if previous_event == event_id:
+        return
+    ticket_ids = list(Ticket.objects.filter(ticket_type_id=ticket_type_id).values_list('pk', flat=True))
+    revoke_many(previous_event, ticket_ids)
+    restore_many(event_id, ticket_ids)
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Rendu des tickets en PDF avec QR code.
+
+Le rendu (qrcode + reportlab) est CPU : il tourne dans un pool de
+processus, hors du thread de la requête. Chaque PDF est mis en cache
+sous l'id du ticket et un hash de son contenu, donc un ticket modifié
+est re-rendu et un téléchargement répété ne rend rien. Un marqueur par
+clé de cache signale un rendu en cours : les sondages d'un ticket pas
+encore prêt ne relancent pas de rendu. Le rendu d'un événement entier
+charge ses tickets par lots dans un thread à part, pas dans la requête.
+"""
+
+import hashlib
+import io
+import json
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import islice
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from . import admission
+
+
+_pool = None
+_loader = None
+_pool_lock = threading.Lock()
+
+
+def ticket_content(ticket):
+    """Tout ce qui est imprimé sur le ticket ; ticket chargé avec son type, event et buyer"""
+    ticket_type = ticket.ticket_type
+    event = ticket_type.event
+    return {
+        'ticket': ticket.pk,
+        'qr': admission.sign(ticket),
+        'event': event.title,
+        'date': event.date.isoformat(),
+        'location': event.location,
+        'type': ticket_type.name,
+        'price': str(ticket.price_paid),
+        'buyer': ticket.buyer.name,
+        'purchased_at': ticket.purchased_at.isoformat(),
+    }
+
+
+def content_hash(content):
+    raw = json.dumps(content, sort_keys=True).encode()
+    return hashlib.sha256(raw).hexdigest()[:16]
+
+
+def cache_key(content):
+    return f"tickets:pdf:{content['ticket']}:{content_hash(content)}"
+
+
+def render_pdf(content):
+    """Rend un ticket en PDF, sans Django : exécuté dans le pool"""
+    import qrcode
+    from reportlab.lib.pagesizes import A6, landscape
+    from reportlab.lib.utils import ImageReader
+    from reportlab.pdfgen import canvas
+
+    qr = io.BytesIO()
+    qrcode.make(content['qr'], border=1).save(qr, format='PNG')
+    qr.seek(0)
+
+    output = io.BytesIO()
+    width, height = landscape(A6)
+    pdf = canvas.Canvas(output, pagesize=(width, height))
+    pdf.setTitle(f"Ticket {content['ticket']}")
+    pdf.setFont('Helvetica-Bold', 14)
+    pdf.drawString(20, height - 35, content['event'][:40])
+    pdf.setFont('Helvetica', 9)
+    lines = [
+        content['date'][:16].replace('T', ' '),
+        content['location'][:45],
+        f"{content['type']} - {content['price']}",
+        content['buyer'][:45],
+        f"#{content['ticket']}",
+    ]
+    for index, line in enumerate(lines):
+        pdf.drawString(20, height - 60 - index * 14, line)
+    pdf.drawImage(ImageReader(qr), width - 130, 20, 110, 110)
+    pdf.showPage()
+    pdf.save()
+    return output.getvalue()
+
+
+def pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn : pas de fork d'un processus qui a des threads et des sockets
+            _pool = ProcessPoolExecutor(
+                max_workers=settings.TICKET_RENDER_WORKERS or None,
+                mp_context=multiprocessing.get_context('spawn'),
+            )
+        return _pool
+
+
+def loader():
+    """Thread qui charge les tickets des rendus par événement"""
+    global _loader
+    with _pool_lock:
+        if _loader is None:
+            _loader = ThreadPoolExecutor(max_workers=1, thread_name_prefix='ticket-render')
+        return _loader
+
+
+def cached_pdf(content):
+    return cache.get(cache_key(content))
+
+
+def pending_key(key):
+    return f"{key}:pending"
+
+
+def submit(content):
+    """
+    Lance le rendu dans le pool ; le PDF est mis en cache à la fin.
+    Renvoie None si un rendu de ce contenu est déjà en cours.
+    """
+    key = cache_key(content)
+    if not cache.add(pending_key(key), 1, settings.TICKET_RENDER_PENDING_TTL):
+        return None
+    try:
+        future = pool().submit(render_pdf, content)
+    except Exception:
+        cache.delete(pending_key(key))
+        raise
+
+    def store(done):
+        if done.exception() is None:
+            cache.set(key, done.result(), settings.TICKET_PDF_CACHE_TTL)
+        cache.delete(pending_key(key))
+
+    future.add_done_callback(store)
+    return future
+
+
+def get_pdf(content, timeout=None):
+    """PDF en cache, sinon rendu dans le pool ; None si pas prêt après `timeout`"""
+    pdf = cached_pdf(content)
+    if pdf is not None:
+        return pdf
+    future = submit(content)
+    if future is None:
+        return None  # Déjà en cours, pour une autre requête
+    try:
+        pdf = future.result(timeout=timeout or settings.TICKET_RENDER_TIMEOUT)
+    except TimeoutError:
+        return None
+    # Le callback du pool peut passer après le retour de result()
+    key = cache_key(content)
+    cache.set(key, pdf, settings.TICKET_PDF_CACHE_TTL)
+    cache.delete(pending_key(key))
+    return pdf
+
+
+def render_tickets(tickets, wait=True, chunk_size=200):
+    """
+    Rend en lot les tickets dont le PDF n'est pas en cache.
+    Sans `wait`, les rendus sont seulement lancés dans le pool.
+    Renvoie (à rendre, déjà en cache).
+    """
+    contents = [ticket_content(ticket) for ticket in tickets]
+    cached = cache.get_many([cache_key(content) for content in contents])
+    missing = [content for content in contents if cache_key(content) not in cached]
+
+    if not wait:
+        for content in missing:
+            submit(content)  # Sans effet pour les rendus déjà en cours
+        return len(missing), len(cached)
+
+    for start in range(0, len(missing), chunk_size):
+        chunk = missing[start:start + chunk_size]
+        pdfs = pool().map(render_pdf, chunk, chunksize=16)
+        cache.set_many(
+            {cache_key(content): pdf for content, pdf in zip(chunk, pdfs)},
+            settings.TICKET_PDF_CACHE_TTL,
+        )
+    return len(missing), len(cached)
+
+
+def render_event(event_id, owner_id, chunk_size=200):
+    """
+    Lance le rendu des tickets vendus d'un événement de `owner_id`,
+    chargés par lots de `chunk_size`. Renvoie (à rendre, déjà en cache).
+    """
+    from tickets.models import Ticket
+
+    tickets = Ticket.objects.filter(
+        ticket_type__event_id=event_id, ticket_type__event__created_by_id=owner_id,
+    ).select_related('ticket_type__event', 'buyer').order_by('pk').iterator(chunk_size=chunk_size)
+    queued = cached = 0
+    while chunk := list(islice(tickets, chunk_size)):
+        missing, hits = render_tickets(chunk, wait=False)
+        queued += missing
+        cached += hits
+    return queued, cached
+
+
+def render_event_later(event_id, owner_id):
+    """render_event dans le thread de chargement ; renvoie son Future"""
+    def run():
+        try:
+            return render_event(event_id, owner_id)
+        finally:
+            connection.close()  # Connexion propre à ce thread
+    return loader().submit(run)
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Agrégats de ventes pour le tableau de bord des promoteurs.
+
+Chaque achat ou remboursement met à jour, dans sa propre transaction,
+TicketType.sold/revenue (inventory) et la ligne TicketSalesDaily du
+jour par un seul INSERT ... ON CONFLICT. Le tableau de bord ne lit que
+ces lignes : son coût suit le nombre de types et de jours, pas le
+nombre de tickets vendus. Un remboursement retire le prix payé du
+ticket, sur la ligne du jour de son achat.
+"""
+
+from collections import defaultdict
+from datetime import timedelta
+from django.db import connection
+from django.db.models import Sum
+from django.utils import timezone
+
+
+_RECORD = """
+INSERT INTO tickets_ticketsalesdaily (ticket_type_id, day, tickets, revenue)
+SELECT line.id, %s, line.quantity, line.amount
+FROM unnest(%s::bigint[], %s::integer[], %s::numeric[]) AS line(id, quantity, amount)
+ON CONFLICT (ticket_type_id, day) DO UPDATE SET
+    tickets = tickets_ticketsalesdaily.tickets + EXCLUDED.tickets,
+    revenue = tickets_ticketsalesdaily.revenue + EXCLUDED.revenue
+"""
+
+
+def record(lines, day=None):
+    """
+    Ajoute les ventes {ticket_type_id: (quantité, montant)} du jour `day`
+    (aujourd'hui par défaut) ; négatives pour un remboursement.
+    """
+    lines = {ticket_type_id: line for ticket_type_id, line in lines.items() if line[0]}
+    if not lines:
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(_RECORD, [
+            day or timezone.localdate(), list(lines),
+            [quantity for quantity, _ in lines.values()],
+            [amount for _, amount in lines.values()],
+        ])
+
+
+def dashboard(user, event_id=None, days=30):
+    """Ventes par événement, par type et par jour des événements de `user`"""
+    from tickets.models import TicketSalesDaily, TicketType
+
+    ticket_types = TicketType.objects.filter(event__created_by=user).select_related('event')
+    if event_id:
+        ticket_types = ticket_types.filter(event_id=event_id)
+
+    events = {}
+    for ticket_type in ticket_types.order_by('event__date', 'event_id', 'pk'):
+        event = events.setdefault(ticket_type.event_id, {
+            'id': ticket_type.event_id,
+            'title': ticket_type.event.title,
+            'date': ticket_type.event.date,
+            'tickets_sold': 0,
+            'revenue': 0,
+            'ticket_types': [],
+        })
+        event['tickets_sold'] += ticket_type.sold
+        event['revenue'] += ticket_type.revenue
+        event['ticket_types'].append({
+            'id': ticket_type.pk,
+            'name': ticket_type.name,
+            'price': ticket_type.price,
+            'quantity': ticket_type.quantity,
+            'tickets_sold': ticket_type.sold,
+            'revenue': ticket_type.revenue,
+        })
+
+    daily = defaultdict(list)
+    rows = TicketSalesDaily.objects.filter(
+        ticket_type__in=ticket_types, day__gte=timezone.localdate() - timedelta(days=days - 1)
+    ).values('ticket_type__event_id', 'day').annotate(
+        tickets=Sum('tickets'), revenue=Sum('revenue')
+    ).order_by('day')
+    for row in rows:
+        daily[row['ticket_type__event_id']].append({
+            'day': row['day'], 'tickets': row['tickets'], 'revenue': row['revenue'],
+        })
+    for event in events.values():
+        event['daily'] = daily.get(event['id'], [])
+    return list(events.values())
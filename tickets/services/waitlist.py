@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Liste d'attente FIFO des types de tickets épuisés.
+
+Un fan qui trouve un type épuisé s'inscrit une fois puis interroge sa
+position (ZRANK, O(log n)) au lieu de relancer l'achat. Quand des places
+reviennent (suppressions, holds expirés, quantité augmentée), le worker
+release_waitlist_offers transforme la tête de la file en holds, par lots :
+l'offre est un hold ordinaire, à confirmer avant son expiration, sinon
+ses places passent aux suivants. Tant que la file d'un type n'est pas
+vide, les achats et holds directs sont refusés : les places rendues vont
+d'abord aux fans qui attendent. Un fan ne quitte la file qu'une fois son
+offre enregistrée, un worker interrompu ne perd donc personne.
+
+Clés Redis par type de ticket :
+- tickets:{id}:waitlist           zset des fans, score = numéro d'arrivée
+- tickets:{id}:waitlist:seq       compteur des arrivées
+- tickets:{id}:waitlist:quantity  places demandées par fan
+- tickets:{id}:offer:{user}       offre en cours (hold et expiration)
+"""
+
+import json
+from django.conf import settings
+from users.core.redis import redis_client
+from . import holds
+
+
+TYPES_KEY = 'tickets:waitlist:types'
+
+LOCK_TIMEOUT = 30
+
+# KEYS: file, compteur, quantités, types ; ARGV: fan, quantité, type id
+# Renvoie le rang du fan, inchangé s'il était déjà inscrit
+_JOIN = redis_client.register_script("""
+local rank = redis.call('ZRANK', KEYS[1], ARGV[1])
+if rank then
+    return rank
+end
+redis.call('ZADD', KEYS[1], redis.call('INCR', KEYS[2]), ARGV[1])
+redis.call('HSET', KEYS[3], ARGV[1], ARGV[2])
+redis.call('SADD', KEYS[4], ARGV[3])
+return redis.call('ZCARD', KEYS[1]) - 1
+""")
+
+
+# KEYS: file, types ; ARGV: type id
+# Retire le type des files à servir si sa file est vide, atomiquement avec _JOIN
+_FORGET_IF_EMPTY = redis_client.register_script("""
+if redis.call('ZCARD', KEYS[1]) > 0 then
+    return 0
+end
+redis.call('SREM', KEYS[2], ARGV[1])
+return 1
+""")
+
+# KEYS: offre ; ARGV: hold
+# Efface l'offre une fois son hold confirmé
+_CLEAR_OFFER = redis_client.register_script("""
+local offer = redis.call('GET', KEYS[1])
+if offer and cjson.decode(offer)['hold'] == ARGV[1] then
+    redis.call('DEL', KEYS[1])
+    return 1
+end
+return 0
+""")
+
+
+def _keys(ticket_type_id):
+    prefix = f"tickets:{ticket_type_id}:waitlist"
+    return {
+        'queue': prefix,
+        'seq': f"{prefix}:seq",
+        'quantity': f"{prefix}:quantity",
+    }
+
+
+def _offer_key(ticket_type_id, user_id):
+    return f"tickets:{ticket_type_id}:offer:{user_id}"
+
+
+def join(ticket_type_id, user_id, quantity=1):
+    """Inscrit un fan, renvoie sa position (1 = prochain servi)"""
+    keys = _keys(ticket_type_id)
+    rank = _JOIN(
+        keys=[keys['queue'], keys['seq'], keys['quantity'], TYPES_KEY],
+        args=[user_id, quantity, ticket_type_id],
+    )
+    return rank + 1
+
+
+def queued(ticket_type_ids):
+    """Les types parmi ticket_type_ids dont la file n'est pas vide"""
+    ticket_type_ids = list(ticket_type_ids)
+    pipe = redis_client.pipeline(transaction=False)
+    for ticket_type_id in ticket_type_ids:
+        pipe.zcard(_keys(ticket_type_id)['queue'])
+    return {ticket_type_id for ticket_type_id, waiting in zip(ticket_type_ids, pipe.execute()) if waiting}
+
+
+def leave(ticket_type_id, user_id):
+    keys = _keys(ticket_type_id)
+    pipe = redis_client.pipeline()
+    pipe.zrem(keys['queue'], user_id)
+    pipe.hdel(keys['quantity'], user_id)
+    return bool(pipe.execute()[0])
+
+
+def status(ticket_type_id, user_id):
+    """Offre en cours, sinon position dans la file ; None si pas inscrit"""
+    keys = _keys(ticket_type_id)
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.get(_offer_key(ticket_type_id, user_id))
+    pipe.zrank(keys['queue'], user_id)
+    pipe.zcard(keys['queue'])
+    offer, rank, waiting = pipe.execute()
+
+    if offer is not None:
+        return {'offer': json.loads(offer)}
+    if rank is None:
+        return None
+    return {'position': rank + 1, 'waiting': waiting}
+
+
+def release_offers(ticket_type_id, batch_size=None):
+    """
+    Offre des holds à la tête de la file tant qu'il reste des places.
+    Renvoie le nombre d'offres faites, 0 si un autre worker s'en occupe.
+    """
+    batch_size = batch_size or settings.TICKET_WAITLIST_BATCH_SIZE
+    keys = _keys(ticket_type_id)
+    lock = redis_client.lock(f"{keys['queue']}:lock", timeout=LOCK_TIMEOUT)
+    if not lock.acquire(blocking=False):
+        return 0
+
+    try:
+        # Lecture sans retrait : un fan reste en file tant que son offre n'est pas enregistrée
+        head = redis_client.zrange(keys['queue'], 0, batch_size - 1)
+        offered = 0
+        for user_id in head:
+            quantity = int(redis_client.hget(keys['quantity'], user_id) or 1)
+            try:
+                hold_token, expires_at = holds.hold(ticket_type_id, user_id, quantity, admission_rate=0)
+            except holds.HoldError as exc:
+                if exc.reason == 'sold_out':
+                    break  # Plus de places : les suivants gardent leur rang
+                # Vente fermée ou type supprimé : l'inscription est abandonnée
+                pipe = redis_client.pipeline()
+                pipe.zrem(keys['queue'], user_id)
+                pipe.hdel(keys['quantity'], user_id)
+                pipe.execute()
+                continue
+
+            pipe = redis_client.pipeline()
+            pipe.set(
+                _offer_key(ticket_type_id, user_id),
+                json.dumps({'hold': hold_token, 'quantity': quantity, 'expires_at': expires_at.isoformat()}),
+                ex=settings.TICKET_HOLD_TTL,
+            )
+            pipe.zrem(keys['queue'], user_id)
+            pipe.hdel(keys['quantity'], user_id)
+            pipe.execute()
+            offered += 1
+        return offered
+    finally:
+        lock.release()
+
+
+def confirmed(hold_token, user_id):
+    """Hold confirmé : l'offre de liste d'attente qu'il portait disparaît"""
+    ticket_type_id = hold_token.split('.', 1)[0]
+    _CLEAR_OFFER(keys=[_offer_key(ticket_type_id, user_id)], args=[hold_token])
+
+
+def release_all(batch_size=None):
+    """Fait les offres de tous les types avec une file, renvoie le total"""
+    offered = 0
+    for ticket_type_id in redis_client.smembers(TYPES_KEY):
+        offered += release_offers(ticket_type_id, batch_size)
+        _FORGET_IF_EMPTY(keys=[_keys(ticket_type_id)['queue'], TYPES_KEY], args=[ticket_type_id])
+    return offered
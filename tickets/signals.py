@@ -0,0 +1,20 @@
+#!/usr/bin/env python3
+"""Tickets signals"""
+
+from django.conf import settings
+from django.db.models.signals import pre_delete
+from django.dispatch import receiver
+from tickets.services import manifest
+
+
+@receiver(pre_delete, sender=settings.AUTH_USER_MODEL)
+def revoke_buyer_tickets(sender, instance, **kwargs):
+    """Les tickets d'un acheteur supprimé partent en cascade : ils sont révoqués"""
+    from tickets.models import Ticket
+
+    by_event = {}
+    tickets = Ticket.objects.filter(buyer=instance, ticket_type__isnull=False)
+    for event_id, ticket_id in tickets.values_list('ticket_type__event_id', 'pk'):
+        by_event.setdefault(event_id, []).append(ticket_id)
+    for event_id, ticket_ids in by_event.items():
+        manifest.revoke_many(event_id, ticket_ids)
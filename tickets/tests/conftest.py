@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Fixtures partagées des tests tickets
+"""
+
+import pytest
+from datetime import timedelta
+from django.utils import timezone
+
+from artists.models import ArtistProfile
+from events.models import Event
+from tickets.models import TicketType
+from users.core.redis import redis_client
+
+
+@pytest.fixture
+def promoter_user(db, django_user_model):
+    """Créer un utilisateur avec le rôle promoter"""
+    return django_user_model.objects.create_user(
+        email='promoter@test.com',
+        password='testpass123',
+        name='Test Promoter',
+        role='promoter'
+    )
+
+
+@pytest.fixture
+def fan_user(db, django_user_model):
+    """Créer un utilisateur avec le rôle fan"""
+    return django_user_model.objects.create_user(
+        email='fan@test.com',
+        password='testpass123',
+        name='Test Fan',
+        role='fan'
+    )
+
+
+@pytest.fixture
+def event(db, promoter_user):
+    artist = ArtistProfile.objects.create(name='Test Artist')
+    return Event.objects.create(
+        artist=artist,
+        title='Test Concert',
+        description='Concert de test',
+        location='Paris',
+        date=timezone.now() + timedelta(days=30),
+        created_by=promoter_user,
+    )
+
+
+@pytest.fixture
+def ticket_type(db, event, promoter_user):
+    now = timezone.now()
+    return TicketType.objects.create(
+        event=event,
+        name='Standard',
+        price=25,
+        quantity=10,
+        sale_starts=now - timedelta(hours=1),
+        sale_ends=now + timedelta(days=1),
+        created_by=promoter_user,
+    )
+
+
+@pytest.fixture(autouse=True)
+def clear_ticket_keys():
+    """Les ids de TicketType sont réutilisés d'un run à l'autre"""
+    keys = list(redis_client.scan_iter('tickets:*'))
+    if keys:
+        redis_client.delete(*keys)
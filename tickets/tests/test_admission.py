@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Tests du contrôle à l'entrée (tickets/services/admission.py)
+"""
+
+import pytest
+from rest_framework.test import APIClient
+
+from tickets.models import Ticket
+from tickets.services import admission
+
+
+@pytest.fixture
+def ticket(fan_user, ticket_type):
+    return Ticket.objects.create(ticket_type=ticket_type, buyer=fan_user)
+
+
+@pytest.fixture
+def client(promoter_user):
+    client = APIClient()
+    client.force_authenticate(promoter_user)
+    return client
+
+
+def scan(client, code, event_id):
+    return client.post('/api/tickets/scan/', {'code': code, 'event': event_id}, format='json')
+
+
+def test_code_round_trip_and_tampering():
+    """Test que le code se vérifie sans base et qu'une altération est refusée"""
+    code = admission.encode(42, 7, 3)
+
+    assert admission.verify(code) == (42, 7, 3)
+    assert len(code) <= 32
+    forged = admission.encode(43, 7, 3)[:18] + code[18:]
+    for bad in (forged, code[:-2], 'not a code', ''):
+        with pytest.raises(ValueError):
+            admission.verify(bad)
+
+
+@pytest.mark.django_db
+class TestTicketScan:
+    """Tests du endpoint scan"""
+
+    def test_first_scan_admits_and_second_is_duplicate(self, client, ticket, event,
+                                                       django_assert_num_queries):
+        """Test qu'un ticket n'entre qu'une fois, sans requête SQL par scan"""
+        code = admission.sign(ticket)
+        admission.event_owner(event.pk)  # Propriétaire en cache
+
+        with django_assert_num_queries(0):
+            first = scan(client, code, event.pk)
+            second = scan(client, code, event.pk)
+
+        assert first.status_code == 200
+        assert first.data == {'status': 'admitted', 'ticket': ticket.pk,
+                              'ticket_type': ticket.ticket_type_id, 'event': event.pk}
+        assert second.status_code == 409
+        assert second.data['status'] == 'duplicate'
+        assert admission.is_admitted(event.pk, ticket.pk)
+
+    def test_rejects_other_event_and_forged_codes(self, client, ticket, event):
+        """Test les codes d'un autre événement ou invalides"""
+        assert scan(client, admission.sign(ticket), event.pk + 1).status_code == 403
+
+        wrong = scan(client, admission.encode(ticket.pk, ticket.ticket_type_id, event.pk + 1), event.pk)
+        forged = scan(client, admission.sign(ticket)[:-1] + 'A', event.pk)
+
+        assert wrong.data['status'] == 'wrong_event'
+        assert forged.status_code == 400
+        assert not admission.is_admitted(event.pk, ticket.pk)
+
+    def test_fan_cannot_scan(self, fan_user, ticket, event):
+        client = APIClient()
+        client.force_authenticate(fan_user)
+        assert scan(client, admission.sign(ticket), event.pk).status_code == 403
+
+    def test_admissions_are_flushed_in_batches(self, client, fan_user, ticket_type, event,
+                                               django_assert_num_queries):
+        """Test que les entrées sont écrites en base en une requête par lot"""
+        tickets = Ticket.objects.bulk_create(
+            Ticket(ticket_type=ticket_type, buyer=fan_user) for _ in range(5))
+        for ticket in tickets:
+            admission.scan(admission.sign(ticket), event.pk)
+
+        with django_assert_num_queries(1):
+            assert admission.flush() == 5
+
+        assert not Ticket.objects.filter(pk__in=[t.pk for t in tickets], admitted_at__isnull=True).exists()
+        assert admission.drain() == 0
+
+    def test_ticket_serializer_exposes_code(self, fan_user, ticket):
+        client = APIClient()
+        client.force_authenticate(fan_user)
+        response = client.get(f'/api/tickets/my-tickets/{ticket.pk}/')
+        assert admission.verify(response.data['code']) == (
+            ticket.pk, ticket.ticket_type_id, ticket.ticket_type.event_id)
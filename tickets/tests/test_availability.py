@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Tests du read model de disponibilité des TicketType
+"""
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from tickets.models import TicketType
+
+
+def add_ticket_types(event, template, count):
+    TicketType.objects.bulk_create([
+        TicketType(
+            event=event,
+            name=f'Type {index}',
+            price=10,
+            quantity=100,
+            sold=index % 100,
+            sale_starts=template.sale_starts,
+            sale_ends=template.sale_ends,
+        )
+        for index in range(count)
+    ])
+
+
+def count_queries(callable_):
+    with CaptureQueriesContext(connection) as captured:
+        response = callable_()
+    assert response.status_code == 200
+    return len(captured)
+
+
+@pytest.mark.django_db
+class TestAvailability:
+    """Tests du manager with_availability"""
+
+    def test_annotations(self, event, ticket_type):
+        """Test les annotations sold_count / remaining_count"""
+        TicketType.objects.filter(pk=ticket_type.pk).update(sold=4)
+
+        annotated = TicketType.objects.with_availability().get(pk=ticket_type.pk)
+
+        assert (annotated.sold_count, annotated.remaining_count) == (4, 6)
+        assert TicketType.objects.with_availability().filter(remaining_count__gt=6).count() == 0
+
+    def test_listing_query_count_is_constant(self, event, ticket_type, promoter_user):
+        """Test que la liste des types ne fait pas une requête par ligne"""
+        client = APIClient()
+        client.force_authenticate(promoter_user)
+        listing = lambda: client.get('/api/tickets/manage-types/')
+
+        few = count_queries(listing)
+        add_ticket_types(event, ticket_type, 200)
+        many = count_queries(listing)
+
+        assert many == few
+        assert len(listing().data) == 201
+
+    def test_admin_query_count_is_constant(self, event, ticket_type, django_user_model):
+        """Test que la liste admin ne fait pas une requête par ligne"""
+        admin_user = django_user_model.objects.create_superuser(
+            email='admin@test.com', password='testpass123', name='Admin'
+        )
+        client = APIClient()
+        client.force_login(admin_user)
+        changelist = lambda: client.get('/admin/tickets/tickettype/')
+
+        few = count_queries(changelist)
+        add_ticket_types(event, ticket_type, 50)
+        many = count_queries(changelist)
+
+        assert many == few
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Tests de l'achat groupé (panier multi-types)
+"""
+
+import pytest
+from rest_framework.test import APIClient
+
+from tickets.models import Ticket, TicketType
+
+
+@pytest.fixture
+def client(fan_user):
+    client = APIClient()
+    client.force_authenticate(fan_user)
+    return client
+
+
+@pytest.fixture
+def vip_type(ticket_type):
+    return TicketType.objects.create(
+        event=ticket_type.event,
+        name='VIP',
+        price=80,
+        quantity=2,
+        sale_starts=ticket_type.sale_starts,
+        sale_ends=ticket_type.sale_ends,
+    )
+
+
+def buy(client, lines):
+    return client.post('/api/tickets/my-tickets/bulk/', {'lines': lines}, format='json')
+
+
+@pytest.mark.django_db
+class TestBulkPurchase:
+    """Tests du endpoint my-tickets/bulk"""
+
+    def test_cart_is_bought_in_one_transaction(self, client, ticket_type, vip_type,
+                                               django_assert_max_num_queries):
+        """Test l'achat d'un panier Standard + VIP"""
+        with django_assert_max_num_queries(8):
+            response = buy(client, [
+                {'ticket_type': ticket_type.pk, 'quantity': 4},
+                {'ticket_type': vip_type.pk, 'quantity': 2},
+            ])
+
+        assert response.status_code == 201
+        assert len(response.data) == 6
+        assert {row['ticket_type_name'] for row in response.data} == {'Standard', 'VIP'}
+        ticket_type.refresh_from_db()
+        vip_type.refresh_from_db()
+        assert (ticket_type.sold, vip_type.sold) == (4, 2)
+
+    def test_cart_is_all_or_nothing(self, client, ticket_type, vip_type):
+        """Test qu'une ligne en rupture annule tout le panier"""
+        response = buy(client, [
+            {'ticket_type': ticket_type.pk, 'quantity': 4},
+            {'ticket_type': vip_type.pk, 'quantity': 3},
+        ])
+
+        assert response.status_code == 400
+        assert not Ticket.objects.exists()
+        assert TicketType.objects.get(pk=ticket_type.pk).sold == 0
+
+    def test_duplicate_lines_are_merged(self, client, vip_type):
+        """Test que deux lignes du même type comptent ensemble"""
+        response = buy(client, [
+            {'ticket_type': vip_type.pk, 'quantity': 2},
+            {'ticket_type': vip_type.pk, 'quantity': 1},
+        ])
+
+        assert response.status_code == 400
+
+    def test_closed_sale_is_refused(self, client, ticket_type):
+        """Test qu'un type hors fenêtre de vente refuse le panier"""
+        TicketType.objects.filter(pk=ticket_type.pk).update(sale_ends=ticket_type.sale_starts)
+
+        response = buy(client, [{'ticket_type': ticket_type.pk, 'quantity': 1}])
+
+        assert response.status_code == 400
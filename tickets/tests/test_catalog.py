@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Tests du catalogue en vente par événement (tickets/services/catalog.py)
+"""
+
+from datetime import timedelta
+
+import pytest
+from rest_framework.test import APIClient
+
+from tickets.models import TicketType
+from tickets.services import catalog, holds
+from users.core.redis import redis_client
+
+
+@pytest.fixture
+def upcoming_type(ticket_type):
+    return TicketType.objects.create(
+        event=ticket_type.event, name='Last minute', price=40, quantity=5,
+        sale_starts=ticket_type.sale_starts + timedelta(hours=3),
+        sale_ends=ticket_type.sale_ends + timedelta(days=1),
+    )
+
+
+def get_catalog(event_id):
+    return APIClient().get(f'/api/tickets/events/{event_id}/on-sale/')
+
+
+@pytest.mark.django_db
+class TestEventCatalog:
+    """Tests du endpoint events/<id>/on-sale"""
+
+    def test_lists_types_on_sale_and_expires_at_next_boundary(self, event, ticket_type, upcoming_type,
+                                                              settings):
+        """Test que le cache expire à l'ouverture de la prochaine fenêtre"""
+        settings.TICKET_CATALOG_MAX_TTL = 86400
+        response = get_catalog(event.pk)
+
+        assert response.status_code == 200
+        assert [row['id'] for row in response.data['results']] == [ticket_type.pk]
+        assert response.data['results'][0]['remaining'] == 10
+        ttl = redis_client.ttl(f'tickets:event:{event.pk}:catalog')
+        until_open = (upcoming_type.sale_starts - ticket_type.sale_starts).total_seconds() - 3600
+        assert until_open - 5 <= ttl <= until_open + 1
+
+    def test_cached_catalog_reads_live_stock(self, event, ticket_type, fan_user,
+                                             django_assert_num_queries):
+        """Test que le catalogue en cache suit le stock Redis sans requête SQL"""
+        catalog.on_sale(event.pk)
+        holds.hold(ticket_type.pk, fan_user.pk, quantity=3)
+
+        with django_assert_num_queries(0):
+            response = get_catalog(event.pk)
+
+        assert response.data['results'][0]['remaining'] == 7
+
+    def test_missing_stock_is_read_in_one_query(self, event, ticket_type, upcoming_type):
+        catalog.on_sale(event.pk)
+        TicketType.objects.filter(pk=ticket_type.pk).update(sold=4)
+        redis_client.delete(f'tickets:{ticket_type.pk}:info')
+
+        assert catalog.on_sale(event.pk)[0]['remaining'] == 6
+
+    def test_update_invalidates_catalog(self, event, ticket_type, promoter_user,
+                                        django_capture_on_commit_callbacks):
+        """Test qu'une fenêtre de vente modifiée vide le cache de l'événement"""
+        assert len(catalog.on_sale(event.pk)) == 1
+        client = APIClient()
+        client.force_authenticate(promoter_user)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            response = client.patch(f'/api/tickets/manage-types/{ticket_type.pk}/', {
+                'sale_starts': (ticket_type.sale_starts + timedelta(hours=2)).isoformat(),
+            }, format='json')
+
+        assert response.status_code == 200
+        assert catalog.on_sale(event.pk) == []
+
+    def test_invalidate_during_build_is_not_lost(self, event, ticket_type, monkeypatch):
+        """Test qu'une invalidation pendant la lecture en base n'est pas écrasée"""
+        build = catalog.build
+
+        def build_then_invalidate(event_id, now=None):
+            result = build(event_id, now)
+            TicketType.objects.filter(pk=ticket_type.pk).update(name='Renamed')
+            catalog.invalidate(event_id)
+            return result
+
+        monkeypatch.setattr(catalog, 'build', build_then_invalidate)
+        assert catalog.on_sale(event.pk)[0]['name'] == 'Standard'
+        monkeypatch.undo()
+
+        assert redis_client.get(f'tickets:event:{event.pk}:catalog') is None
+        assert catalog.on_sale(event.pk)[0]['name'] == 'Renamed'
+
+    def test_sale_window_is_read_from_database(self, event, ticket_type):
+        """Test que la fenêtre copiée pour les holds vient de la base, pas du catalogue"""
+        catalog.on_sale(event.pk)
+        sale_ends = ticket_type.sale_ends - timedelta(hours=1)
+        TicketType.objects.filter(pk=ticket_type.pk).update(sale_ends=sale_ends)
+        redis_client.delete(f'tickets:{ticket_type.pk}:info', f'tickets:{ticket_type.pk}:stock')
+
+        catalog.on_sale(event.pk)
+
+        assert holds.sale_info(ticket_type.pk)['sale_ends'] == sale_ends
+
+
+def test_ttl_is_capped_without_boundaries(settings, db, event):
+    settings.TICKET_CATALOG_MAX_TTL = 120
+    assert catalog.build(event.pk) == ([], 120)
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Tests des holds de tickets (réservations Redis avec TTL)
+"""
+
+import time
+import pytest
+from rest_framework.test import APIClient
+
+from tickets.models import Ticket
+from tickets.services import holds
+
+
+@pytest.fixture
+def client(fan_user):
+    client = APIClient()
+    client.force_authenticate(fan_user)
+    return client
+
+
+def hold(client, ticket_type, quantity=1):
+    return client.post('/api/tickets/my-tickets/hold/',
+                       {'ticket_type': ticket_type.pk, 'quantity': quantity})
+
+
+@pytest.mark.django_db
+class TestTicketHolds:
+    """Tests du cycle hold / confirm"""
+
+    def test_hold_then_confirm(self, client, ticket_type):
+        """Test qu'un hold confirmé devient des tickets"""
+        response = hold(client, ticket_type, 3)
+        assert response.status_code == 201
+
+        confirmed = client.post('/api/tickets/my-tickets/confirm/',
+                                {'hold': response.data['hold']})
+
+        assert confirmed.status_code == 201
+        assert len(confirmed.data) == 3
+        ticket_type.refresh_from_db()
+        assert ticket_type.sold == 3
+        metrics = holds.metrics(ticket_type.pk)
+        assert (metrics['issued'], metrics['converted'], metrics['active']) == (1, 1, 0)
+        assert metrics['stock'] == 7
+
+    def test_holds_are_atomic_against_stock(self, client, ticket_type):
+        """Test que les holds ne dépassent jamais le stock"""
+        assert hold(client, ticket_type, 6).status_code == 201
+        assert hold(client, ticket_type, 5).status_code == 400
+        assert hold(client, ticket_type, 4).status_code == 201
+        assert holds.metrics(ticket_type.pk)['sold_out'] == 1
+
+    def test_warm_hold_does_not_query_database(self, client, ticket_type,
+                                               django_assert_num_queries):
+        """Test qu'un hold ne touche pas Postgres une fois le cache chaud"""
+        hold(client, ticket_type)
+
+        with django_assert_num_queries(0):
+            assert holds.hold(ticket_type.pk, 1)
+
+    def test_expired_hold_returns_stock(self, client, ticket_type, settings):
+        """Test qu'un hold non confirmé rend son stock à l'expiration"""
+        settings.TICKET_HOLD_TTL = 1
+        expired = hold(client, ticket_type, 10).data['hold']
+        time.sleep(1.1)
+
+        assert holds.reap_expired() == 1
+        assert holds.metrics(ticket_type.pk)['stock'] == 10
+        assert client.post('/api/tickets/my-tickets/confirm/',
+                           {'hold': expired}).status_code == 400
+        assert not Ticket.objects.exists()
+
+    def test_release_and_foreign_confirm(self, client, ticket_type, django_user_model):
+        """Test qu'un autre fan ne confirme pas le hold, l'acheteur peut l'annuler"""
+        token = hold(client, ticket_type, 2).data['hold']
+        other = django_user_model.objects.create_user(
+            email='other@test.com', password='testpass123', name='Other Fan', role='fan'
+        )
+        other_client = APIClient()
+        other_client.force_authenticate(other)
+
+        assert other_client.post('/api/tickets/my-tickets/confirm/',
+                                 {'hold': token}).status_code == 400
+        assert client.post('/api/tickets/my-tickets/release/',
+                           {'hold': token}).status_code == 204
+        assert holds.metrics(ticket_type.pk)['stock'] == 10
+
+    def test_release_after_invalidate_keeps_stock_recomputable(self, client, ticket_type):
+        """Test qu'un release après invalidation ne recrée pas un stock faux"""
+        token = hold(client, ticket_type, 2).data['hold']
+        hold(client, ticket_type, 3)
+        holds.invalidate(ticket_type.pk)
+
+        assert client.post('/api/tickets/my-tickets/release/',
+                           {'hold': token}).status_code == 204
+        assert holds.metrics(ticket_type.pk)['stock'] is None
+        assert hold(client, ticket_type).status_code == 201
+        assert holds.metrics(ticket_type.pk)['stock'] == 6
+
+    def test_direct_purchase_does_not_take_held_seats(self, client, ticket_type, django_user_model):
+        """Test qu'un achat direct ne prend pas les places retenues par un hold"""
+        token = hold(client, ticket_type, 10).data['hold']
+        other = django_user_model.objects.create_user(
+            email='other@test.com', password='testpass123', name='Other Fan', role='fan'
+        )
+        other_client = APIClient()
+        other_client.force_authenticate(other)
+
+        assert other_client.post('/api/tickets/my-tickets/',
+                                 {'ticket_type': ticket_type.pk}).status_code == 400
+        assert other_client.post('/api/tickets/my-tickets/bulk/', {'lines': [
+            {'ticket_type': ticket_type.pk, 'quantity': 1}]}, format='json').status_code == 400
+        assert client.post('/api/tickets/my-tickets/confirm/',
+                           {'hold': token}).status_code == 201
+        assert Ticket.objects.filter(buyer=other).count() == 0
+
+    def test_direct_purchase_keeps_stock_in_sync(self, client, ticket_type):
+        """Test qu'un achat direct décompte le stock Redis sans le recalculer"""
+        hold(client, ticket_type, 2)
+
+        assert client.post('/api/tickets/my-tickets/',
+                           {'ticket_type': ticket_type.pk}).status_code == 201
+        assert holds.metrics(ticket_type.pk)['stock'] == 7
+
+    def test_admission_rate(self, client, ticket_type, settings):
+        """Test que les holds au-delà du débit admis renvoient 429"""
+        settings.TICKET_HOLD_ADMISSION_RATE = 2
+        time.sleep(1 - time.time() % 1)
+
+        statuses = [hold(client, ticket_type).status_code for _ in range(3)]
+
+        assert statuses == [201, 201, 429]
+        assert holds.metrics(ticket_type.pk)['throttled'] == 1
+
+    def test_closed_sale_is_refused(self, client, ticket_type):
+        """Test qu'on ne retient pas hors de la fenêtre de vente"""
+        ticket_type.sale_ends = ticket_type.sale_starts
+        ticket_type.save()
+
+        assert hold(client, ticket_type).status_code == 400
+
+
+@pytest.mark.django_db
+def test_promoter_reads_hold_metrics(client, ticket_type, promoter_user):
+    """Test que le promoteur lit les métriques de ses holds"""
+    hold(client, ticket_type, 2)
+    promoter = APIClient()
+    promoter.force_authenticate(promoter_user)
+
+    response = promoter.get(f'/api/tickets/manage-types/{ticket_type.pk}/hold-metrics/')
+
+    assert response.status_code == 200
+    assert response.data['issued'] == 1
+    assert response.data['active'] == 1
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Tests des achats relancés avec un Idempotency-Key
+"""
+
+import uuid
+
+import pytest
+from rest_framework.test import APIClient
+
+from tickets.models import Ticket
+
+
+@pytest.fixture
+def client(fan_user):
+    client = APIClient()
+    client.force_authenticate(fan_user)
+    return client
+
+
+@pytest.mark.django_db
+class TestIdempotentPurchase:
+    """Tests de my-tickets et my-tickets/bulk avec Idempotency-Key"""
+
+    def test_retried_purchase_creates_one_ticket(self, client, ticket_type):
+        """Test qu'un achat relancé renvoie le même ticket sans en créer un autre"""
+        key = str(uuid.uuid4())
+
+        responses = [
+            client.post('/api/tickets/my-tickets/', {'ticket_type': ticket_type.pk},
+                        format='json', HTTP_IDEMPOTENCY_KEY=key)
+            for _ in range(3)
+        ]
+
+        assert {response.status_code for response in responses} == {201}
+        assert len({response.content for response in responses}) == 1
+        assert Ticket.objects.filter(ticket_type=ticket_type).count() == 1
+        ticket_type.refresh_from_db()
+        assert ticket_type.sold == 1
+
+    def test_retried_bulk_purchase(self, client, ticket_type):
+        key = str(uuid.uuid4())
+        body = {'lines': [{'ticket_type': ticket_type.pk, 'quantity': 2}]}
+
+        first = client.post('/api/tickets/my-tickets/bulk/', body, format='json', HTTP_IDEMPOTENCY_KEY=key)
+        retry = client.post('/api/tickets/my-tickets/bulk/', body, format='json', HTTP_IDEMPOTENCY_KEY=key)
+
+        assert retry.content == first.content
+        assert Ticket.objects.filter(ticket_type=ticket_type).count() == 2
+
+    def test_keys_are_scoped_per_user(self, client, ticket_type, django_user_model):
+        """Test que la même clé chez un autre fan est un nouvel achat"""
+        other = django_user_model.objects.create_user(
+            email='other@test.com', password='testpass123', name='Other', role='fan')
+        other_client = APIClient()
+        other_client.force_authenticate(other)
+        key = str(uuid.uuid4())
+
+        for fan_client in (client, other_client):
+            fan_client.post('/api/tickets/my-tickets/', {'ticket_type': ticket_type.pk},
+                            format='json', HTTP_IDEMPOTENCY_KEY=key)
+
+        assert Ticket.objects.filter(ticket_type=ticket_type).count() == 2
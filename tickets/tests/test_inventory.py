@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Tests de l'inventaire des tickets (compteur sold)
+"""
+
+import threading
+import pytest
+from django.contrib import admin
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import RequestFactory
+from rest_framework.test import APIClient
+
+from tickets.admin import TicketAdmin
+from tickets.models import Ticket, TicketType
+from tickets.services import inventory
+
+
+@pytest.mark.django_db
+class TestInventory:
+    """Tests du compteur sold"""
+
+    def test_reserve_stops_at_quantity(self, ticket_type):
+        """Test qu'on ne vend pas au-delà du stock"""
+        assert inventory.reserve(ticket_type.pk, 8)
+        assert not inventory.reserve(ticket_type.pk, 3)
+        assert inventory.reserve(ticket_type.pk, 2)
+        assert not inventory.reserve(ticket_type.pk)
+
+        ticket_type.refresh_from_db()
+        assert ticket_type.tickets_sold == 10
+        assert ticket_type.tickets_remaining == 0
+
+    def test_purchase_and_refund(self, ticket_type, fan_user):
+        """Test achat puis suppression : le stock suit sans COUNT"""
+        client = APIClient()
+        client.force_authenticate(fan_user)
+
+        response = client.post('/api/tickets/my-tickets/', {'ticket_type': ticket_type.pk})
+        assert response.status_code == 201
+        ticket_type.refresh_from_db()
+        assert ticket_type.sold == 1
+
+        client.delete(f"/api/tickets/my-tickets/{response.data['id']}/")
+        ticket_type.refresh_from_db()
+        assert ticket_type.sold == 0
+
+    def test_admin_cannot_bypass_the_counter(self, ticket_type, fan_user, django_user_model):
+        """Test que l'admin ne crée pas de ticket et ne change pas son type hors du compteur"""
+        request = RequestFactory().get('/admin/tickets/ticket/')
+        request.user = django_user_model.objects.create_superuser(
+            email='admin@test.com', password='testpass123', name='Admin')
+        ticket = Ticket.objects.create(ticket_type=ticket_type, buyer=fan_user)
+        ticket_admin = TicketAdmin(Ticket, admin.site)
+
+        assert not ticket_admin.has_add_permission(request)
+        assert 'ticket_type' not in ticket_admin.get_form(request, ticket).base_fields
+
+    def test_sold_out_is_a_validation_error(self, ticket_type, fan_user):
+        """Test qu'un type épuisé renvoie une erreur 400"""
+        TicketType.objects.filter(pk=ticket_type.pk).update(sold=10)
+        client = APIClient()
+        client.force_authenticate(fan_user)
+
+        response = client.post('/api/tickets/my-tickets/', {'ticket_type': ticket_type.pk})
+
+        assert response.status_code == 400
+        assert not Ticket.objects.exists()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_concurrent_purchases_never_oversell(ticket_type, django_user_model):
+    """Test que 60 achats concurrents ne vendent que le stock disponible"""
+    buyers = django_user_model.objects.bulk_create([
+        django_user_model(name=f'Fan {index}', email=f'fan{index}@test.com', role='fan')
+        for index in range(60)
+    ])
+    barrier = threading.Barrier(20)
+    outcomes = []
+
+    def buy(chunk):
+        barrier.wait()
+        try:
+            for buyer in chunk:
+                with transaction.atomic():
+                    if inventory.reserve(ticket_type.pk):
+                        Ticket.objects.create(ticket_type=ticket_type, buyer=buyer)
+                        outcomes.append(True)
+                    else:
+                        outcomes.append(False)
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=buy, args=(buyers[index::20],)) for index in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    ticket_type.refresh_from_db()
+    assert outcomes.count(True) == 10
+    assert ticket_type.sold == Ticket.objects.filter(ticket_type=ticket_type).count() == 10
+
+
+@pytest.mark.django_db(transaction=True)
+def test_benchmark_command_reports_no_oversell(capsys):
+    """Test la commande de benchmark sur un petit volume"""
+    call_command('benchmark_ticket_inventory', buyers=40, threads=8, quantity=15)
+
+    output = capsys.readouterr().out
+    assert 'sold=15, tickets=15, survente=0' in output
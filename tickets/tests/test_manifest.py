@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Tests des manifestes hors ligne (tickets/services/manifest.py)
+"""
+
+import base64
+import threading
+
+import pytest
+from django.contrib import admin
+from django.db import connection, transaction
+from rest_framework.test import APIClient
+
+from tickets.admin import TicketAdmin, TicketTypeAdmin
+from tickets.models import Ticket, TicketChange, TicketType
+from tickets.services import admission, manifest
+
+
+@pytest.fixture
+def client(promoter_user):
+    client = APIClient()
+    client.force_authenticate(promoter_user)
+    return client
+
+
+@pytest.fixture
+def fan_client(fan_user):
+    client = APIClient()
+    client.force_authenticate(fan_user)
+    return client
+
+
+def buy(fan_user, ticket_type, count):
+    return Ticket.objects.bulk_create(Ticket(ticket_type=ticket_type, buyer=fan_user) for _ in range(count))
+
+
+def ids(data, field):
+    return manifest.unpack(base64.b64decode(data[field]))
+
+
+def test_pack_is_sorted_big_endian():
+    """Test le format des ids : uint64 big-endian triés"""
+    packed = manifest.pack([3, 1, 2 ** 40])
+    assert packed[:8] == (1).to_bytes(8, 'big')
+    assert manifest.unpack(packed) == [1, 3, 2 ** 40]
+
+
+@pytest.mark.django_db
+class TestTicketManifest:
+    """Tests du endpoint manifest/<event>"""
+
+    def test_full_manifest_is_signed(self, client, fan_user, ticket_type, event,
+                                     django_assert_num_queries):
+        """Test le manifeste complet : ids triés, version et signature"""
+        tickets = buy(fan_user, ticket_type, 3)
+        admission.event_owner(event.pk)
+
+        with django_assert_num_queries(2):
+            response = client.get(f'/api/tickets/manifest/{event.pk}/')
+
+        data = response.data
+        assert ids(data, 'added') == sorted(t.pk for t in tickets)
+        assert data['count'] == 3
+        assert data['signature'] == manifest.sign(
+            event.pk, None, data['version'], base64.b64decode(data['added']), b'')
+
+    @pytest.mark.django_db(transaction=True)
+    def test_delta_since_version(self, client, fan_client, fan_user, ticket_type, event):
+        """Test que le delta ne contient que les achats et suppressions depuis la version"""
+        kept, deleted = buy(fan_user, ticket_type, 2)
+        version = client.get(f'/api/tickets/manifest/{event.pk}/').data['version']
+        new = buy(fan_user, ticket_type, 1)[0]
+        assert fan_client.delete(f'/api/tickets/my-tickets/{deleted.pk}/').status_code == 204
+
+        delta = client.get(f'/api/tickets/manifest/{event.pk}/', {'since': version}).data
+
+        assert ids(delta, 'added') == [new.pk]
+        assert ids(delta, 'removed') == [deleted.pk]
+        assert delta['since'] == version
+        again = client.get(f'/api/tickets/manifest/{event.pk}/', {'since': delta['version']}).data
+        assert again['added'] == again['removed'] == ''
+
+    @pytest.mark.django_db(transaction=True)
+    def test_delta_rereads_tickets_committed_late(self, fan_user, ticket_type, event):
+        """Test qu'un ticket d'id inférieur, validé après la version, est dans le delta"""
+        known = buy(fan_user, ticket_type, 1)[0]
+        inserted, built, late = threading.Event(), threading.Event(), []
+
+        def buy_slowly():
+            try:
+                with transaction.atomic():
+                    late.extend(buy(fan_user, ticket_type, 1))
+                    inserted.set()
+                    built.wait(10)
+            finally:
+                connection.close()
+
+        thread = threading.Thread(target=buy_slowly)
+        thread.start()
+        assert inserted.wait(10)
+        early = buy(fan_user, ticket_type, 1)[0]
+        version = manifest.build(event.pk)['version']
+        built.set()
+        thread.join()
+
+        delta = manifest.build(event.pk, version)
+
+        assert late[0].pk < early.pk
+        assert late[0].pk in ids(delta, 'added')
+        assert known.pk not in ids(delta, 'added')
+        assert ids(delta, 'removed') == []
+
+    def test_moved_ticket_is_revoked_from_old_event(self, client, fan_client, fan_user,
+                                                    ticket_type, event, promoter_user,
+                                                    django_capture_on_commit_callbacks):
+        """Test qu'un changement d'événement révoque l'ancien code au scan"""
+        other_type = TicketType.objects.create(
+            event=event.__class__.objects.create(
+                artist=event.artist, title='Autre', description='', location='Lyon',
+                date=event.date, created_by=promoter_user),
+            name='Standard', price=25, quantity=5,
+            sale_starts=ticket_type.sale_starts, sale_ends=ticket_type.sale_ends)
+        ticket = buy(fan_user, ticket_type, 1)[0]
+        old_code = admission.sign(ticket)
+        version = manifest.current_version()
+
+        with django_capture_on_commit_callbacks(execute=True):
+            response = fan_client.patch(f'/api/tickets/my-tickets/{ticket.pk}/',
+                                        {'ticket_type': other_type.pk}, format='json')
+        assert response.status_code == 200
+
+        assert ids(manifest.build(event.pk, version), 'removed') == [ticket.pk]
+        assert ids(manifest.build(other_type.event_id, version), 'added') == [ticket.pk]
+        assert TicketChange.objects.filter(ticket_id=ticket.pk).count() == 2
+        with pytest.raises(admission.ScanError) as exc:
+            admission.scan(old_code, event.pk)
+        assert exc.value.reason == 'revoked'
+        assert admission.scan(response.data['code'], other_type.event_id)['ticket'] == ticket.pk
+
+    def test_moved_type_revokes_its_tickets(self, client, fan_user, ticket_type, event,
+                                            promoter_user, django_capture_on_commit_callbacks):
+        """Test qu'un type déplacé vers un autre événement révoque ses tickets de l'ancien"""
+        other_event = event.__class__.objects.create(
+            artist=event.artist, title='Autre', description='', location='Lyon',
+            date=event.date, created_by=promoter_user)
+        tickets = buy(fan_user, ticket_type, 2)
+        old_code = admission.sign(tickets[0])
+        version = manifest.current_version()
+
+        with django_capture_on_commit_callbacks(execute=True):
+            response = client.patch(f'/api/tickets/manage-types/{ticket_type.pk}/',
+                                    {'event': other_event.pk}, format='json')
+        assert response.status_code == 200
+
+        assert ids(manifest.build(event.pk, version), 'removed') == sorted(t.pk for t in tickets)
+        assert ids(manifest.build(other_event.pk, version), 'added') == sorted(t.pk for t in tickets)
+        with pytest.raises(admission.ScanError) as exc:
+            admission.scan(old_code, event.pk)
+        assert exc.value.reason == 'revoked'
+
+    def test_deleted_type_revokes_its_tickets(self, client, fan_user, ticket_type, event,
+                                              django_capture_on_commit_callbacks):
+        """Test que la suppression d'un type révoque ses tickets"""
+        tickets = buy(fan_user, ticket_type, 2)
+        code = admission.sign(tickets[0])
+        version = manifest.current_version()
+
+        with django_capture_on_commit_callbacks(execute=True):
+            assert client.delete(f'/api/tickets/manage-types/{ticket_type.pk}/').status_code == 204
+
+        assert ids(manifest.build(event.pk, version), 'removed') == sorted(t.pk for t in tickets)
+        with pytest.raises(admission.ScanError) as exc:
+            admission.scan(code, event.pk)
+        assert exc.value.reason == 'revoked'
+
+    def test_admin_deletes_are_revoked(self, fan_user, ticket_type, event, promoter_user,
+                                       django_capture_on_commit_callbacks):
+        """Test que les suppressions depuis l'admin passent par le journal"""
+        tickets = buy(fan_user, ticket_type, 3)
+        TicketType.objects.filter(pk=ticket_type.pk).update(sold=3)
+        other_type = TicketType.objects.create(
+            event=event, name='VIP', price=50, quantity=5,
+            sale_starts=ticket_type.sale_starts, sale_ends=ticket_type.sale_ends)
+        vip = buy(fan_user, other_type, 1)[0]
+        version = manifest.current_version()
+
+        with django_capture_on_commit_callbacks(execute=True):
+            TicketAdmin(Ticket, admin.site).delete_queryset(
+                None, Ticket.objects.filter(pk__in=[tickets[0].pk, tickets[1].pk]))
+            TicketTypeAdmin(TicketType, admin.site).delete_model(None, other_type)
+
+        assert ids(manifest.build(event.pk, version), 'removed') == sorted(
+            [tickets[0].pk, tickets[1].pk, vip.pk])
+        assert TicketType.objects.get(pk=ticket_type.pk).sold == 1
+
+    def test_deleted_buyer_tickets_are_revoked(self, fan_user, ticket_type, event):
+        """Test que les tickets supprimés en cascade avec leur acheteur sont révoqués"""
+        tickets = buy(fan_user, ticket_type, 2)
+        version = manifest.current_version()
+
+        fan_user.delete()
+
+        assert ids(manifest.build(event.pk, version), 'removed') == sorted(t.pk for t in tickets)
+        assert not Ticket.objects.filter(pk__in=[t.pk for t in tickets]).exists()
+
+    def test_rejects_bad_version_and_other_promoters(self, client, fan_client, event):
+        assert client.get(f'/api/tickets/manifest/{event.pk}/', {'since': 'x'}).status_code == 400
+        assert fan_client.get(f'/api/tickets/manifest/{event.pk}/').status_code == 403
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Tests de la pagination par curseur des tickets (tickets/pagination.py)
+"""
+
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from tickets import pagination
+from tickets.models import Ticket
+
+
+@pytest.fixture
+def fan_client(fan_user):
+    client = APIClient()
+    client.force_authenticate(fan_user)
+    return client
+
+
+def buy(fan_user, ticket_type, count, purchased_at=None):
+    # Des achats groupés partagent le même purchased_at : l'id départage
+    purchased_at = purchased_at or timezone.now()
+    return Ticket.objects.bulk_create(
+        Ticket(ticket_type=ticket_type, buyer=fan_user, purchased_at=purchased_at) for _ in range(count))
+
+
+def walk(client, url):
+    pages = []
+    while url:
+        response = client.get(url)
+        assert response.status_code == 200
+        pages.append([row['id'] for row in response.data['results']])
+        url = response.data['next']
+    return pages
+
+
+@pytest.mark.django_db
+class TestTicketCursorPagination:
+    """Tests de my-tickets et sold-tickets paginés"""
+
+    def test_pages_follow_purchased_at_then_id(self, fan_client, fan_user, ticket_type):
+        """Test que les pages couvrent tous les tickets, du plus récent au plus ancien"""
+        now = timezone.now()
+        older = buy(fan_user, ticket_type, 3, now - timedelta(hours=1))
+        newer = buy(fan_user, ticket_type, 4, now)
+
+        pages = walk(fan_client, '/api/tickets/my-tickets/?page_size=3')
+
+        expected = [t.pk for t in sorted(newer, key=lambda t: -t.pk)] + [t.pk for t in sorted(older, key=lambda t: -t.pk)]
+        assert [len(page) for page in pages] == [3, 3, 1]
+        assert sum(pages, []) == expected
+
+    def test_concurrent_inserts_do_not_shift_pages(self, fan_client, fan_user, ticket_type):
+        """Test qu'un achat entre deux pages ne duplique ni ne saute de ticket"""
+        tickets = buy(fan_user, ticket_type, 4, timezone.now() - timedelta(minutes=5))
+        first = fan_client.get('/api/tickets/my-tickets/?page_size=2').data
+
+        buy(fan_user, ticket_type, 2)
+        second = fan_client.get(first['next']).data
+
+        seen = [row['id'] for row in first['results'] + second['results']]
+        assert sorted(seen) == sorted(t.pk for t in tickets)
+        assert second['next'] is None
+
+    def test_sold_tickets_are_paginated(self, promoter_user, fan_user, ticket_type,
+                                        django_assert_max_num_queries):
+        buy(fan_user, ticket_type, 5)
+        client = APIClient()
+        client.force_authenticate(promoter_user)
+
+        with django_assert_max_num_queries(2):
+            response = client.get('/api/tickets/sold-tickets/?page_size=2')
+
+        assert response.data['count'] == 5
+        assert len(walk(client, '/api/tickets/sold-tickets/?page_size=2')) == 3
+
+    def test_invalid_cursor_is_not_found(self, fan_client):
+        assert fan_client.get('/api/tickets/my-tickets/?cursor=oops').status_code == 404
+
+
+@pytest.mark.django_db
+def test_approximate_count_uses_planner_above_limit(fan_user, ticket_type, monkeypatch):
+    """Test que le total vient d'EXPLAIN au-delà de la limite exacte"""
+    monkeypatch.setattr(pagination, 'EXACT_COUNT_LIMIT', 5)
+    buy(fan_user, ticket_type, 3)
+    assert pagination.approximate_count(Ticket.objects.all()) == 3
+
+    buy(fan_user, ticket_type, 20)
+    assert pagination.approximate_count(Ticket.objects.all()) >= 6
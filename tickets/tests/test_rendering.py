@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Tests du rendu PDF des tickets (tickets/services/rendering.py)
+"""
+
+import pytest
+from concurrent.futures import Future
+from django.core.cache import cache
+from rest_framework.test import APIClient
+
+from tickets.models import Ticket, TicketType
+from tickets.services import rendering
+
+
+class PendingPool:
+    """Pool dont les rendus ne finissent jamais"""
+
+    def __init__(self):
+        self.submitted = []
+
+    def submit(self, fn, content):
+        self.submitted.append(content)
+        return Future()
+
+
+@pytest.fixture
+def ticket(fan_user, ticket_type):
+    return Ticket.objects.create(ticket_type=ticket_type, buyer=fan_user)
+
+
+def test_render_pdf_without_django():
+    """Test que le rendu produit un PDF à partir du seul contenu"""
+    content = {
+        'ticket': 1, 'qr': 'ZIKLIVE:1', 'event': 'Concert', 'date': '2026-01-01T20:00:00+00:00',
+        'location': 'Paris', 'type': 'VIP', 'price': '80.00', 'buyer': 'Fan',
+        'purchased_at': '2025-12-01T10:00:00+00:00',
+    }
+
+    pdf = rendering.render_pdf(content)
+
+    assert pdf.startswith(b'%PDF')
+    assert rendering.content_hash(content) != rendering.content_hash({**content, 'type': 'Standard'})
+
+
+@pytest.mark.django_db
+class TestTicketPdf:
+    """Tests du endpoint my-tickets/<id>/pdf"""
+
+    def test_second_download_is_served_from_cache(self, fan_user, ticket, monkeypatch, settings):
+        """Test que le PDF est rendu dans le pool une seule fois"""
+        settings.TICKET_RENDER_TIMEOUT = 60  # Démarrage à froid du pool
+        client = APIClient()
+        client.force_authenticate(fan_user)
+        submitted = []
+        submit = rendering.submit
+        monkeypatch.setattr(rendering, 'submit', lambda content: submitted.append(content) or submit(content))
+
+        first = client.get(f'/api/tickets/my-tickets/{ticket.pk}/pdf/')
+        second = client.get(f'/api/tickets/my-tickets/{ticket.pk}/pdf/')
+
+        assert first.status_code == 200
+        assert first['Content-Type'] == 'application/pdf'
+        assert first.content.startswith(b'%PDF')
+        assert second.content == first.content
+        assert len(submitted) == 1
+
+    def test_pending_render_is_not_resubmitted(self, fan_user, ticket, monkeypatch):
+        """Test que les sondages d'un PDF en cours de rendu ne relancent pas de rendu"""
+        pending = PendingPool()
+        monkeypatch.setattr(rendering, 'pool', lambda: pending)
+        client = APIClient()
+        client.force_authenticate(fan_user)
+        content = rendering.ticket_content(
+            Ticket.objects.select_related('ticket_type__event', 'buyer').get(pk=ticket.pk))
+
+        try:
+            assert rendering.submit(content) is not None
+            for _ in range(3):
+                response = client.get(f'/api/tickets/my-tickets/{ticket.pk}/pdf/')
+                assert response.status_code == 202
+        finally:
+            cache.delete(rendering.pending_key(rendering.cache_key(content)))
+
+        assert len(pending.submitted) == 1
+
+    def test_event_batch_render(self, promoter_user, fan_user, ticket_type, event):
+        """Test que le rendu par événement ne refait pas les PDF en cache"""
+        tickets = Ticket.objects.bulk_create(
+            Ticket(ticket_type=ticket_type, buyer=fan_user) for _ in range(3))
+        tickets = Ticket.objects.filter(pk__in=[t.pk for t in tickets]).select_related(
+            'ticket_type__event', 'buyer')
+
+        assert rendering.render_tickets(tickets) == (3, 0)
+        assert rendering.render_tickets(tickets) == (0, 3)
+        assert all(cache.get(rendering.cache_key(rendering.ticket_content(t))) for t in tickets)
+
+        assert rendering.render_event(event.pk, promoter_user.pk, chunk_size=2) == (0, 3)
+        assert rendering.render_event(event.pk, fan_user.pk) == (0, 0)
+
+    def test_event_render_loads_tickets_off_request(self, promoter_user, fan_user, ticket_type, event,
+                                                    monkeypatch, django_assert_num_queries):
+        """Test que l'endpoint valide l'événement et laisse le chargement au thread de rendu"""
+        Ticket.objects.create(ticket_type=ticket_type, buyer=fan_user)
+        scheduled = []
+        monkeypatch.setattr(rendering, 'render_event_later', lambda *args: scheduled.append(args))
+        client = APIClient()
+        client.force_authenticate(promoter_user)
+
+        with django_assert_num_queries(0):
+            response = client.post(f'/api/tickets/sold-tickets/render/?event={event.pk}')
+        assert response.status_code == 202
+        assert response.data == {'event': event.pk}
+        assert scheduled == [(event.pk, promoter_user.pk)]
+
+        assert client.post('/api/tickets/sold-tickets/render/?event=abc').status_code == 400
+        assert client.post('/api/tickets/sold-tickets/render/').status_code == 400
+        assert len(scheduled) == 1
+
+    def test_ticket_prints_price_paid(self, fan_user, ticket_type):
+        """Test que le ticket imprime le prix payé, pas le prix actuel du type"""
+        ticket = Ticket.objects.create(ticket_type=ticket_type, buyer=fan_user, price_paid='12.50')
+        TicketType.objects.filter(pk=ticket_type.pk).update(price='99.00')
+        ticket = Ticket.objects.select_related('ticket_type__event', 'buyer').get(pk=ticket.pk)
+
+        assert rendering.ticket_content(ticket)['price'] == '12.50'
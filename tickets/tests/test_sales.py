@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Tests des agrégats de ventes et du tableau de bord promoteur
+"""
+
+from datetime import timedelta
+from decimal import Decimal
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from tickets.models import Ticket, TicketSalesDaily, TicketType
+from tickets.services import inventory
+
+
+@pytest.fixture
+def fan_client(fan_user):
+    client = APIClient()
+    client.force_authenticate(fan_user)
+    return client
+
+
+@pytest.fixture
+def promoter_client(promoter_user):
+    client = APIClient()
+    client.force_authenticate(promoter_user)
+    return client
+
+
+@pytest.fixture
+def vip_type(ticket_type):
+    return TicketType.objects.create(
+        event=ticket_type.event, name='VIP', price=80, quantity=5,
+        sale_starts=ticket_type.sale_starts, sale_ends=ticket_type.sale_ends,
+    )
+
+
+def dashboard(client, **params):
+    return client.get('/api/tickets/dashboard/', params)
+
+
+@pytest.mark.django_db
+class TestSalesAggregates:
+    """Tests des compteurs tenus à chaque achat"""
+
+    def test_purchases_and_refunds_update_aggregates(self, fan_client, ticket_type, vip_type):
+        """Test que achat simple, panier et suppression tiennent les agrégats"""
+        response = fan_client.post('/api/tickets/my-tickets/', {'ticket_type': ticket_type.pk}, format='json')
+        fan_client.post('/api/tickets/my-tickets/bulk/', {'lines': [
+            {'ticket_type': ticket_type.pk, 'quantity': 2},
+            {'ticket_type': vip_type.pk, 'quantity': 1},
+        ]}, format='json')
+        fan_client.delete(f"/api/tickets/my-tickets/{response.data['id']}/")
+
+        ticket_type.refresh_from_db()
+        vip_type.refresh_from_db()
+        assert (ticket_type.sold, ticket_type.revenue) == (2, Decimal('50.00'))
+        assert (vip_type.sold, vip_type.revenue) == (1, Decimal('80.00'))
+        daily = TicketSalesDaily.objects.get(ticket_type=ticket_type, day=timezone.localdate())
+        assert (daily.tickets, daily.revenue) == (2, Decimal('50.00'))
+
+
+    def test_refund_uses_price_paid_and_purchase_day(self, fan_client, ticket_type):
+        """Test qu'un remboursement après changement de prix retire le prix payé, au jour de l'achat"""
+        response = fan_client.post('/api/tickets/my-tickets/', {'ticket_type': ticket_type.pk}, format='json')
+        purchase_day = timezone.localdate() - timedelta(days=3)
+        Ticket.objects.filter(pk=response.data['id']).update(
+            purchased_at=timezone.now() - timedelta(days=3))
+        TicketSalesDaily.objects.filter(ticket_type=ticket_type).update(day=purchase_day)
+        TicketType.objects.filter(pk=ticket_type.pk).update(price=100)
+
+        fan_client.delete(f"/api/tickets/my-tickets/{response.data['id']}/")
+
+        ticket_type.refresh_from_db()
+        assert (ticket_type.sold, ticket_type.revenue) == (0, Decimal('0.00'))
+        daily = TicketSalesDaily.objects.get(ticket_type=ticket_type)
+        assert (daily.day, daily.tickets, daily.revenue) == (purchase_day, 0, Decimal('0.00'))
+
+
+@pytest.mark.django_db
+class TestSalesDashboard:
+    """Tests du endpoint dashboard"""
+
+    def test_dashboard_totals(self, fan_client, promoter_client, ticket_type, vip_type, event):
+        fan_client.post('/api/tickets/my-tickets/bulk/', {'lines': [
+            {'ticket_type': ticket_type.pk, 'quantity': 3},
+            {'ticket_type': vip_type.pk, 'quantity': 2},
+        ]}, format='json')
+
+        response = dashboard(promoter_client, event=event.pk)
+
+        assert response.status_code == 200
+        [summary] = response.data
+        assert summary['tickets_sold'] == 5
+        assert summary['revenue'] == Decimal('235.00')
+        assert [t['tickets_sold'] for t in summary['ticket_types']] == [3, 2]
+        assert summary['daily'] == [
+            {'day': timezone.localdate(), 'tickets': 5, 'revenue': Decimal('235.00')}]
+
+    def test_dashboard_cost_does_not_grow_with_tickets(self, fan_user, promoter_client, ticket_type):
+        """Test que le nombre de requêtes ne dépend pas des tickets vendus"""
+        def run():
+            with CaptureQueriesContext(connection) as captured:
+                assert dashboard(promoter_client).status_code == 200
+            return len(captured)
+
+        before = run()
+        TicketType.objects.filter(pk=ticket_type.pk).update(quantity=500)
+        for _ in range(50):
+            inventory.reserve(ticket_type.pk)
+        Ticket.objects.bulk_create(Ticket(ticket_type=ticket_type, buyer=fan_user) for _ in range(50))
+
+        assert run() == before
+
+    def test_fan_cannot_read_dashboard(self, fan_client):
+        assert dashboard(fan_client).status_code == 403
+
+
+@pytest.mark.django_db
+def test_sold_tickets_listing_has_no_n_plus_one(fan_user, promoter_client, ticket_type, vip_type,
+                                                 django_assert_max_num_queries):
+    """Test que sold-tickets ne fait pas de requête par ticket"""
+    Ticket.objects.bulk_create(
+        Ticket(ticket_type=tt, buyer=fan_user) for tt in (ticket_type, vip_type) for _ in range(10))
+
+    with django_assert_max_num_queries(3):
+        response = promoter_client.get('/api/tickets/sold-tickets/')
+
+    assert len(response.data['results']) == 20
+    assert {row['ticket_type_name'] for row in response.data['results']} == {'Standard', 'VIP'}
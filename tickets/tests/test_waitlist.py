@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Tests de la liste d'attente des types épuisés (tickets/services/waitlist.py)
+"""
+
+import time
+import pytest
+from rest_framework.test import APIClient
+
+from tickets.models import Ticket, TicketType
+from tickets.services import holds, waitlist
+from tickets.views import STILL_AVAILABLE, WAITLIST_OPEN
+
+
+@pytest.fixture
+def fans(django_user_model):
+    return [
+        django_user_model.objects.create_user(
+            email=f'fan{index}@test.com', password='testpass123', name=f'Fan {index}', role='fan')
+        for index in range(3)
+    ]
+
+
+@pytest.fixture
+def sold_out(ticket_type, fan_user):
+    TicketType.objects.filter(pk=ticket_type.pk).update(sold=ticket_type.quantity)
+    return Ticket.objects.create(ticket_type=ticket_type, buyer=fan_user)
+
+
+def client_for(user):
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
+
+
+def join(client, ticket_type, quantity=1):
+    return client.post('/api/tickets/my-tickets/waitlist/',
+                       {'ticket_type': ticket_type.pk, 'quantity': quantity})
+
+
+@pytest.mark.django_db
+class TestWaitlist:
+    """Tests du endpoint my-tickets/waitlist"""
+
+    def test_positions_are_first_come_first_served(self, fans, ticket_type, sold_out,
+                                                   django_assert_num_queries):
+        """Test l'ordre d'arrivée et un sondage de position sans base"""
+        positions = [join(client_for(fan), ticket_type).data['position'] for fan in fans]
+        again = join(client_for(fans[0]), ticket_type)
+
+        assert positions == [1, 2, 3]
+        assert again.data == {'position': 1, 'waiting': 3}
+        with django_assert_num_queries(0):
+            polled = client_for(fans[2]).get('/api/tickets/my-tickets/waitlist/',
+                                             {'ticket_type': ticket_type.pk})
+        assert polled.data == {'position': 3, 'waiting': 3}
+
+    def test_returned_stock_becomes_offers_for_the_head(self, fan_user, fans, ticket_type, sold_out,
+                                                        django_capture_on_commit_callbacks):
+        """Test qu'une place rendue est offerte au premier, qui la confirme"""
+        for fan in fans:
+            join(client_for(fan), ticket_type)
+        assert waitlist.release_all() == 0
+
+        with django_capture_on_commit_callbacks(execute=True):
+            client_for(fan_user).delete(f'/api/tickets/my-tickets/{sold_out.pk}/')
+        assert waitlist.release_all() == 1
+
+        first = client_for(fans[0])
+        offer = first.get('/api/tickets/my-tickets/waitlist/', {'ticket_type': ticket_type.pk}).data['offer']
+        assert client_for(fans[1]).get('/api/tickets/my-tickets/waitlist/',
+                                       {'ticket_type': ticket_type.pk}).data == {'position': 1, 'waiting': 2}
+        confirmed = first.post('/api/tickets/my-tickets/confirm/', {'hold': offer['hold']})
+        assert confirmed.status_code == 201
+        assert Ticket.objects.filter(buyer=fans[0]).count() == 1
+        assert waitlist.status(ticket_type.pk, fans[0].pk) is None
+
+    def test_direct_purchases_wait_behind_the_queue(self, fan_user, fans, ticket_type, sold_out,
+                                                    django_capture_on_commit_callbacks):
+        """Test qu'un fan qui relance l'achat ne passe pas devant la file"""
+        join(client_for(fans[0]), ticket_type)
+        with django_capture_on_commit_callbacks(execute=True):
+            client_for(fan_user).delete(f'/api/tickets/my-tickets/{sold_out.pk}/')
+
+        other = client_for(fans[1])
+        responses = [
+            other.post('/api/tickets/my-tickets/', {'ticket_type': ticket_type.pk}),
+            other.post('/api/tickets/my-tickets/hold/', {'ticket_type': ticket_type.pk, 'quantity': 1}),
+            other.post('/api/tickets/my-tickets/bulk/',
+                       {'lines': [{'ticket_type': ticket_type.pk, 'quantity': 1}]}, format='json'),
+        ]
+        for response in responses:
+            assert response.status_code == 400
+            assert response.data == [WAITLIST_OPEN]
+
+        assert waitlist.release_all() == 1
+        assert 'offer' in waitlist.status(ticket_type.pk, fans[0].pk)
+
+    def test_interrupted_worker_keeps_the_queue(self, fans, ticket_type, sold_out, monkeypatch):
+        """Test qu'un worker interrompu avant l'offre ne perd pas les fans"""
+        for fan in fans:
+            join(client_for(fan), ticket_type)
+        TicketType.objects.filter(pk=ticket_type.pk).update(quantity=ticket_type.quantity + 1)
+        holds.invalidate(ticket_type.pk)
+
+        def crash(*args, **kwargs):
+            raise RuntimeError("worker killed")
+
+        monkeypatch.setattr(holds, 'hold', crash)
+        with pytest.raises(RuntimeError):
+            waitlist.release_all()
+        monkeypatch.undo()
+
+        assert waitlist.status(ticket_type.pk, fans[0].pk) == {'position': 1, 'waiting': 3}
+        assert waitlist.release_all() == 1
+        assert 'offer' in waitlist.status(ticket_type.pk, fans[0].pk)
+
+    def test_expired_offer_passes_to_next(self, fans, ticket_type, sold_out, settings):
+        """Test qu'une offre non confirmée revient au suivant"""
+        settings.TICKET_HOLD_TTL = 1
+        for fan in fans:
+            join(client_for(fan), ticket_type)
+        TicketType.objects.filter(pk=ticket_type.pk).update(quantity=ticket_type.quantity + 1)
+        holds.invalidate(ticket_type.pk)
+
+        assert waitlist.release_all() == 1
+        time.sleep(1.1)
+        holds.reap_expired()
+        assert waitlist.release_all() == 1
+
+        assert 'offer' in waitlist.status(ticket_type.pk, fans[1].pk)
+        assert waitlist.status(ticket_type.pk, fans[2].pk) == {'position': 1, 'waiting': 1}
+
+    def test_leave_and_closed_sale(self, fans, ticket_type, sold_out):
+        client = client_for(fans[0])
+        join(client, ticket_type)
+
+        assert client.delete(f'/api/tickets/my-tickets/waitlist/?ticket_type={ticket_type.pk}').status_code == 204
+        assert client.get('/api/tickets/my-tickets/waitlist/', {'ticket_type': ticket_type.pk}).status_code == 404
+        assert join(client, TicketType(pk=999999)).status_code == 400
+
+    def test_join_only_when_sold_out(self, fans, ticket_type):
+        """Test qu'on ne s'inscrit que si les places restantes ne suffisent pas"""
+        TicketType.objects.filter(pk=ticket_type.pk).update(sold=ticket_type.quantity - 2)
+
+        refused = join(client_for(fans[0]), ticket_type)
+        assert refused.status_code == 400
+        assert refused.data == [STILL_AVAILABLE]
+        assert waitlist.status(ticket_type.pk, fans[0].pk) is None
+
+        assert join(client_for(fans[0]), ticket_type, quantity=3).status_code == 201
+        waitlist.leave(ticket_type.pk, fans[0].pk)
+
+        # Places retenues par des holds : épuisé pour les autres
+        holds.hold(ticket_type.pk, fans[1].pk, quantity=2)
+        assert join(client_for(fans[2]), ticket_type).status_code == 201
@@ -1,7 +1,7 @@
 # tickets/urls.py
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import SoldTicketsViewSet, TicketPurchaseViewSet, TicketTypeViewSet
+from .views import EventCatalogView, SalesDashboardView, SoldTicketsViewSet, TicketManifestView, TicketPurchaseViewSet, TicketScanView, TicketTypeViewSet
 
 router = DefaultRouter()
 router.register(r'my-tickets', TicketPurchaseViewSet, basename='my-tickets')
@@ -9,5 +9,9 @@ router.register(r'manage-types', TicketTypeViewSet, basename='ticket-types')
 router.register(r'sold-tickets', SoldTicketsViewSet, basename='sold-tickets')
 
 urlpatterns = [
+    path('scan/', TicketScanView.as_view(), name='ticket-scan'),
+    path('events/<int:event_id>/on-sale/', EventCatalogView.as_view(), name='event-catalog'),
+    path('dashboard/', SalesDashboardView.as_view(), name='sales-dashboard'),
+    path('manifest/<int:event_id>/', TicketManifestView.as_view(), name='ticket-manifest'),
     path('', include(router.urls)),
 ]
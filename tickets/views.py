@@ -1,20 +1,41 @@
-from rest_framework import viewsets, status
+from rest_framework import viewsets, status, serializers
+from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.decorators import action
+from django.db import transaction
+from django.http import HttpResponse
 from django.utils import timezone
+from users.core.idempotency import IdempotentMixin
 from .models import Ticket, TicketType
-from .serializers import TicketSerializer, TicketTypeSerializer
+from .pagination import TicketCursorPagination
+from .serializers import (
+    BulkPurchaseSerializer, HoldConfirmSerializer, RenderEventSerializer, SalesDashboardSerializer,
+    TicketHoldSerializer, TicketScanSerializer, TicketSerializer, TicketTypeSerializer,
+)
 from .permissions import IsFan, IsPromoterOrAdmin
-from rest_framework.exceptions import PermissionDenied
+from rest_framework.exceptions import NotFound, PermissionDenied, Throttled
+from .services import admission, catalog, holds, inventory, manifest, rendering, sales, waitlist
 
 
-class TicketPurchaseViewSet(viewsets.ModelViewSet):
+WAITLIST_OPEN = "Une liste d'attente est ouverte pour ce ticket."
+STILL_AVAILABLE = "Ce ticket n'est pas épuisé, achetez-le directement."
+
+
+class TicketPurchaseViewSet(IdempotentMixin, viewsets.ModelViewSet):
     queryset = Ticket.objects.all()
     serializer_class = TicketSerializer
     permission_classes = [IsAuthenticated, IsFan]
+    pagination_class = TicketCursorPagination
+    # Les achats relancés par les clients mobiles ne créent pas de doublons
+    idempotent_actions = ('create', 'bulk', 'confirm')
 
     def get_queryset(self):
-        return Ticket.objects.filter(buyer=self.request.user)
+        # TicketSerializer lit ticket_type.name et ticket_type.event.title
+        queryset = Ticket.objects.filter(buyer=self.request.user).select_related('ticket_type__event')
+        if self.action == 'pdf':
+            queryset = queryset.select_related('buyer')
+        return queryset
 
     def perform_create(self, serializer):
         ticket_type = serializer.validated_data['ticket_type']
@@ -22,21 +43,178 @@ class TicketPurchaseViewSet(viewsets.ModelViewSet):
 
         # Conditions de vente
         if not (ticket_type.sale_starts <= now <= ticket_type.sale_ends):
-            raise serializer.ValidationError("Sale close for this ticket.")
-        if ticket_type.tickets_remaining <= 0:
-            raise serializer.ValidationError("Ce ticket est épuisé.")
+            raise serializers.ValidationError("Sale close for this ticket.")
+        # Les places rendues vont d'abord à la liste d'attente
+        if waitlist.queued([ticket_type.pk]):
+            raise serializers.ValidationError(WAITLIST_OPEN)
+
+        # La place est prise sur le stock des holds, puis en base dans la même
+        # transaction que l'insertion
+        try:
+            with holds.taken({ticket_type.pk: 1}), transaction.atomic():
+                price = inventory.reserve(ticket_type.pk)
+                if price is None:
+                    raise serializers.ValidationError("Ce ticket est épuisé.")
+                serializer.save(buyer=self.request.user, price_paid=price)
+        except holds.HoldError as exc:
+            raise serializers.ValidationError(str(exc))
+
+    def perform_update(self, serializer):
+        previous = serializer.instance.ticket_type_id
+        ticket_type = serializer.validated_data.get('ticket_type')
+        if ticket_type is None or ticket_type.pk == previous:
+            serializer.save()
+            return
+
+        # Changement de type : la place passe d'un stock à l'autre, sur le jour de l'achat
+        instance = serializer.instance
+        previous_event = instance.ticket_type.event_id if previous else None
+        try:
+            with holds.taken({ticket_type.pk: 1}), transaction.atomic():
+                price = inventory.reserve(ticket_type.pk, day=timezone.localdate(instance.purchased_at))
+                if price is None:
+                    raise serializers.ValidationError("Ce ticket est épuisé.")
+                if previous:
+                    inventory.release(instance)
+                    transaction.on_commit(lambda: holds.invalidate(previous))
+                ticket = serializer.save(price_paid=price)
+                # Changement d'événement : journalisé pour les manifestes hors ligne
+                if ticket_type.event_id != previous_event:
+                    if previous_event:
+                        manifest.revoke(previous_event, ticket.pk)
+                    manifest.restore(ticket_type.event_id, ticket.pk)
+        except holds.HoldError as exc:
+            raise serializers.ValidationError(str(exc))
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            if instance.ticket_type_id:
+                inventory.release(instance)
+                manifest.revoke(instance.ticket_type.event_id, instance.pk)
+                # La place rendue revient au stock des holds, donc à la liste d'attente
+                ticket_type_id = instance.ticket_type_id
+                transaction.on_commit(lambda: holds.invalidate(ticket_type_id))
+            instance.delete()
+
+
+    @action(detail=True, methods=['get'])
+    def pdf(self, request, pk=None):
+        """Ticket en PDF, servi depuis le cache une fois rendu"""
+        ticket = self.get_object()
+        content = rendering.ticket_content(ticket)
+        pdf = rendering.get_pdf(content)
+        if pdf is None:
+            # Rendu toujours en cours dans le pool : il finira en cache
+            return Response({'detail': "Ticket en cours de génération."},
+                            status=status.HTTP_202_ACCEPTED, headers={'Retry-After': '2'})
+        response = HttpResponse(pdf, content_type='application/pdf')
+        response['Content-Disposition'] = f'attachment; filename="ticket-{ticket.pk}.pdf"'
+        return response
+
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """Achète un panier de plusieurs types de tickets, tout ou rien"""
+        serializer = BulkPurchaseSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        lines = serializer.validated_data['lines']
+        if waitlist.queued(lines):
+            raise serializers.ValidationError(WAITLIST_OPEN)
+        try:
+            # Places prises sur le stock des holds, qui reste à jour après l'achat
+            with holds.taken(lines):
+                tickets = inventory.purchase_cart(request.user, lines)
+        except (holds.HoldError, inventory.CartError) as exc:
+            raise serializers.ValidationError(str(exc))
 
-        serializer.save(buyer=self.request.user)
+        tickets = Ticket.objects.filter(pk__in=[ticket.pk for ticket in tickets]).select_related(
+            'ticket_type__event')
+        return Response(TicketSerializer(tickets, many=True).data, status=status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=['post'])
+    def hold(self, request):
+        """Retient des places quelques minutes, sans toucher la base"""
+        serializer = TicketHoldSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        if waitlist.queued([serializer.validated_data['ticket_type']]):
+            raise serializers.ValidationError(WAITLIST_OPEN)
+        try:
+            hold_token, expires_at = holds.hold(
+                serializer.validated_data['ticket_type'],
+                request.user.pk,
+                serializer.validated_data['quantity'],
+            )
+        except holds.HoldError as exc:
+            if exc.reason == 'throttled':
+                raise Throttled(wait=1, detail=str(exc))
+            raise serializers.ValidationError(str(exc))
+        return Response({'hold': hold_token, 'expires_at': expires_at},
+                        status=status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=['post'])
+    def confirm(self, request):
+        """Achète les places d'un hold encore valide"""
+        serializer = HoldConfirmSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            tickets = holds.confirm(serializer.validated_data['hold'], request.user)
+        except holds.HoldError as exc:
+            raise serializers.ValidationError(str(exc))
+        waitlist.confirmed(serializer.validated_data['hold'], request.user.pk)
+        tickets = Ticket.objects.filter(pk__in=[ticket.pk for ticket in tickets]).select_related(
+            'ticket_type__event')
+        return Response(TicketSerializer(tickets, many=True).data, status=status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=['post'])
+    def release(self, request):
+        """Annule un hold"""
+        serializer = HoldConfirmSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            holds.release(serializer.validated_data['hold'], request.user.pk)
+        except holds.HoldError as exc:
+            raise serializers.ValidationError(str(exc))
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    @action(detail=False, methods=['get', 'post', 'delete'])
+    def waitlist(self, request):
+        """Liste d'attente d'un type épuisé : inscription, position ou offre, départ"""
+        data = request.data if request.method == 'POST' else request.query_params
+        serializer = TicketHoldSerializer(data=data)
+        serializer.is_valid(raise_exception=True)
+        ticket_type_id = serializer.validated_data['ticket_type']
+
+        if request.method == 'DELETE':
+            if not waitlist.leave(ticket_type_id, request.user.pk):
+                raise NotFound("Not on this waitlist.")
+            return Response(status=status.HTTP_204_NO_CONTENT)
+
+        if request.method == 'POST':
+            info = holds.sale_info(ticket_type_id)
+            if info is None:
+                raise serializers.ValidationError("Unknown ticket type.")
+            if not (info['sale_starts'] <= timezone.now() <= info['sale_ends']):
+                raise serializers.ValidationError("Sale close for this ticket.")
+            # Sans file ouverte, on n'attend que si le stock ne suffit pas
+            quantity = serializer.validated_data['quantity']
+            if not waitlist.queued([ticket_type_id]) and holds.remaining(ticket_type_id, info) >= quantity:
+                raise serializers.ValidationError(STILL_AVAILABLE)
+            waitlist.join(ticket_type_id, request.user.pk, quantity)
+            return Response(waitlist.status(ticket_type_id, request.user.pk), status=status.HTTP_201_CREATED)
+
+        current = waitlist.status(ticket_type_id, request.user.pk)
+        if current is None:
+            raise NotFound("Not on this waitlist.")
+        return Response(current)
 
 
 class TicketTypeViewSet(viewsets.ModelViewSet):
-    queryset = TicketType.objects.all()
+    queryset = TicketType.objects.with_availability()
     serializer_class = TicketTypeSerializer
     permission_classes = [IsAuthenticated, IsPromoterOrAdmin]
 
     def get_queryset(self):
         # Un promoteur ne voit que ses propres ticket types
-        queryset = TicketType.objects.filter(event__created_by=self.request.user)
+        queryset = TicketType.objects.with_availability().filter(event__created_by=self.request.user)
         event_id = self.request.query_params.get('event')
         if event_id:
             queryset = queryset.filter(event__id=event_id)
@@ -45,14 +223,106 @@ class TicketTypeViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         if self.request.user.role not in ['promoter', 'admin']:
             raise PermissionDenied("Only promoter can create events.")
-        serializer.save(created_by=self.request.user)
+        ticket_type = serializer.save(created_by=self.request.user)
+        transaction.on_commit(lambda: catalog.invalidate(ticket_type.event_id))
+
+    def perform_update(self, serializer):
+        previous_event = serializer.instance.event_id
+        with transaction.atomic():
+            # Verrou du type : aucun achat ne s'intercale pendant le déplacement
+            TicketType.objects.select_for_update().filter(pk=serializer.instance.pk).first()
+            ticket_type = serializer.save()
+            # Changement d'événement : tous ses tickets changent de manifeste
+            manifest.move_type(ticket_type.pk, previous_event, ticket_type.event_id)
+        # Quantité ou fenêtre de vente : le stock des holds et les catalogues sont recalculés
+        transaction.on_commit(lambda: holds.invalidate(ticket_type.pk))
+        for event_id in {previous_event, ticket_type.event_id}:
+            transaction.on_commit(lambda event_id=event_id: catalog.invalidate(event_id))
+
+    def perform_destroy(self, instance):
+        event_id = instance.event_id
+        with transaction.atomic():
+            # Les tickets partent en cascade : ils sont révoqués au scan et dans les manifestes
+            manifest.revoke_many(event_id, instance.tickets.values_list('pk', flat=True))
+            instance.delete()
+        transaction.on_commit(lambda: catalog.invalidate(event_id))
+
+    @action(detail=True, methods=['get'], url_path='hold-metrics')
+    def hold_metrics(self, request, pk=None):
+        ticket_type = self.get_object()
+        return Response(holds.metrics(ticket_type.pk))
 
 
 class SoldTicketsViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = TicketSerializer
     permission_classes = [IsAuthenticated, IsPromoterOrAdmin]
+    pagination_class = TicketCursorPagination
 
     def get_queryset(self):
         user = self.request.user
         # Tickets vendus pour les ticket types des événements de ce promoteur
-        return Ticket.objects.filter(ticket_type__event__created_by=user)
+        return Ticket.objects.filter(ticket_type__event__created_by=user).select_related('ticket_type__event')
+
+    @action(detail=False, methods=['post'])
+    def render(self, request):
+        """Lance le rendu PDF de tous les tickets vendus d'un événement"""
+        serializer = RenderEventSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        event_id = serializer.validated_data['event']
+        # Tickets chargés par lots hors de la requête
+        rendering.render_event_later(event_id, request.user.pk)
+        return Response({'event': event_id}, status=status.HTTP_202_ACCEPTED)
+
+
+class TicketScanView(APIView):
+    """Entrée d'un ticket à la porte, sans lecture de la base par scan"""
+    permission_classes = [IsAuthenticated, IsPromoterOrAdmin]
+
+    def post(self, request):
+        serializer = TicketScanSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        event_id = serializer.validated_data['event']
+        if not request.user.is_staff and admission.event_owner(event_id) != request.user.pk:
+            raise PermissionDenied("You can only scan tickets for your own events.")
+
+        try:
+            admitted = admission.scan(serializer.validated_data['code'], event_id)
+        except admission.ScanError as exc:
+            code = status.HTTP_409_CONFLICT if exc.reason == 'duplicate' else status.HTTP_400_BAD_REQUEST
+            return Response({'status': exc.reason, 'detail': str(exc)}, status=code)
+        return Response({'status': 'admitted', **admitted})
+
+
+class TicketManifestView(APIView):
+    """Manifeste signé des tickets valides d'un événement, complet ou en delta"""
+    permission_classes = [IsAuthenticated, IsPromoterOrAdmin]
+
+    def get(self, request, event_id):
+        if not request.user.is_staff and admission.event_owner(event_id) != request.user.pk:
+            raise PermissionDenied("You can only download manifests for your own events.")
+
+        since = request.query_params.get('since')
+        if since is not None:
+            try:
+                manifest.parse_version(since)
+            except ValueError as exc:
+                raise serializers.ValidationError({'since': str(exc)})
+        return Response(manifest.build(event_id, since))
+
+
+class SalesDashboardView(APIView):
+    """Ventes des événements du promoteur : totaux par événement, par type et par jour"""
+    permission_classes = [IsAuthenticated, IsPromoterOrAdmin]
+
+    def get(self, request):
+        serializer = SalesDashboardSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        return Response(sales.dashboard(request.user, **serializer.validated_data))
+
+
+class EventCatalogView(APIView):
+    """Types de tickets en vente maintenant pour un événement"""
+    permission_classes = [AllowAny]
+
+    def get(self, request, event_id):
+        return Response({'event': event_id, 'results': catalog.on_sale(event_id)})
@@ -0,0 +1,126 @@
+#!/usr/bin/env python
+"""
+Idempotency-Key support for retried POSTs (mobile clients on flaky networks).
+
+The first request with a given key runs normally and its rendered
+response is kept in Redis for IDEMPOTENCY_TTL seconds; retries with the
+same key get that response back without running the view again. A retry
+arriving while the first request is still running waits for it. Keys are
+scoped to the view and to the user (or to anonymous callers).
+"""
+
+import hashlib
+import json
+import time
+from django.conf import settings
+from django.http import HttpResponse
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+from users.core.redis import redis_client
+
+
+HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+POLL_INTERVAL = 0.05
+
+
+class IdempotencyConflict(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "A request with this Idempotency-Key is still in progress."
+    default_code = 'idempotency_conflict'
+
+
+class IdempotencyKeyReused(APIException):
+    status_code = status.HTTP_422_UNPROCESSABLE_ENTITY
+    default_detail = "This Idempotency-Key was already used for a different request."
+    default_code = 'idempotency_key_reused'
+
+
+class _Replay(Exception):
+    def __init__(self, response):
+        self.response = response
+
+
+def replay(record):
+    response = HttpResponse(
+        record['content'], status=record['status'], content_type=record['content_type']
+    )
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+class IdempotentMixin:
+    """Replay the first response of POSTs sent again with the same Idempotency-Key"""
+    idempotent_actions = ('create',)
+
+    _idempotency_key = None
+
+    def is_idempotent(self, request):
+        return request.method == 'POST' and getattr(self, 'action', 'create') in self.idempotent_actions
+
+    def idempotency_cache_key(self, request, key):
+        user = request.user.pk if request.user.is_authenticated else 'anon'
+        return f"idempotency:{type(self).__name__}:{user}:{key}"
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        key = request.headers.get(HEADER)
+        if not key or not self.is_idempotent(request):
+            return
+        if len(key) > MAX_KEY_LENGTH:
+            raise ValidationError({HEADER: f"At most {MAX_KEY_LENGTH} characters."})
+
+        cache_key = self.idempotency_cache_key(request, key)
+        fingerprint = hashlib.sha256(request.method.encode() + request.get_full_path().encode()
+                                     + request._request.body).hexdigest()
+        pending = json.dumps({'state': 'pending', 'fingerprint': fingerprint})
+        deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT
+
+        while not redis_client.set(cache_key, pending, nx=True, ex=settings.IDEMPOTENCY_LOCK_TTL):
+            raw = redis_client.get(cache_key)
+            if raw is None:
+                continue  # The first request failed and released the key
+            record = json.loads(raw)
+            if record['fingerprint'] != fingerprint:
+                raise IdempotencyKeyReused()
+            if record['state'] == 'done':
+                raise _Replay(replay(record))
+            if time.monotonic() >= deadline:
+                raise IdempotencyConflict()
+            time.sleep(POLL_INTERVAL)
+
+        self._idempotency_key = (cache_key, fingerprint)
+
+    def handle_exception(self, exc):
+        if isinstance(exc, _Replay):
+            return exc.response
+        try:
+            return super().handle_exception(exc)
+        except Exception:
+            # Unhandled error: the key must not stay pending until the lock expires
+            if self._idempotency_key is not None:
+                redis_client.delete(self._idempotency_key[0])
+                self._idempotency_key = None
+            raise
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if self._idempotency_key is None:
+            return response
+
+        cache_key, fingerprint = self._idempotency_key
+        self._idempotency_key = None
+        if response.status_code >= 500:
+            # Nothing was done for sure: let the client retry for real
+            redis_client.delete(cache_key)
+            return response
+
+        response.render()
+        redis_client.set(cache_key, json.dumps({
+            'state': 'done',
+            'fingerprint': fingerprint,
+            'status': response.status_code,
+            'content': response.content.decode(),
+            'content_type': response['Content-Type'],
+        }), ex=settings.IDEMPOTENCY_TTL)
+        return response
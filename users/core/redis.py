@@ -2,6 +2,7 @@
 """Redis module importation"""
 
 import redis
+import redis.asyncio as aioredis
 import os
 from dotenv import load_dotenv
 
@@ -14,4 +15,13 @@ redis_client = redis.StrictRedis(
     host=REDIS_HOST,
     port=REDIS_PORT,
     decode_responses=True
-)
\ No newline at end of file
+)
+
+
+def get_async_redis_client():
+    """asyncio client, one per event loop (e.g. for the ASGI push channel)"""
+    return aioredis.StrictRedis(
+        host=REDIS_HOST,
+        port=REDIS_PORT,
+        decode_responses=True
+    )
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""test Idempotency-Key layer"""
+
+
+import threading
+import time
+import uuid
+import pytest
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+from users.serializers import UserCreateSerializer
+
+User = get_user_model()
+
+URL = '/api/users/register/fan/'
+
+
+def register(client, key, email='idem@example.com'):
+    return client.post(URL, {'name': 'Idem', 'email': email, 'password': 'testpass'},
+                       format='json', HTTP_IDEMPOTENCY_KEY=key)
+
+
+@pytest.mark.django_db
+def test_retry_replays_first_response():
+    client = APIClient()
+    key = str(uuid.uuid4())
+
+    first = register(client, key)
+    retry = register(client, key)
+
+    assert first.status_code == 201
+    assert retry.status_code == 201
+    assert retry.content == first.content
+    assert retry['Idempotent-Replayed'] == 'true'
+    assert User.objects.filter(email='idem@example.com').count() == 1
+
+
+@pytest.mark.django_db
+def test_same_key_with_other_body_is_rejected():
+    client = APIClient()
+    key = str(uuid.uuid4())
+    register(client, key)
+
+    response = register(client, key, email='other@example.com')
+
+    assert response.status_code == 422
+    assert not User.objects.filter(email='other@example.com').exists()
+
+
+@pytest.mark.django_db
+def test_without_key_requests_run_normally():
+    client = APIClient()
+    client.post(URL, {'name': 'A', 'email': 'a@example.com', 'password': 'x'}, format='json')
+    response = client.post(URL, {'name': 'A', 'email': 'a@example.com', 'password': 'x'}, format='json')
+    assert response.status_code == 400
+
+
+@pytest.mark.django_db(transaction=True)
+def test_in_flight_duplicate_waits_for_original(monkeypatch):
+    key = str(uuid.uuid4())
+    create = UserCreateSerializer.create
+
+    def slow_create(self, validated_data):
+        time.sleep(0.3)
+        return create(self, validated_data)
+
+    monkeypatch.setattr(UserCreateSerializer, 'create', slow_create)
+    responses = []
+
+    def send():
+        responses.append(register(APIClient(), key, email='wait@example.com'))
+
+    original = threading.Thread(target=send)
+    original.start()
+    time.sleep(0.1)
+    send()
+    original.join()
+
+    assert [r.status_code for r in responses] == [201, 201]
+    assert responses[0].content == responses[1].content
+    assert sorted(r.has_header('Idempotent-Replayed') for r in responses) == [False, True]
+    assert User.objects.filter(email='wait@example.com').count() == 1
@@ -1,5 +1,6 @@
 from users.session_manager import create_session, get_session
 from users.session_manager import delete_session
+from users.core.idempotency import IdempotentMixin
 from rest_framework.permissions import AllowAny
 import uuid
 from rest_framework import generics
@@ -20,7 +21,7 @@ from users.session_manager import create_session
 from rest_framework.response import Response
 import uuid
 
-class RegisterFanView(generics.CreateAPIView):
+class RegisterFanView(IdempotentMixin, generics.CreateAPIView):
     serializer_class = UserCreateSerializer
     permission_classes = [AllowAny]
 
@@ -13,4 +13,14 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ziklive_backend.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Imported once Django is set up
+from streams.sse import PATH_RE as STREAM_EVENTS_PATH, sse_application  # noqa: E402
+
+
+async def application(scope, receive, send):
+    """Route the live stream push channel, everything else to Django"""
+    if scope['type'] == 'http' and STREAM_EVENTS_PATH.match(scope['path']):
+        return await sse_application(scope, receive, send)
+    return await django_application(scope, receive, send)
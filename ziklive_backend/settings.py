@@ -147,6 +147,7 @@ CORS_ALLOW_HEADERS = list(default_headers) + [
     'x-csrf-token',
     'X-Client-Type',
     'X-Session-Id',
+    'Idempotency-Key',
 ]
 
 CORS_ALLOW_METHODS = [
@@ -277,3 +278,67 @@ cloudinary.config(
 # Live service
 MUX_TOKEN_ID = os.getenv('MUX_TOKEN_ID')
 MUX_TOKEN_SECRET = os.getenv('MUX_TOKEN_SECRET')
+
+# Live viewer counters (Redis), flushed to LiveStream rows
+STREAM_COUNTER_FLUSH_INTERVAL = int(os.getenv('STREAM_COUNTER_FLUSH_INTERVAL', 5))
+STREAM_COUNTER_TTL = int(os.getenv('STREAM_COUNTER_TTL', 86400))
+
+# Buffered StreamViewer join/leave ingestion
+STREAM_VIEWER_BATCH_SIZE = int(os.getenv('STREAM_VIEWER_BATCH_SIZE', 500))
+STREAM_VIEWER_FLUSH_INTERVAL = int(os.getenv('STREAM_VIEWER_FLUSH_INTERVAL', 2))
+STREAM_VIEWER_BUFFER_MAX = int(os.getenv('STREAM_VIEWER_BUFFER_MAX', 50000))
+
+# Viewer heartbeats: sessions silent for longer than the timeout are closed
+STREAM_HEARTBEAT_TIMEOUT = int(os.getenv('STREAM_HEARTBEAT_TIMEOUT', 45))
+STREAM_REAPER_INTERVAL = int(os.getenv('STREAM_REAPER_INTERVAL', 15))
+
+# Push channel: maximum updates per second sent to one subscriber
+STREAM_PUSH_MAX_RATE = float(os.getenv('STREAM_PUSH_MAX_RATE', 2))
+
+# Mux webhooks: signature secret, replay window (seconds) and deduplication
+MUX_WEBHOOK_SECRET = os.getenv('MUX_WEBHOOK_SECRET')
+MUX_WEBHOOK_TOLERANCE = int(os.getenv('MUX_WEBHOOK_TOLERANCE', 300))
+STREAM_WEBHOOK_DEDUPE_TTL = int(os.getenv('STREAM_WEBHOOK_DEDUPE_TTL', 86400))
+STREAM_WEBHOOK_BATCH_SIZE = int(os.getenv('STREAM_WEBHOOK_BATCH_SIZE', 200))
+
+# Sessions of streams ended for longer than this move to the archive table
+STREAM_ARCHIVE_AFTER_DAYS = int(os.getenv('STREAM_ARCHIVE_AFTER_DAYS', 30))
+
+# Cached entitled user ids of paid streams (seconds)
+STREAM_ENTITLEMENT_TTL = int(os.getenv('STREAM_ENTITLEMENT_TTL', 86400))
+
+# Ingest callbacks: shared secret and stream key lookup cache
+STREAM_INGEST_SECRET = os.getenv('STREAM_INGEST_SECRET')
+STREAM_KEY_CACHE_SIZE = int(os.getenv('STREAM_KEY_CACHE_SIZE', 10000))
+STREAM_KEY_LOCAL_TTL = int(os.getenv('STREAM_KEY_LOCAL_TTL', 5))
+STREAM_KEY_REDIS_TTL = int(os.getenv('STREAM_KEY_REDIS_TTL', 300))
+
+# Ticket holds: lifetime (seconds), admissions per second and per ticket type
+TICKET_HOLD_TTL = int(os.getenv('TICKET_HOLD_TTL', 300))
+TICKET_HOLD_ADMISSION_RATE = int(os.getenv('TICKET_HOLD_ADMISSION_RATE', 200))
+TICKET_HOLD_MAX_QUANTITY = int(os.getenv('TICKET_HOLD_MAX_QUANTITY', 10))
+
+# Bulk purchases: maximum tickets in one cart
+TICKET_CART_MAX_QUANTITY = int(os.getenv('TICKET_CART_MAX_QUANTITY', 20))
+
+# Ticket PDF rendering: worker processes (0 = one per CPU), wait, cache and pending marker (seconds)
+TICKET_RENDER_WORKERS = int(os.getenv('TICKET_RENDER_WORKERS', 0))
+TICKET_RENDER_TIMEOUT = int(os.getenv('TICKET_RENDER_TIMEOUT', 5))
+TICKET_PDF_CACHE_TTL = int(os.getenv('TICKET_PDF_CACHE_TTL', 7 * 86400))
+TICKET_RENDER_PENDING_TTL = int(os.getenv('TICKET_RENDER_PENDING_TTL', 300))
+
+# Ticket admission: code signing key, admitted bitmap lifetime (seconds) and write-back batch size
+TICKET_SIGNING_KEY = os.getenv('TICKET_SIGNING_KEY', SECRET_KEY or '')
+TICKET_ADMISSION_TTL = int(os.getenv('TICKET_ADMISSION_TTL', 7 * 86400))
+TICKET_ADMISSION_BATCH_SIZE = int(os.getenv('TICKET_ADMISSION_BATCH_SIZE', 1000))
+
+# On-sale ticket catalog: longest cache lifetime when no sale window opens or closes sooner (seconds)
+TICKET_CATALOG_MAX_TTL = int(os.getenv('TICKET_CATALOG_MAX_TTL', 3600))
+
+# Ticket waitlist: offers released per ticket type and worker pass
+TICKET_WAITLIST_BATCH_SIZE = int(os.getenv('TICKET_WAITLIST_BATCH_SIZE', 50))
+
+# Idempotency-Key: replay window, in-flight lock and how long a retry waits for the first request (seconds)
+IDEMPOTENCY_TTL = int(os.getenv('IDEMPOTENCY_TTL', 86400))
+IDEMPOTENCY_LOCK_TTL = int(os.getenv('IDEMPOTENCY_LOCK_TTL', 30))
+IDEMPOTENCY_WAIT = int(os.getenv('IDEMPOTENCY_WAIT', 10))
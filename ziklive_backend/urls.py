@@ -23,4 +23,5 @@ urlpatterns = [
     path('api/artists/', include('artists.urls')),
     path('api/events/', include('events.urls')),
     path('api/tickets/', include('tickets.urls')),
+    path('api/streams/', include('streams.urls')),
 ]